@@ -14,6 +14,6 @@ def get_db_dep(
 ) -> Generator[sqlite3.Connection, None, None]:
     """
     作为统一的依赖暴露出去，方便以后扩展。
-    现在只是简单转发 get_db。
+    现在只是简单转发 get_db：连接来自只读连接池，请求结束后归还复用。
     """
     return conn
@@ -0,0 +1,15 @@
+﻿# app/api/responses.py
+from __future__ import annotations
+
+from fastapi import Request, Response
+
+from ..services.response_cache import CachedResponse, etag_matches
+
+
+def cached_json_response(request: Request, cached: CachedResponse) -> Response:
+    """返回缓存的 JSON 字节并带上 ETag；If-None-Match 命中时返回 304。"""
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=cached.body, media_type="application/json", headers=headers)
@@ -3,9 +3,21 @@ from __future__ import annotations
 
 from fastapi import APIRouter
 
+from .advice import router as advice_router
+from .cohorts import router as cohorts_router
+from .salary import router as salary_router
 from .trends import router as trends_router
 
 api_router = APIRouter(prefix="/api")
 
 # /api/trends/...
 api_router.include_router(trends_router)
+
+# /api/cohorts/...
+api_router.include_router(cohorts_router)
+
+# /api/advice/...
+api_router.include_router(advice_router)
+
+# /api/salary
+api_router.include_router(salary_router)
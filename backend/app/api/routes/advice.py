@@ -0,0 +1,66 @@
+﻿# app/api/routes/advice.py
+from __future__ import annotations
+
+from typing import List, Optional
+
+import sqlite3
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from ...models.advice import AdviceResponse
+from ...services.advice_service import (
+    CooccurrenceNotBuilt,
+    latest_cooccurrence_year,
+    recommend_next,
+    sync_cooccurrence_store,
+)
+from ...services.cohort_service import parse_condition
+from ...services.response_cache import data_version
+from ...services.trend_service import validate_dimension
+from ..deps import get_db_dep
+
+router = APIRouter(
+    prefix="/advice",
+    tags=["advice"],
+)
+
+COOCCURRENCE_NOT_BUILT_DETAIL = (
+    "Co-occurrence matrices have not been built; rerun generate_usage_trend.py --cooccurrence"
+)
+
+
+@router.get("/next", response_model=AdviceResponse)
+def get_next_technologies(
+    have: List[str] = Query(
+        description="当前技术栈，形如 维度:item，可重复，如 ?have=language:Python&have=database:PostgreSQL",
+    ),
+    k: int = Query(default=10, ge=1, le=50, description="返回的推荐数"),
+    dimension: Optional[str] = Query(
+        default=None,
+        description="只推荐某个维度的 item，如 ?dimension=database；缺省为全部维度",
+    ),
+    year: Optional[int] = Query(default=None, description="调查年份；缺省为最近一年"),
+    conn: sqlite3.Connection = Depends(get_db_dep),
+):
+    """
+    根据当前技术栈推荐“下一步想学”的技术：与技术栈共现（在用 → 想用但未用）最显著的 item。
+    输入组合太多，响应不进缓存；打分在内存中的稀疏矩阵上完成，单次只需几毫秒。
+    """
+    try:
+        stack = [parse_condition(spec) for spec in have]
+        target_dim = validate_dimension(dimension) if dimension is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    sync_cooccurrence_store(data_version.current(conn))
+    try:
+        if year is None:
+            year = latest_cooccurrence_year(conn)
+            if year is None:
+                raise CooccurrenceNotBuilt()
+        result = recommend_next(conn, year, stack, k, target_dim)
+    except CooccurrenceNotBuilt:
+        raise HTTPException(status_code=404, detail=COOCCURRENCE_NOT_BUILT_DETAIL)
+
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No co-occurrence data for year {year}")
+    return result
@@ -0,0 +1,122 @@
+﻿# app/api/routes/cohorts.py
+from __future__ import annotations
+
+from typing import List, Optional
+
+import sqlite3
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from ...models.cohort import CohortCount, CoUsageResponse
+from ...services.cohort_service import (
+    BitmapsNotBuilt,
+    count_cohort,
+    get_co_usage,
+    latest_bitmap_year,
+    parse_condition,
+)
+from ...services.response_cache import data_version, trend_response_cache
+from ...services.trend_service import validate_dimension
+from ..deps import get_db_dep
+from ..responses import cached_json_response
+
+router = APIRouter(
+    prefix="/cohorts",
+    tags=["cohorts"],
+)
+
+BITMAPS_NOT_BUILT_DETAIL = (
+    "Respondent bitmaps have not been built; rerun generate_usage_trend.py --bitmaps"
+)
+
+
+def _resolve_year(conn: sqlite3.Connection, year: Optional[int]) -> int:
+    if year is not None:
+        return year
+    latest = latest_bitmap_year(conn)
+    if latest is None:
+        raise HTTPException(status_code=404, detail=BITMAPS_NOT_BUILT_DETAIL)
+    return latest
+
+
+@router.get("/count", response_model=CohortCount)
+def get_cohort_count(
+    request: Request,
+    have: Optional[List[str]] = Query(
+        default=None,
+        description="在用条件，形如 维度:item，可重复，如 ?have=language:Rust&have=database:PostgreSQL",
+    ),
+    want: Optional[List[str]] = Query(
+        default=None,
+        description="想用条件，形如 维度:item，可重复",
+    ),
+    year: Optional[int] = Query(
+        default=None,
+        description="调查年份；缺省为最近一年",
+    ),
+    conn: sqlite3.Connection = Depends(get_db_dep),
+):
+    """
+    同时满足全部条件的受访者数（跨维度位图按位与）。
+    """
+    try:
+        have_conditions = [parse_condition(spec) for spec in have or []]
+        want_conditions = [parse_condition(spec) for spec in want or []]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not have_conditions and not want_conditions:
+        raise HTTPException(status_code=400, detail="At least one have= or want= condition is required")
+
+    version = data_version.current(conn)
+    cache_key = (version, "cohort-count", tuple(have_conditions), tuple(want_conditions), year)
+
+    cached = trend_response_cache.get(cache_key)
+    if cached is None:
+        try:
+            resolved_year = _resolve_year(conn, year)
+            result = count_cohort(conn, resolved_year, have_conditions, want_conditions)
+        except BitmapsNotBuilt:
+            raise HTTPException(status_code=404, detail=BITMAPS_NOT_BUILT_DETAIL)
+        cached = trend_response_cache.put(cache_key, result.model_dump_json().encode("utf-8"))
+
+    return cached_json_response(request, cached)
+
+
+@router.get("/co-usage", response_model=CoUsageResponse)
+def get_cohort_co_usage(
+    request: Request,
+    dimension: str = Query(description="cohort 条件所在维度，如 language"),
+    item: str = Query(description="cohort 条件的 item，如 Rust"),
+    target: str = Query(description="要统计的目标维度，如 database"),
+    kind: str = Query(default="have", pattern="^(have|want)$", description="cohort 条件：在用 / 想用"),
+    target_kind: str = Query(default="have", pattern="^(have|want)$", description="目标维度统计在用 / 想用"),
+    year: Optional[int] = Query(default=None, description="调查年份；缺省为最近一年"),
+    limit: int = Query(default=20, ge=1, le=200, description="返回的目标 item 数"),
+    conn: sqlite3.Connection = Depends(get_db_dep),
+):
+    """
+    “{item} 的使用者里，{target} 维度各 item 的使用情况”，如 Rust 使用者常用的数据库。
+    """
+    try:
+        dim = validate_dimension(dimension)
+        target_dim = validate_dimension(target)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    version = data_version.current(conn)
+    cache_key = (version, "co-usage", dim, item, kind, target_dim, target_kind, year, limit)
+
+    cached = trend_response_cache.get(cache_key)
+    if cached is None:
+        try:
+            resolved_year = _resolve_year(conn, year)
+            result = get_co_usage(conn, resolved_year, dim, item, kind, target_dim, target_kind, limit)
+        except BitmapsNotBuilt:
+            raise HTTPException(status_code=404, detail=BITMAPS_NOT_BUILT_DETAIL)
+        if result is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No respondents found for {dim}:{item} ({kind}) in {resolved_year}",
+            )
+        cached = trend_response_cache.put(cache_key, result.model_dump_json().encode("utf-8"))
+
+    return cached_json_response(request, cached)
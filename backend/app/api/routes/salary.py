@@ -0,0 +1,98 @@
+﻿# app/api/routes/salary.py
+from __future__ import annotations
+
+from typing import List, Optional
+
+import sqlite3
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from ...models.salary import SalaryResponse
+from ...services.response_cache import data_version, trend_response_cache
+from ...services.salary_service import (
+    SalaryNotBuilt,
+    get_salary_summary,
+    latest_salary_year,
+    make_salary_segment,
+)
+from ...services.trend_service import validate_dimension
+from ..deps import get_db_dep
+from ..responses import cached_json_response
+
+router = APIRouter(
+    prefix="/salary",
+    tags=["salary"],
+)
+
+SALARY_NOT_BUILT_DETAIL = (
+    "Salary sketches have not been built; rerun generate_usage_trend.py --salary"
+)
+
+
+@router.get("", response_model=SalaryResponse)
+def get_salary(
+    request: Request,
+    dimension: Optional[str] = Query(
+        default=None,
+        description="items 所在维度，如 language；只看全体薪资时可省略",
+    ),
+    items: Optional[List[str]] = Query(
+        default=None,
+        description="在用这些技术的受访者的薪资，如 ?items=Rust&items=Go；多个 item 时另给出各分布的加权并集",
+    ),
+    years: Optional[List[int]] = Query(
+        default=None,
+        description="合并的调查年份，可重复，如 ?years=2023&years=2024；缺省为最近一年",
+    ),
+    country: Optional[str] = Query(default=None, description="只看某个国家的受访者"),
+    years_code: Optional[str] = Query(
+        default=None,
+        description="只看某个编程年限分段：0-2 / 3-5 / 6-10 / 11-20 / 21+",
+    ),
+    dev_type: Optional[str] = Query(default=None, description="只看某类开发者"),
+    conn: sqlite3.Connection = Depends(get_db_dep),
+):
+    """
+    年薪（美元）的 p25 / 中位数 / p75 / p90：由构建时生成的分位数草图合并得出。
+    country / years_code / dev_type 最多指定一个。
+
+    多个 item 时 combined 是各 item 薪资分布按样本数加权的并集，不是“在用其中任一 item 的受访者”：
+    同时在用几个 item 的受访者会按 item 各计一次。
+    """
+    try:
+        dim = validate_dimension(dimension) if dimension is not None else None
+        segment = make_salary_segment(country, years_code, dev_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if items and dim is None:
+        raise HTTPException(status_code=400, detail="dimension is required when items are given")
+
+    version = data_version.current(conn)
+    cache_key = (
+        version,
+        "salary",
+        dim,
+        tuple(sorted(set(items or []))),
+        tuple(sorted(set(years or []))),
+        segment,
+    )
+
+    cached = trend_response_cache.get(cache_key)
+    if cached is None:
+        try:
+            target_years = years
+            if not target_years:
+                latest = latest_salary_year(conn)
+                if latest is None:
+                    raise SalaryNotBuilt()
+                target_years = [latest]
+            result = get_salary_summary(conn, target_years, dim, items or [], segment)
+        except SalaryNotBuilt:
+            raise HTTPException(status_code=404, detail=SALARY_NOT_BUILT_DETAIL)
+        if result.overall.count == 0:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No salary data for years {result.years} in segment {list(segment)}",
+            )
+        cached = trend_response_cache.put(cache_key, result.model_dump_json().encode("utf-8"))
+
+    return cached_json_response(request, cached)
@@ -1,29 +1,139 @@
 ﻿# app/api/routes/trends.py
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 
 import sqlite3
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 
-from ...models.trend import TrendResponse
+from ...models.trend import (
+    ColumnarTrendResponse,
+    ForecastResponse,
+    LeaderBoard,
+    RankingPage,
+    SegmentCatalog,
+    TrendResponse,
+)
+from ...services.response_cache import CachedResponse, data_version, trend_response_cache
 from ...services.trend_service import (
     DIMENSION_TABLES,
+    Segment,
+    get_loaded_matrix,
+    get_forecast_payload,
+    get_leader_board,
+    get_precomputed_items_payload,
+    get_precomputed_top_payload,
+    get_ranking_page,
+    get_segment_catalog,
+    get_segment_top_items,
+    get_segment_trends_for_items,
     get_top_items_for_dimension,
     get_trends_for_items,
+    make_segment,
+    sync_trend_store,
+    to_columnar,
     validate_dimension,
+    validate_metric,
+    validate_sort_key,
 )
 from ..deps import get_db_dep
+from ..responses import cached_json_response
 
 router = APIRouter(
     prefix="/trends",
     tags=["trends"],
 )
 
+# 客户端也可以通过 Accept 头选择列式响应
+COLUMNAR_MEDIA_TYPE = "application/vnd.devtrend.columnar+json"
+RESPONSE_FORMATS = ("rows", "columnar")
+
+FORMAT_QUERY_DESCRIPTION = (
+    "响应格式：rows（默认，逐点对象）或 columnar（共享 years / base_count 的列式数组）；"
+    f"也可以发送 Accept: {COLUMNAR_MEDIA_TYPE}"
+)
+
+# 趋势接口按 format 返回两种结构之一：不设 response_model（路由直接返回已序列化的字节），
+# 只在 OpenAPI 中把两种结构都列出来
+TRENDS_RESPONSES = {
+    200: {
+        "model": Union[TrendResponse, ColumnarTrendResponse],
+        "description": "format=rows 时为 TrendResponse，format=columnar 时为 ColumnarTrendResponse",
+    },
+}
+BATCH_TRENDS_RESPONSES = {
+    200: {
+        "model": Dict[str, Union[TrendResponse, ColumnarTrendResponse]],
+        "description": "{dimension: TrendResponse}；format=columnar 时各维度为 ColumnarTrendResponse",
+    },
+}
+
+
+@router.get("", response_model=None, responses=BATCH_TRENDS_RESPONSES)
+def get_trends_batch(
+    request: Request,
+    dimensions: Optional[List[str]] = Query(
+        default=None,
+        description="要查询的维度，逗号分隔或重复传参，如 ?dimensions=language,database；缺省为全部维度",
+    ),
+    limit: int = Query(
+        default=5,
+        ge=1,
+        le=50,
+        description="每个维度使用最近一年 have_count 排名前 limit 的 item",
+    ),
+    response_format: Optional[str] = Query(
+        default=None,
+        alias="format",
+        description=FORMAT_QUERY_DESCRIPTION,
+    ),
+    conn: sqlite3.Connection = Depends(get_db_dep),
+):
+    """
+    一次请求、一条连接返回多个维度的默认趋势：{dimension: TrendResponse}。
+    没有数据的维度不出现在结果中。
+    """
+    fmt = _negotiate_format(request, response_format)
+
+    # 1. 解析并校验 dimensions（去重、保持顺序）
+    if dimensions:
+        requested = [d.strip() for value in dimensions for d in value.split(",") if d.strip()]
+    else:
+        requested = list(DIMENSION_TABLES.keys())
 
-@router.get("/{dimension}", response_model=TrendResponse)
+    dims: List[str] = []
+    for dimension in requested:
+        try:
+            dim = validate_dimension(dimension)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if dim not in dims:
+            dims.append(dim)
+
+    # 2. 整体响应同样按数据版本缓存；未命中时逐维度复用单维度的缓存结果拼接
+    version = data_version.current(conn)
+    cache_key = (version, "batch", tuple(dims), limit, fmt)
+
+    cached = trend_response_cache.get(cache_key)
+    if cached is None:
+        parts = []
+        for dim in dims:
+            try:
+                part = _get_cached_trends(conn, version, dim, None, limit, fmt)
+            except HTTPException as e:
+                if e.status_code == 404:
+                    continue
+                raise
+            parts.append(f'"{dim}":'.encode("utf-8") + part.body)
+        cached = trend_response_cache.put(cache_key, b"{" + b",".join(parts) + b"}")
+
+    return cached_json_response(request, cached)
+
+
+@router.get("/{dimension}", response_model=None, responses=TRENDS_RESPONSES)
 def get_trends(
     dimension: str,
+    request: Request,
     items: Optional[List[str]] = Query(
         default=None,
         description="要查看的技术名称，如 ?items=Python&items=JavaScript",
@@ -34,17 +144,285 @@ def get_trends(
         le=50,
         description="当未指定 items 时，使用最近一年 have_count 排名前 limit 的 item",
     ),
+    response_format: Optional[str] = Query(
+        default=None,
+        alias="format",
+        description=FORMAT_QUERY_DESCRIPTION,
+    ),
+    country: Optional[str] = Query(
+        default=None,
+        description="只统计某个国家的受访者，如 ?country=Germany（可选值见 /{dimension}/segments）",
+    ),
+    years_code: Optional[str] = Query(
+        default=None,
+        description="只统计某个编程年限分段的受访者：0-2 / 3-5 / 6-10 / 11-20 / 21+",
+    ),
+    dev_type: Optional[str] = Query(
+        default=None,
+        description="只统计某类开发者，如 ?dev_type=Developer, back-end",
+    ),
     conn: sqlite3.Connection = Depends(get_db_dep),
 ):
-    # 1. 校验 dimension
+    # 1. 校验 dimension、分群筛选与响应格式
     try:
         dim = validate_dimension(dimension)
+        segment = make_segment(country, years_code, dev_type)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    fmt = _negotiate_format(request, response_format)
+
+    # 2. 查响应缓存，未命中时查询并序列化
+    version = data_version.current(conn)
+    cached = _get_cached_trends(conn, version, dim, items, limit, fmt, segment)
 
-    table_name = DIMENSION_TABLES[dim]
+    return cached_json_response(request, cached)
+
+
+@router.get("/{dimension}/ranking", response_model=RankingPage)
+def get_ranking(
+    dimension: str,
+    request: Request,
+    sort: str = Query(
+        default="have_ratio",
+        description="排序键：have_ratio / want_ratio / growth / latest_year（均为降序）",
+    ),
+    after: int = Query(
+        default=0,
+        ge=0,
+        description="keyset 游标：上一页返回的 next_cursor；首页为 0",
+    ),
+    page_size: int = Query(
+        default=50,
+        ge=1,
+        le=200,
+        description="每页 item 数",
+    ),
+    conn: sqlite3.Connection = Depends(get_db_dep),
+):
+    """
+    维度内全部 item 的排名列表，按构建时预计算的名次分页。
+    """
+    try:
+        dim = validate_dimension(dimension)
+        sort_key = validate_sort_key(sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    version = data_version.current(conn)
+    cache_key = (version, dim, "ranking", sort_key, after, page_size)
+
+    cached = trend_response_cache.get(cache_key)
+    if cached is None:
+        page = get_ranking_page(conn, dim, sort_key, after, page_size)
+        if page is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Rankings have not been built; rerun generate_usage_trend.py",
+            )
+        cached = trend_response_cache.put(cache_key, page.model_dump_json().encode("utf-8"))
+
+    return cached_json_response(request, cached)
+
+
+@router.get("/{dimension}/leaders", response_model=LeaderBoard)
+def get_leaders(
+    dimension: str,
+    request: Request,
+    metric: str = Query(
+        default="yoy_delta",
+        description="指标：yoy_delta（使用率同比变化）/ yoy_growth（同比变化幅度）/ cagr（年复合增长率）/ want_gap（期望率 - 使用率）",
+    ),
+    year: Optional[int] = Query(
+        default=None,
+        description="榜单年份；缺省为最近一年",
+    ),
+    order: str = Query(
+        default="desc",
+        pattern="^(asc|desc)$",
+        description="desc：指标值最大的在前（如升得最快）；asc：最小的在前（如跌得最快）",
+    ),
+    limit: int = Query(
+        default=10,
+        ge=1,
+        le=100,
+        description="返回的名次数",
+    ),
+    conn: sqlite3.Connection = Depends(get_db_dep),
+):
+    """
+    维度内某一年按增长 / 势头指标排出的榜单，直接读取构建时预计算的名次。
+    """
+    try:
+        dim = validate_dimension(dimension)
+        metric_key = validate_metric(metric)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    version = data_version.current(conn)
+    cache_key = (version, dim, "leaders", metric_key, year, order, limit)
+
+    cached = trend_response_cache.get(cache_key)
+    if cached is None:
+        board = get_leader_board(conn, dim, metric_key, year, order, limit)
+        if board is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No leader board for dimension: {dim}, metric: {metric_key}, year: {year}",
+            )
+        cached = trend_response_cache.put(cache_key, board.model_dump_json().encode("utf-8"))
 
-    # 2. 决定最终要查询的 items 列表
+    return cached_json_response(request, cached)
+
+
+@router.get("/{dimension}/forecast", response_model=ForecastResponse)
+def get_forecast(
+    dimension: str,
+    request: Request,
+    items: Optional[List[str]] = Query(
+        default=None,
+        description="要预测的技术名称，如 ?items=Python&items=Rust",
+    ),
+    limit: int = Query(
+        default=5,
+        ge=1,
+        le=50,
+        description="当未指定 items 时，预测最近一年 have_count 排名前 limit 的 item",
+    ),
+    conn: sqlite3.Connection = Depends(get_db_dep),
+):
+    """
+    未来几年的使用率 / 期望率预测（含预测区间），直接读取构建时批量拟合的结果。
+    """
+    try:
+        dim = validate_dimension(dimension)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    version = data_version.current(conn)
+    if items and len(items) > 0:
+        cache_key = (version, dim, "forecast", tuple(sorted(set(items))), None)
+    else:
+        cache_key = (version, dim, "forecast", None, limit)
+
+    cached = trend_response_cache.get(cache_key)
+    if cached is None:
+        sync_trend_store(conn, version)
+        if items and len(items) > 0:
+            target_items = items
+        else:
+            target_items = get_top_items_for_dimension(conn, DIMENSION_TABLES[dim], limit)
+
+        payload = get_forecast_payload(conn, dim, target_items)
+        if payload is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No forecast found for dimension: {dim}",
+            )
+        cached = trend_response_cache.put(cache_key, payload)
+
+    return cached_json_response(request, cached)
+
+
+@router.get("/{dimension}/segments", response_model=SegmentCatalog)
+def get_segments(
+    dimension: str,
+    request: Request,
+    conn: sqlite3.Connection = Depends(get_db_dep),
+):
+    """
+    /{dimension} 可用的分群筛选取值（country / years_code / dev_type）及各自的受访者数。
+    """
+    try:
+        dim = validate_dimension(dimension)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    version = data_version.current(conn)
+    cache_key = (version, dim, "segments")
+
+    cached = trend_response_cache.get(cache_key)
+    if cached is None:
+        catalog = get_segment_catalog(conn, dim)
+        if catalog is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Segment cube has not been built; rerun generate_usage_trend.py --segments",
+            )
+        cached = trend_response_cache.put(cache_key, catalog.model_dump_json().encode("utf-8"))
+
+    return cached_json_response(request, cached)
+
+
+def _negotiate_format(request: Request, response_format: Optional[str]) -> str:
+    """?format= 优先；未指定时看 Accept 头是否要求列式格式。"""
+    if response_format is not None:
+        fmt = response_format.lower()
+        if fmt not in RESPONSE_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid format: {response_format}. Must be one of {list(RESPONSE_FORMATS)}",
+            )
+        return fmt
+
+    if COLUMNAR_MEDIA_TYPE in request.headers.get("accept", ""):
+        return "columnar"
+    return "rows"
+
+
+def _get_cached_trends(
+    conn: sqlite3.Connection,
+    version: str,
+    dim: str,
+    items: Optional[List[str]],
+    limit: int,
+    fmt: str = "rows",
+    segment: Optional[Segment] = None,
+) -> CachedResponse:
+    """
+    按 (数据版本, 维度, 排序去重后的 items, limit, 格式, 分群) 取缓存的单维度响应，未命中时生成并写入缓存。
+    指定 items 时 limit 不起作用，不参与 key。
+    缓存未命中通常意味着数据版本刚变化，先让内存中的趋势数据跟上。
+    """
+    if items and len(items) > 0:
+        cache_key = (version, dim, tuple(sorted(set(items))), None, fmt, segment)
+    else:
+        cache_key = (version, dim, None, limit, fmt, segment)
+
+    cached = trend_response_cache.get(cache_key)
+    if cached is None:
+        sync_trend_store(conn, version)
+        body = _build_trends_body(conn, dim, DIMENSION_TABLES[dim], items, limit, fmt, segment)
+        cached = trend_response_cache.put(cache_key, body)
+    return cached
+
+
+def _build_trends_body(
+    conn: sqlite3.Connection,
+    dim: str,
+    table_name: str,
+    items: Optional[List[str]],
+    limit: int,
+    fmt: str = "rows",
+    segment: Optional[Segment] = None,
+) -> bytes:
+    """
+    查询并序列化一次趋势响应（缓存未命中时调用）。
+    汇总表已常驻内存时直接由内存数据生成；否则优先使用构建时预生成的 JSON（仅逐点格式），
+    都没有时才实时查库并经 pydantic 序列化。
+    带分群筛选时改由分群立方体（segment_usage_trend）计算。
+    """
+    if segment is not None:
+        return _build_segment_trends_body(conn, dim, items, limit, fmt, segment)
+
+    if fmt == "rows" and get_loaded_matrix(table_name) is None:
+        if items and len(items) > 0:
+            payload = get_precomputed_items_payload(conn, dim, items)
+        else:
+            payload = get_precomputed_top_payload(conn, dim, limit)
+        if payload is not None:
+            return payload
+
+    # 决定最终要查询的 items 列表
     if items and len(items) > 0:
         target_items = items
     else:
@@ -55,7 +433,7 @@ def get_trends(
                 detail=f"No data found for dimension: {dim}",
             )
 
-    # 3. 查询并计算趋势
+    # 查询并计算趋势
     trends = get_trends_for_items(conn, table_name, target_items)
     if not trends:
         raise HTTPException(
@@ -63,4 +441,39 @@ def get_trends(
             detail=f"No trend data found for items: {target_items}",
         )
 
-    return TrendResponse(dimension=dim, items=trends)
+    return _serialize_trends(dim, trends, fmt)
+
+
+def _build_segment_trends_body(
+    conn: sqlite3.Connection,
+    dim: str,
+    items: Optional[List[str]],
+    limit: int,
+    fmt: str,
+    segment: Segment,
+) -> bytes:
+    """分群内的趋势响应：top N 排名与各年比例都只在该分群的受访者中计算。"""
+    if items and len(items) > 0:
+        target_items = items
+    else:
+        target_items = get_segment_top_items(conn, dim, segment, limit)
+        if not target_items:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No data found for dimension: {dim}, segment: {list(segment)}",
+            )
+
+    trends = get_segment_trends_for_items(conn, dim, segment, target_items)
+    if not trends:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No trend data found for items: {target_items}, segment: {list(segment)}",
+        )
+
+    return _serialize_trends(dim, trends, fmt)
+
+
+def _serialize_trends(dim: str, trends: list, fmt: str) -> bytes:
+    if fmt == "columnar":
+        return to_columnar(dim, trends).model_dump_json().encode("utf-8")
+    return TrendResponse(dimension=dim, items=trends).model_dump_json().encode("utf-8")
@@ -28,6 +28,19 @@ class Settings:
             project_root = app_dir.parent.parent  # root
             self.DB_PATH = project_root / "data" / "devtrend.db"
 
+        # 只读连接池：池中最多保留的空闲连接数
+        self.DB_POOL_SIZE: int = int(os.getenv("DEVTREND_DB_POOL_SIZE", "8"))
+        # 只读连接的 PRAGMA：mmap 大小（字节）、页缓存大小（KiB）、语句缓存条数
+        self.DB_MMAP_SIZE: int = 256 * 1024 * 1024
+        self.DB_CACHE_SIZE_KIB: int = 64 * 1024
+        self.DB_CACHED_STATEMENTS: int = 256
+
+        # 趋势接口的进程内响应缓存（LRU）最多保留的条目数
+        self.RESPONSE_CACHE_SIZE: int = int(os.getenv("DEVTREND_RESPONSE_CACHE_SIZE", "256"))
+
+        # 响应压缩：小于该字节数的响应不压缩
+        self.COMPRESSION_MIN_SIZE: int = 1024
+
         # CORS 允许的前端域名（按需修改）
         self.BACKEND_CORS_ORIGINS: List[str] = [
             "http://localhost:3000",
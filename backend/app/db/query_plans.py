@@ -0,0 +1,216 @@
+﻿# backend/app/db/query_plans.py
+"""
+查询计划检查：对服务端使用的每一条 SQL 执行 EXPLAIN QUERY PLAN，
+发现全表扫描（SCAN）或临时排序（USE TEMP B-TREE）时报告出来。
+
+汇总表的索引由构建脚本创建（见 data_processing/static/generate_usage_trend.py
+中的 ensure_summary_indexes）；改动查询语句或索引之后运行一次：
+
+    python -m backend.app.db.query_plans [--db data/devtrend.db]
+
+有问题时以非零状态码退出。
+"""
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Iterator, List, Sequence, Tuple
+
+from ..core.config import settings
+from ..services.advice_service import (
+    COOCCURRENCE_ITEM_TABLE,
+    COOCCURRENCE_ITEMS_SQL,
+    COOCCURRENCE_PMI_SQL,
+    COOCCURRENCE_TABLE,
+    LATEST_COOCCURRENCE_YEAR_SQL,
+)
+from ..services.cohort_service import (
+    BITMAP_SQL,
+    BITMAP_TABLE,
+    DIMENSION_BITMAPS_SQL,
+    LATEST_BITMAP_YEAR_SQL,
+)
+from ..services.response_cache import BUILD_META_TABLE
+from ..services.salary_service import LATEST_SALARY_YEAR_SQL, SALARY_SKETCHES_SQL, SALARY_TABLE
+from ..services.trend_service import (
+    DIMENSION_TABLES,
+    FORECAST_FRAGMENTS_SQL,
+    FORECAST_TABLE,
+    FRAGMENT_TABLE,
+    ITEM_FRAGMENTS_SQL,
+    ITEM_TRENDS_SQL,
+    LEADER_LATEST_YEAR_SQL,
+    LEADER_PAGE_SQL,
+    LEADER_TABLE,
+    LEADER_TOTAL_SQL,
+    MAX_YEAR_SQL,
+    PAYLOAD_TABLE,
+    RANKING_PAGE_SQL,
+    RANKING_TABLE,
+    RANKING_TOTAL_SQL,
+    SEGMENT_CATALOG_SQL,
+    SEGMENT_CATALOG_TABLE,
+    SEGMENT_ITEM_TRENDS_SQL,
+    SEGMENT_MAX_YEAR_SQL,
+    SEGMENT_TABLE,
+    SEGMENT_TOP_ITEMS_SQL,
+    SEGMENT_TOP_THRESHOLD_SQL,
+    TOP_HAVE_THRESHOLD_SQL,
+    TOP_ITEMS_SQL,
+    TOP_PAYLOAD_SQL,
+)
+
+# 计划中出现这些片段即视为退化
+BAD_PLAN_MARKERS = ("SCAN ", "USE TEMP B-TREE")
+
+# EXPLAIN 时 IN 列表使用的占位符个数（与前端一次最多选择的条目数同量级）
+SAMPLE_IN_SIZE = 5
+
+
+def table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (table,),
+    ).fetchone()
+    return row is not None
+
+
+def service_queries(conn: sqlite3.Connection) -> Iterator[Tuple[str, str, Sequence]]:
+    """
+    生成 (名称, SQL, 参数) 三元组，覆盖服务端的全部查询。
+    参数只用于 EXPLAIN，取值不影响计划；item 在库中都是整数 item_id。
+    （启动 / 数据版本变化时整表读入内存的 item 字典与汇总表不在检查范围内。）
+    """
+    placeholders = ",".join("?" for _ in range(SAMPLE_IN_SIZE))
+    items = list(range(1, SAMPLE_IN_SIZE + 1))
+
+    for dim, table in DIMENSION_TABLES.items():
+        if not table_exists(conn, table):
+            continue
+        yield f"{dim}: max year", MAX_YEAR_SQL.format(table=table), ()
+        yield f"{dim}: top threshold", TOP_HAVE_THRESHOLD_SQL.format(table=table), (2024, 9)
+        yield f"{dim}: top items", TOP_ITEMS_SQL.format(table=table), (2024, 100)
+        yield (
+            f"{dim}: item trends",
+            ITEM_TRENDS_SQL.format(table=table, placeholders=placeholders),
+            items,
+        )
+
+    if table_exists(conn, PAYLOAD_TABLE):
+        yield "precomputed top payload", TOP_PAYLOAD_SQL, ("language", 10)
+    if table_exists(conn, FRAGMENT_TABLE):
+        yield (
+            "precomputed item fragments",
+            ITEM_FRAGMENTS_SQL.format(placeholders=placeholders),
+            ["language", *items],
+        )
+    if table_exists(conn, RANKING_TABLE):
+        yield "ranking page", RANKING_PAGE_SQL, ("language", "have_ratio", 0, 51)
+        yield "ranking total", RANKING_TOTAL_SQL, ("language", "have_ratio")
+    if table_exists(conn, FORECAST_TABLE):
+        yield (
+            "forecast fragments",
+            FORECAST_FRAGMENTS_SQL.format(placeholders=placeholders),
+            ["language", *items],
+        )
+    if table_exists(conn, LEADER_TABLE):
+        yield "leaders latest year", LEADER_LATEST_YEAR_SQL, ("language", "yoy_delta")
+        for direction in ("ASC", "DESC"):
+            yield (
+                f"leaders page ({direction})",
+                LEADER_PAGE_SQL.format(direction=direction),
+                ("language", "yoy_delta", 2024, 10),
+            )
+        yield "leaders total", LEADER_TOTAL_SQL, ("language", "yoy_delta", 2024)
+    if table_exists(conn, SEGMENT_TABLE):
+        segment = ("language", "Germany", "3-5", "*")
+        yield "segment max year", SEGMENT_MAX_YEAR_SQL, segment
+        yield "segment top threshold", SEGMENT_TOP_THRESHOLD_SQL, (*segment, 2024, 9)
+        yield "segment top items", SEGMENT_TOP_ITEMS_SQL, (*segment, 2024, 100)
+        yield (
+            "segment item trends",
+            SEGMENT_ITEM_TRENDS_SQL.format(placeholders=placeholders),
+            [*segment, *items],
+        )
+    if table_exists(conn, SEGMENT_CATALOG_TABLE):
+        yield "segment catalog", SEGMENT_CATALOG_SQL, ("language",)
+    if table_exists(conn, BITMAP_TABLE):
+        yield "bitmap", BITMAP_SQL, (2024, "language", "have", 1)
+        yield "dimension bitmaps", DIMENSION_BITMAPS_SQL, (2024, "database", "have")
+        yield "latest bitmap year", LATEST_BITMAP_YEAR_SQL, ()
+    if table_exists(conn, COOCCURRENCE_ITEM_TABLE):
+        yield "co-occurrence items", COOCCURRENCE_ITEMS_SQL, (2024,)
+        yield "latest co-occurrence year", LATEST_COOCCURRENCE_YEAR_SQL, ()
+    if table_exists(conn, COOCCURRENCE_TABLE):
+        yield "co-occurrence pmi", COOCCURRENCE_PMI_SQL, (2024,)
+    if table_exists(conn, SALARY_TABLE):
+        yield (
+            "salary sketches",
+            SALARY_SKETCHES_SQL.format(year_placeholders="?,?", item_placeholders=placeholders),
+            [2023, 2024, *items, "country", "Germany"],
+        )
+        yield "latest salary year", LATEST_SALARY_YEAR_SQL, ()
+    if table_exists(conn, BUILD_META_TABLE):
+        yield (
+            "data version",
+            f"SELECT value FROM {BUILD_META_TABLE} WHERE key = 'data_version'",
+            (),
+        )
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: Sequence) -> List[str]:
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", list(params)).fetchall()
+    # 行格式：(id, parent, notused, detail)
+    return [row[-1] for row in rows]
+
+
+def check_query_plans(conn: sqlite3.Connection) -> List[Tuple[str, List[str]]]:
+    """
+    返回计划退化的查询列表：[(名称, 计划明细), ...]；全部走索引时返回空列表。
+    """
+    problems = []
+    for name, sql, params in service_queries(conn):
+        plan = explain(conn, sql, params)
+        if any(marker in step for step in plan for marker in BAD_PLAN_MARKERS):
+            problems.append((name, plan))
+    return problems
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="检查服务端查询的 EXPLAIN QUERY PLAN")
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=settings.DB_PATH,
+        help="SQLite 数据库路径（默认使用应用配置中的 DB_PATH）",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="打印每条查询的计划")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    try:
+        if args.verbose:
+            for name, sql, params in service_queries(conn):
+                print(f"[{name}]")
+                for step in explain(conn, sql, params):
+                    print(f"    {step}")
+        problems = check_query_plans(conn)
+    finally:
+        conn.close()
+
+    if not problems:
+        print("所有服务端查询均命中索引。")
+        return 0
+
+    for name, plan in problems:
+        print(f"[退化] {name}")
+        for step in plan:
+            print(f"    {step}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,118 @@
 ﻿# backend/app/db/session.py
+import queue
 import sqlite3
-from typing import Generator
+import threading
+from typing import Generator, Optional
 
 from ..core.config import settings
 
 
-def get_db() -> Generator[sqlite3.Connection, None, None]:
-    if not settings.DB_PATH.exists():
-        raise RuntimeError(f"Database file not found: {settings.DB_PATH}")
+class ReadOnlyConnectionPool:
+    """
+    面向查询服务的只读 SQLite 连接池：连接在应用生命周期内复用，
+    页缓存、mmap 与已编译语句缓存都不会随请求结束而丢失。
+
+    连接按请求独占借出 / 归还（而不是绑定到线程）：
+    FastAPI 的同步依赖与路由函数可能运行在线程池的不同线程上，
+    按线程共享连接会让并发请求用到同一条连接。
+    """
+
+    def __init__(
+        self,
+        db_path,
+        max_idle: int = 8,
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size_kib: int = 64 * 1024,
+        cached_statements: int = 256,
+    ) -> None:
+        self.db_path = db_path
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.cached_statements = cached_statements
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self.db_path.exists():
+            raise RuntimeError(f"Database file not found: {self.db_path}")
+
+        conn = sqlite3.connect(
+            f"file:{self.db_path.as_posix()}?mode=ro",
+            uri=True,
+            timeout=5.0,              # 构建脚本写库时最多等待 5 秒
+            check_same_thread=False,  # 借出的连接可能在线程池的另一个线程上使用
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kib)}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """优先复用最近归还的连接（缓存最热），没有空闲连接时新建。"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """归还连接；池已关闭或空闲连接已满时直接关闭。"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._idle.put_nowait(conn)
+                    return
+                except queue.Full:
+                    pass
+        conn.close()
+
+    def close(self) -> None:
+        """关闭所有空闲连接（应用退出时调用）。"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
 
-    # 加一个 timeout，避免短时间多个连接时立刻报错
-    conn = sqlite3.connect(
-        settings.DB_PATH,
-        timeout=5.0,          # 等待最多 5 秒获得锁
-        check_same_thread=False,  # 允许多线程访问（FastAPI 默认多线程）
-    )
-    conn.row_factory = sqlite3.Row
+
+_pool: Optional[ReadOnlyConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ReadOnlyConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ReadOnlyConnectionPool(
+                    settings.DB_PATH,
+                    max_idle=settings.DB_POOL_SIZE,
+                    mmap_size=settings.DB_MMAP_SIZE,
+                    cache_size_kib=settings.DB_CACHE_SIZE_KIB,
+                    cached_statements=settings.DB_CACHED_STATEMENTS,
+                )
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_db() -> Generator[sqlite3.Connection, None, None]:
+    pool = get_pool()
+    conn = pool.acquire()
 
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
@@ -1,12 +1,50 @@
 ﻿# backend/app/main.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 from .api.routes import api_router
+from .core.config import settings
+from .db.session import close_pool, get_pool
+from .services.advice_service import warm_cooccurrence_store
+from .services.response_cache import data_version
+from .services.trend_service import sync_trend_store
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # 可选依赖：未安装时只做 gzip 压缩
+    BrotliMiddleware = None
+
+
+def preload_trend_store() -> None:
+    """启动时把所有汇总表及最近一年的共现矩阵读入内存；数据库还不存在时跳过，等首个请求再加载。"""
+    pool = get_pool()
+    try:
+        conn = pool.acquire()
+    except RuntimeError:
+        return
+    try:
+        version = data_version.current(conn)
+        sync_trend_store(conn, version)
+        warm_cooccurrence_store(conn, version)
+    finally:
+        pool.release(conn)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    preload_trend_store()
+    yield
+    # 应用退出时关闭连接池中的只读连接
+    close_pool()
+
 
 app = FastAPI(
     title="DevTrend API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # 根据你实际前端端口来，下面这几个都列上就很保险
@@ -25,6 +63,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩：客户端支持 br 时优先 Brotli（需安装 brotli-asgi），否则 gzip
+# 压缩在路由之后进行，同一响应会有多种字节表示，因此缓存响应只带弱 ETag（见 response_cache.make_etag）
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_fallback=True,
+    )
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
 app.include_router(api_router)
 
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+﻿# app/models/advice.py
+from __future__ import annotations
+
+from typing import List
+
+from pydantic import BaseModel
+
+
+class Recommendation(BaseModel):
+    dimension: str
+    item: str
+    score: float                # 与技术栈中各 item 的正 PMI 之和
+    support: int                # 技术栈中与它有显著共现的 item 数
+    next_ratio: float           # 全体受访者中“想用但未用”它的比例
+
+
+class AdviceResponse(BaseModel):
+    year: int
+    stack: List[str]            # 识别出的技术栈：维度:item
+    unknown: List[str]          # 该年矩阵中不存在的输入，不参与打分
+    items: List[Recommendation]
@@ -0,0 +1,33 @@
+﻿# app/models/cohort.py
+from __future__ import annotations
+
+from typing import List
+
+from pydantic import BaseModel
+
+
+class CohortCount(BaseModel):
+    year: int
+    have: List[str]             # 条件：维度:item，全部同时满足
+    want: List[str]
+    count: int                  # 满足全部条件的受访者数
+    base: int                   # 回答了所涉及全部维度的受访者数
+    ratio: float                # count / base
+
+
+class CoUsageEntry(BaseModel):
+    item: str
+    count: int                  # 同时满足 cohort 条件和该 item 的受访者数
+    share: float                # count / cohort 中回答了目标维度的人数
+    lift: float                 # share / 该 item 在全体中的占比；> 1 表示 cohort 中更常见
+
+
+class CoUsageResponse(BaseModel):
+    year: int
+    dimension: str
+    item: str
+    kind: str
+    target: str                 # 目标维度
+    target_kind: str
+    cohort_size: int            # cohort 中回答了目标维度的受访者数
+    items: List[CoUsageEntry]
@@ -0,0 +1,35 @@
+﻿# app/models/salary.py
+from __future__ import annotations
+
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class SalaryQuantiles(BaseModel):
+    count: int                  # 样本数（有年薪的受访者）
+    p25: Optional[float]        # 年薪（美元），样本为 0 时为 None
+    median: Optional[float]
+    p75: Optional[float]
+    p90: Optional[float]
+
+
+class ItemSalary(BaseModel):
+    item: str
+    count: int
+    p25: Optional[float]
+    median: Optional[float]
+    p75: Optional[float]
+    p90: Optional[float]
+
+
+class SalaryResponse(BaseModel):
+    years: List[int]            # 合并的调查年份
+    dimension: Optional[str]
+    segment: Optional[str]      # country / years_code / dev_type，不分群时为 None
+    segment_value: Optional[str]
+    overall: SalaryQuantiles    # 该分群内全体受访者
+    items: List[ItemSalary]     # 在用各 item 的受访者（各年份合并）
+    # 多个 item 时各 item 薪资分布的加权并集（按 item 样本数加权），不是“在用其中任一 item 的受访者”：
+    # 同时在用其中几个 item 的受访者按 item 各计一次，count 为各 item 样本数之和
+    combined: Optional[SalaryQuantiles]
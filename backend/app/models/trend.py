@@ -1,7 +1,7 @@
 ﻿# app/models/trend.py
 from __future__ import annotations
 
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -23,3 +23,92 @@ class ItemTrend(BaseModel):
 class TrendResponse(BaseModel):
     dimension: str
     items: List[ItemTrend]
+
+
+class SegmentValue(BaseModel):
+    value: str
+    respondents: int            # 各年份该取值的样本数之和
+
+
+class SegmentCatalog(BaseModel):
+    dimension: str
+    country: List[SegmentValue]
+    years_code: List[SegmentValue]
+    dev_type: List[SegmentValue]
+
+
+class ColumnarItemTrend(BaseModel):
+    """按列存放的单个 item：与 ColumnarTrendResponse.years 一一对应，该年没有数据时为 null。"""
+    item: str
+    have_count: List[Optional[int]]
+    want_count: List[Optional[int]]
+
+
+class ColumnarTrendResponse(BaseModel):
+    """
+    列式趋势响应（?format=columnar）：年份与每年的 base_count 只出现一次，
+    比例不再下发，由客户端按 have_count / base_count、want_count / base_count 计算。
+    """
+    dimension: str
+    years: List[int]
+    base_count: List[int]
+    items: List[ColumnarItemTrend]
+
+
+class RankedItem(BaseModel):
+    rank: int
+    item: str
+    value: Optional[float]      # 排序所用的值；该排序键下没有值时为 null（排在最后）
+    latest_year: int            # item 最后出现的年份
+    have_ratio: float           # latest_year 当年的使用率
+    want_ratio: float           # latest_year 当年的期望率
+    growth: Optional[float]     # 最近一年相对上一年的使用率变化
+
+
+class RankingPage(BaseModel):
+    dimension: str
+    sort: str
+    total: int
+    items: List[RankedItem]
+    next_cursor: Optional[int]  # 下一页请求带上 ?after=next_cursor；没有下一页时为 null
+
+
+class LeaderEntry(BaseModel):
+    rank: int                   # 按指标值降序的名次
+    item: str
+    value: float
+    have_ratio: float           # 该年的使用率
+    want_ratio: float           # 该年的期望率
+
+
+class LeaderBoard(BaseModel):
+    dimension: str
+    metric: str
+    year: int
+    order: str                  # desc：升得最快 / 差距最大；asc：反过来
+    total: int                  # 该年该指标下有值的 item 数
+    items: List[LeaderEntry]
+
+
+class ForecastPoint(BaseModel):
+    year: int
+    have_ratio: float
+    have_lower: float           # 预测区间下界
+    have_upper: float           # 预测区间上界
+    want_ratio: float
+    want_lower: float
+    want_upper: float
+
+
+class ItemForecast(BaseModel):
+    item: str
+    model: str                  # 拟合所用的模型，如 weighted_linear
+    confidence: float           # 预测区间的置信水平
+    have_slope: float           # 使用率每年的变化（拟合斜率）
+    want_slope: float
+    points: List[ForecastPoint]
+
+
+class ForecastResponse(BaseModel):
+    dimension: str
+    items: List[ItemForecast]
@@ -0,0 +1,114 @@
+﻿# app/services/advice_service.py
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import sqlite3
+
+from ..models.advice import AdviceResponse, Recommendation
+from .cooccurrence_store import CooccurrenceMatrix, cooccurrence_store
+from .item_dictionary import get_item_dictionary
+
+# 构建脚本生成的共现 / PMI 矩阵（见 data_processing/static/cooccurrence.py）
+COOCCURRENCE_TABLE = "cooccurrence_pmi"
+COOCCURRENCE_ITEM_TABLE = "cooccurrence_items"
+
+COOCCURRENCE_ITEMS_SQL = f"""
+    SELECT item_id, have_count, next_count, respondents
+    FROM {COOCCURRENCE_ITEM_TABLE}
+    WHERE year = ?
+    ORDER BY item_id ASC
+"""
+
+# 按主键顺序读出，行号即 CSR 中的顺序
+COOCCURRENCE_PMI_SQL = f"""
+    SELECT source_item_id, target_item_id, pmi
+    FROM {COOCCURRENCE_TABLE}
+    WHERE year = ?
+    ORDER BY source_item_id ASC, target_item_id ASC
+"""
+
+LATEST_COOCCURRENCE_YEAR_SQL = f"SELECT MAX(year) AS year FROM {COOCCURRENCE_ITEM_TABLE}"
+
+
+class CooccurrenceNotBuilt(LookupError):
+    """库中还没有共现矩阵（构建时未加 --cooccurrence）。"""
+
+
+def sync_cooccurrence_store(version: str) -> None:
+    """数据版本变化时丢弃已加载的矩阵。"""
+    cooccurrence_store.sync(version)
+
+
+def warm_cooccurrence_store(conn: sqlite3.Connection, version: str) -> None:
+    """预先加载最近一年的矩阵（启动时调用）；库中没有共现矩阵时什么也不做。"""
+    sync_cooccurrence_store(version)
+    try:
+        year = latest_cooccurrence_year(conn)
+        if year is not None:
+            cooccurrence_store.get(year, lambda y: load_cooccurrence_matrix(conn, y))
+    except CooccurrenceNotBuilt:
+        pass
+
+
+def latest_cooccurrence_year(conn: sqlite3.Connection) -> Optional[int]:
+    try:
+        row = conn.execute(LATEST_COOCCURRENCE_YEAR_SQL).fetchone()
+    except sqlite3.OperationalError:
+        raise CooccurrenceNotBuilt()
+    return row["year"] if row else None
+
+
+def load_cooccurrence_matrix(conn: sqlite3.Connection, year: int) -> Optional[CooccurrenceMatrix]:
+    """从库中读出某一年的矩阵；该年没有数据时返回 None。"""
+    try:
+        item_rows = conn.execute(COOCCURRENCE_ITEMS_SQL, (year,)).fetchall()
+        if not item_rows:
+            return None
+        pmi_rows = conn.execute(COOCCURRENCE_PMI_SQL, (year,)).fetchall()
+    except sqlite3.OperationalError:
+        raise CooccurrenceNotBuilt()
+    return CooccurrenceMatrix(item_rows, pmi_rows, get_item_dictionary(conn))
+
+
+def recommend_next(
+    conn: sqlite3.Connection,
+    year: int,
+    stack: List[Tuple[str, str]],
+    k: int,
+    dimension: Optional[str] = None,
+) -> Optional[AdviceResponse]:
+    """
+    给定当前技术栈（[(维度, item), ...]），返回“下一步最值得学”的 k 个 item。
+    得分 = 技术栈中各 item 到候选 item 的正 PMI 之和；该年没有矩阵时返回 None。
+    """
+    matrix = cooccurrence_store.get(year, lambda y: load_cooccurrence_matrix(conn, y))
+    if matrix is None:
+        return None
+
+    stack_ids: List[int] = []
+    unknown: List[str] = []
+    for dim, item in stack:
+        i = matrix.lookup(dim, item)
+        if i is None:
+            unknown.append(f"{dim}:{item}")
+        elif i not in stack_ids:
+            stack_ids.append(i)
+
+    items = []
+    for i, score, support in matrix.recommend(stack_ids, k, dimension):
+        dim, item = matrix.keys[i]
+        items.append(Recommendation(
+            dimension=dim,
+            item=item,
+            score=score,
+            support=support,
+            next_ratio=int(matrix.next_count[i]) / matrix.respondents if matrix.respondents else 0.0,
+        ))
+
+    return AdviceResponse(
+        year=year,
+        stack=[f"{dim}:{item}" for dim, item in (matrix.keys[i] for i in stack_ids)],
+        unknown=unknown,
+        items=items,
+    )
@@ -0,0 +1,171 @@
+﻿# app/services/cohort_service.py
+from __future__ import annotations
+
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import sqlite3
+
+from ..models.cohort import CohortCount, CoUsageEntry, CoUsageResponse
+from .item_dictionary import ALL_ITEMS_ID, get_item_dictionary
+from .trend_service import validate_dimension
+
+# 构建脚本生成的受访者成员位图（见 data_processing/static/respondent_bitmaps.py）
+BITMAP_TABLE = "respondent_bitmaps"
+BASE_KIND = "base"
+MEMBER_KINDS = ("have", "want")
+
+BITMAP_SQL = f"""
+    SELECT cardinality, bitmap
+    FROM {BITMAP_TABLE}
+    WHERE year = ? AND dimension = ? AND kind = ? AND item_id = ?
+"""
+
+DIMENSION_BITMAPS_SQL = f"""
+    SELECT item_id, cardinality, bitmap
+    FROM {BITMAP_TABLE}
+    WHERE year = ? AND dimension = ? AND kind = ?
+    ORDER BY item_id ASC
+"""
+
+LATEST_BITMAP_YEAR_SQL = f"SELECT MAX(year) AS year FROM {BITMAP_TABLE}"
+
+
+class BitmapsNotBuilt(LookupError):
+    """库中还没有位图表（构建时未加 --bitmaps）。"""
+
+
+def decode_bitmap(blob: bytes) -> int:
+    """位图解码为 Python 大整数：第 i 位即 rowid = i 的受访者，按位与 / bit_count 都在 C 层完成。"""
+    return int.from_bytes(zlib.decompress(blob), "little")
+
+
+def parse_condition(spec: str) -> Tuple[str, str]:
+    """解析 "维度:item" 形式的条件，如 "language:Rust"。"""
+    dimension, sep, item = spec.partition(":")
+    if not sep or not item.strip():
+        raise ValueError(f"Invalid condition: {spec}. Expected 'dimension:item'")
+    return validate_dimension(dimension.strip()), item.strip()
+
+
+def _fetch_bitmap(
+    conn: sqlite3.Connection,
+    year: int,
+    dimension: str,
+    kind: str,
+    item_id: Optional[int],
+) -> Optional[int]:
+    """item_id 为 None（字典中没有这个名称）时视为位图不存在。"""
+    if item_id is None:
+        return None
+    try:
+        row = conn.execute(BITMAP_SQL, (year, dimension, kind, item_id)).fetchone()
+    except sqlite3.OperationalError:
+        raise BitmapsNotBuilt()
+    return decode_bitmap(row["bitmap"]) if row else None
+
+
+def latest_bitmap_year(conn: sqlite3.Connection) -> Optional[int]:
+    try:
+        row = conn.execute(LATEST_BITMAP_YEAR_SQL).fetchone()
+    except sqlite3.OperationalError:
+        raise BitmapsNotBuilt()
+    return row["year"] if row else None
+
+
+def count_cohort(
+    conn: sqlite3.Connection,
+    year: int,
+    have: List[Tuple[str, str]],
+    want: List[Tuple[str, str]],
+) -> CohortCount:
+    """
+    满足全部条件（have 中每个 item 都在用、want 中每个 item 都想用）的受访者数。
+    分母为回答了所涉及全部维度的受访者；某个 item 当年没有人选时 count 为 0。
+    """
+    dictionary = get_item_dictionary(conn)
+    base: Optional[int] = None
+    for dimension in dict.fromkeys(dim for dim, _ in have + want):
+        bitmap = _fetch_bitmap(conn, year, dimension, BASE_KIND, ALL_ITEMS_ID) or 0
+        base = bitmap if base is None else base & bitmap
+
+    # 名称与 advice 一样忽略大小写匹配；回显时用字典中的规范名称
+    members = base or 0
+    labels: Dict[str, List[str]] = {"have": [], "want": []}
+    for kind, conditions in (("have", have), ("want", want)):
+        for dimension, item in conditions:
+            item_id = dictionary.lookup(dimension, item)
+            members &= _fetch_bitmap(conn, year, dimension, kind, item_id) or 0
+            name = dictionary.name_of(item_id) if item_id is not None else item
+            labels[kind].append(f"{dimension}:{name}")
+
+    base_count = (base or 0).bit_count()
+    count = members.bit_count()
+    return CohortCount(
+        year=year,
+        have=labels["have"],
+        want=labels["want"],
+        count=count,
+        base=base_count,
+        ratio=count / base_count if base_count > 0 else 0.0,
+    )
+
+
+def get_co_usage(
+    conn: sqlite3.Connection,
+    year: int,
+    dimension: str,
+    item: str,
+    kind: str,
+    target: str,
+    target_kind: str,
+    limit: int,
+) -> Optional[CoUsageResponse]:
+    """
+    “{dimension} 中 {kind} {item} 的受访者里，{target} 维度各 item 的 {target_kind} 情况”：
+    每个目标 item 一次位图按位与。按人数降序（同数按名称）取前 limit 个。
+    item 忽略大小写匹配；cohort 条件对应的位图不存在（未知 item 或当年没有人选）时返回 None。
+    """
+    dictionary = get_item_dictionary(conn)
+    item_id = dictionary.lookup(dimension, item)
+    cohort = _fetch_bitmap(conn, year, dimension, kind, item_id)
+    if cohort is None:
+        return None
+    item = dictionary.name_of(item_id)
+
+    # 只在回答了目标维度问题的人里比较，share 与 lift 的口径才一致
+    target_base = _fetch_bitmap(conn, year, target, BASE_KIND, ALL_ITEMS_ID) or 0
+    cohort &= target_base
+    cohort_size = cohort.bit_count()
+    base_size = target_base.bit_count()
+
+    rows = conn.execute(DIMENSION_BITMAPS_SQL, (year, target, target_kind)).fetchall()
+
+    entries: List[CoUsageEntry] = []
+    for row in rows:
+        if row["item_id"] == item_id and target_kind == kind:
+            continue
+        count = (cohort & decode_bitmap(row["bitmap"])).bit_count()
+        if count == 0:
+            continue
+        share = count / cohort_size if cohort_size > 0 else 0.0
+        overall = row["cardinality"] / base_size if base_size > 0 else 0.0
+        entries.append(CoUsageEntry(
+            item=dictionary.name_of(row["item_id"]),
+            count=count,
+            share=share,
+            lift=share / overall if overall > 0 else 0.0,
+        ))
+
+    entries.sort(key=lambda e: (-e.count, e.item))
+
+    return CoUsageResponse(
+        year=year,
+        dimension=dimension,
+        item=item,
+        kind=kind,
+        target=target,
+        target_kind=target_kind,
+        cohort_size=cohort_size,
+        items=entries[:limit],
+    )
@@ -0,0 +1,138 @@
+﻿# app/services/cooccurrence_store.py
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .item_dictionary import ItemDictionary
+
+Key = Tuple[str, str]  # (dimension, item)
+
+
+class CooccurrenceMatrix:
+    """
+    一年的正 PMI 稀疏矩阵，按 CSR 存放：行是“在用”的 item，列是“想用但未用”的 item。
+    矩阵内的 item 编号按 item_id 排序，与 cooccurrence_pmi 的主键顺序一致，
+    因此按主键顺序读出的行可以直接拼成 CSR，不需要再排序。
+
+    对一个技术栈打分就是稀疏矩阵 × 0/1 向量：把技术栈各行的非零元按列累加。
+    """
+
+    def __init__(self, item_rows, pmi_rows, dictionary: ItemDictionary) -> None:
+        self.keys: List[Key] = [dictionary.key_of(row["item_id"]) for row in item_rows]
+        id_index = {row["item_id"]: i for i, row in enumerate(item_rows)}
+        self.key_index: Dict[Key, int] = {key: i for i, key in enumerate(self.keys)}
+        # 技术栈输入大小写不敏感
+        self.folded_index: Dict[Key, int] = {
+            (dimension, item.casefold()): i for i, (dimension, item) in enumerate(self.keys)
+        }
+        self.respondents = item_rows[0]["respondents"] if item_rows else 0
+        self.next_count = np.array([row["next_count"] for row in item_rows], dtype=np.int64)
+
+        n = len(self.keys)
+        sources = np.array(
+            [id_index[row["source_item_id"]] for row in pmi_rows],
+            dtype=np.int64,
+        )
+        self.indices = np.array(
+            [id_index[row["target_item_id"]] for row in pmi_rows],
+            dtype=np.int64,
+        )
+        self.data = np.array([row["pmi"] for row in pmi_rows], dtype=np.float64)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=self.indptr[1:])
+
+        # 每个 item 按 (dimension, item) 排序后的名次，用于同分时按名称决定先后
+        self.key_rank = np.empty(n, dtype=np.int64)
+        self.key_rank[sorted(range(n), key=self.keys.__getitem__)] = np.arange(n)
+
+        self.dimension_masks: Dict[str, np.ndarray] = {}
+        dimensions = np.array([dimension for dimension, _ in self.keys])
+        for dimension in set(dimensions.tolist()):
+            self.dimension_masks[dimension] = dimensions == dimension
+
+    def lookup(self, dimension: str, item: str) -> Optional[int]:
+        i = self.key_index.get((dimension, item))
+        if i is None:
+            i = self.folded_index.get((dimension, item.casefold()))
+        return i
+
+    def recommend(
+        self,
+        stack: List[int],
+        k: int,
+        dimension: Optional[str] = None,
+    ) -> List[Tuple[int, float, int]]:
+        """
+        返回得分最高的 k 个 (item 编号, score, support)，按得分降序、名称升序；
+        技术栈本身的 item 不会被推荐。
+        """
+        n = len(self.keys)
+        if not stack or n == 0:
+            return []
+
+        spans = [np.arange(self.indptr[i], self.indptr[i + 1]) for i in stack]
+        nonzero = np.concatenate(spans)
+        columns = self.indices[nonzero]
+        scores = np.bincount(columns, weights=self.data[nonzero], minlength=n)
+        support = np.bincount(columns, minlength=n)
+
+        scores[stack] = 0.0
+        if dimension is not None:
+            mask = self.dimension_masks.get(dimension)
+            if mask is None:
+                return []
+            scores[~mask] = 0.0
+
+        # 先按得分降序、再按名称升序排好再截取前 k 个，第 k 名同分时结果也是确定的
+        candidates = np.flatnonzero(scores > 0)
+        order = np.lexsort((self.key_rank[candidates], -scores[candidates]))
+        ranked = candidates[order[:k]].tolist()
+        return [(i, float(scores[i]), int(support[i])) for i in ranked]
+
+
+class CooccurrenceStore:
+    """
+    常驻内存的共现矩阵，按年份惰性加载（一年的矩阵一次主键范围读取）。
+    数据版本（见 response_cache.DataVersionTracker）变化时全部丢弃，下次请求重新加载。
+    """
+
+    def __init__(self) -> None:
+        self.version: Optional[str] = None
+        self._years: Dict[int, CooccurrenceMatrix] = {}
+        self._lock = threading.Lock()
+
+    def sync(self, version: str) -> None:
+        if version == self.version:
+            return
+        with self._lock:
+            if version != self.version:
+                self._years = {}
+                self.version = version
+
+    def get(
+        self,
+        year: int,
+        loader: Callable[[int], Optional[CooccurrenceMatrix]],
+    ) -> Optional[CooccurrenceMatrix]:
+        """取某一年的矩阵，未加载时用 loader 读库（多个请求同时发现时只加载一次）。"""
+        matrix = self._years.get(year)
+        if matrix is not None:
+            return matrix
+        with self._lock:
+            matrix = self._years.get(year)
+            if matrix is None:
+                matrix = loader(year)
+                if matrix is not None:
+                    self._years = {**self._years, year: matrix}
+        return matrix
+
+    def clear(self) -> None:
+        with self._lock:
+            self._years = {}
+            self.version = None
+
+
+cooccurrence_store = CooccurrenceStore()
@@ -0,0 +1,103 @@
+﻿# app/services/item_dictionary.py
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import sqlite3
+
+from .response_cache import data_version
+
+# 构建脚本维护的 item 字典（见 data_processing/static/item_dictionary.py）：
+# 汇总表与各派生表都只存整数 item_id，名称只在这张表里出现一次
+ITEM_TABLE = "items"
+ALL_ITEMS_ID = 0  # 不对应任何 item，表示“该维度全体”
+
+ALL_ITEMS_SQL = f"SELECT id, dimension, name FROM {ITEM_TABLE}"
+
+Key = Tuple[str, str]  # (dimension, item)
+
+
+class ItemDictionary:
+    """
+    items 表的内存形态：请求里的 item 名称在这里一次性换成 item_id，
+    查询结果里的 item_id 再换回名称，SQL 中只出现整数比较。
+    """
+
+    def __init__(self, rows) -> None:
+        self.keys: Dict[int, Key] = {row["id"]: (row["dimension"], row["name"]) for row in rows}
+        self._ids: Dict[Key, int] = {key: item_id for item_id, key in self.keys.items()}
+        # 技术栈等用户输入大小写不敏感
+        self._folded: Dict[Key, int] = {
+            (dimension, name.casefold()): item_id
+            for item_id, (dimension, name) in sorted(self.keys.items())
+        }
+
+    def id_of(self, dimension: str, name: str) -> Optional[int]:
+        return self._ids.get((dimension, name))
+
+    def ids_of(self, dimension: str, names: Iterable[str]) -> List[int]:
+        """按名称查 item_id，去重，字典中没有的名称直接忽略。"""
+        ids = {self._ids.get((dimension, name)) for name in names}
+        ids.discard(None)
+        return sorted(ids)
+
+    def lookup(self, dimension: str, name: str) -> Optional[int]:
+        """先精确匹配，找不到时忽略大小写再查一次。"""
+        item_id = self._ids.get((dimension, name))
+        if item_id is None:
+            item_id = self._folded.get((dimension, name.casefold()))
+        return item_id
+
+    def name_of(self, item_id: int) -> str:
+        return self.keys[item_id][1]
+
+    def key_of(self, item_id: int) -> Key:
+        return self.keys[item_id]
+
+    def names_of(self, dimension: str) -> Dict[int, str]:
+        """某个维度的全部 {item_id: 名称}。"""
+        return {
+            item_id: name
+            for item_id, (dim, name) in self.keys.items()
+            if dim == dimension
+        }
+
+
+class ItemDictionaryStore:
+    """
+    常驻内存的 item 字典：数据版本（见 response_cache.DataVersionTracker）变化时整体重新读取。
+    库中还没有 items 表（旧库）时为空字典，按名称的查询都查不到结果。
+    """
+
+    def __init__(self) -> None:
+        self.version: Optional[str] = None
+        self._dictionary = ItemDictionary([])
+        self._lock = threading.Lock()
+
+    def get(self, conn: sqlite3.Connection, version: str) -> ItemDictionary:
+        """取当前版本的字典（多个请求同时发现版本变化时只读取一次）。"""
+        if version == self.version:
+            return self._dictionary
+        with self._lock:
+            if version != self.version:
+                try:
+                    rows = conn.execute(ALL_ITEMS_SQL).fetchall()
+                except sqlite3.OperationalError:
+                    rows = []
+                self._dictionary = ItemDictionary(rows)
+                self.version = version
+        return self._dictionary
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dictionary = ItemDictionary([])
+            self.version = None
+
+
+item_dictionary_store = ItemDictionaryStore()
+
+
+def get_item_dictionary(conn: sqlite3.Connection) -> ItemDictionary:
+    """当前数据版本的 item 字典（版本未变时只是一次 stat）。"""
+    return item_dictionary_store.get(conn, data_version.current(conn))
@@ -0,0 +1,116 @@
+﻿# app/services/response_cache.py
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Hashable, Optional, Tuple
+
+from ..core.config import settings
+
+BUILD_META_TABLE = "build_meta"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    """
+    弱 ETag：由未压缩的响应体内容决定。
+    同一份内容经压缩中间件会以 gzip / br / identity 等不同字节发出，强 ETag 只能标识其中一种，因此用弱 ETag。
+    """
+    return 'W/"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def _opaque_tag(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    判断请求头 If-None-Match 是否命中当前 ETag（支持逗号分隔的多个值与 *）。
+    按 RFC 9110 的弱比较：忽略 W/ 前缀，只比较引号内的值。
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or _opaque_tag(etag) in {_opaque_tag(tag) for tag in candidates}
+
+
+class ResponseCache:
+    """
+    线程安全的 LRU 响应缓存：key -> 已序列化的响应体 + ETag。
+    key 中应包含数据版本号，数据版本变化后旧条目不会再被命中。
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, body: bytes) -> CachedResponse:
+        entry = CachedResponse(body=body, etag=make_etag(body))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DataVersionTracker:
+    """
+    数据版本号：构建脚本每次改写汇总表都会递增 build_meta.data_version。
+
+    每次请求只 stat 一下数据库文件；文件 (mtime, size) 变化时才重新读取版本号。
+    旧库没有 build_meta 表时，退化为使用文件 (mtime, size) 本身。
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self._stat_key: Optional[Tuple[int, int]] = None
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def current(self, conn: sqlite3.Connection) -> str:
+        st = os.stat(self.db_path)
+        stat_key = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            if stat_key == self._stat_key and self._version is not None:
+                return self._version
+
+        try:
+            row = conn.execute(
+                f"SELECT value FROM {BUILD_META_TABLE} WHERE key = 'data_version'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        version = f"g{row[0]}" if row else f"m{stat_key[0]}-{stat_key[1]}"
+
+        with self._lock:
+            self._stat_key = stat_key
+            self._version = version
+        return version
+
+
+trend_response_cache = ResponseCache(settings.RESPONSE_CACHE_SIZE)
+data_version = DataVersionTracker(settings.DB_PATH)
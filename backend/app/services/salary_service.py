@@ -0,0 +1,182 @@
+﻿# app/services/salary_service.py
+from __future__ import annotations
+
+import math
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+import sqlite3
+
+from ..models.salary import ItemSalary, SalaryQuantiles, SalaryResponse
+from .item_dictionary import ALL_ITEMS_ID, get_item_dictionary
+from .trend_service import SEGMENT_ALL, SEGMENT_COLUMNS, make_segment
+
+# 构建脚本生成的薪资分位数草图（见 data_processing/static/salary_sketches.py）
+SALARY_TABLE = "salary_sketches"
+SALARY_ALL = "*"
+
+# 与 salary_sketches.RELATIVE_ACCURACY 保持一致：桶 i 的代表值为 2 * GAMMA^i / (GAMMA + 1)
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+
+SALARY_QUANTILES = (("p25", 0.25), ("median", 0.5), ("p75", 0.75), ("p90", 0.9))
+
+# {year_placeholders} / {item_placeholders} 为 IN 列表占位符；全体受访者的 item_id 为 ALL_ITEMS_ID
+SALARY_SKETCHES_SQL = f"""
+    SELECT year, item_id, count, sketch
+    FROM {SALARY_TABLE}
+    WHERE year IN ({{year_placeholders}})
+      AND item_id IN ({{item_placeholders}})
+      AND segment = ?
+      AND segment_value = ?
+"""
+
+LATEST_SALARY_YEAR_SQL = f"SELECT MAX(year) AS year FROM {SALARY_TABLE}"
+
+# (segment, segment_value)，不分群时两者都为 SALARY_ALL
+SalarySegment = Tuple[str, str]
+
+
+class SalaryNotBuilt(LookupError):
+    """库中还没有薪资草图（构建时未加 --salary）。"""
+
+
+class QuantileSketch:
+    """
+    对数分桶的分位数草图：{桶号: 计数}。合并即计数相加，分位数的相对误差不超过 RELATIVE_ACCURACY。
+    """
+
+    def __init__(self, buckets: Optional[Dict[int, int]] = None) -> None:
+        self.buckets: Dict[int, int] = dict(buckets or {})
+
+    @classmethod
+    def from_blob(cls, blob: bytes) -> "QuantileSketch":
+        values = array("i")
+        values.frombytes(zlib.decompress(blob))
+        if sys.byteorder == "big":
+            values.byteswap()
+        n = values[0]
+        indices = accumulate(values[1:1 + n])
+        return cls(dict(zip(indices, values[1 + n:])))
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets.values())
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * GAMMA ** index / (GAMMA + 1)
+        return None
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {name: self.quantile(q) for name, q in SALARY_QUANTILES}
+
+
+def make_salary_segment(
+    country: Optional[str],
+    years_code: Optional[str],
+    dev_type: Optional[str],
+) -> SalarySegment:
+    """草图只按单个分群列切分，因此最多只能指定一个筛选。"""
+    segment = make_segment(country, years_code, dev_type)
+    if segment is None:
+        return (SALARY_ALL, SALARY_ALL)
+
+    selected = [(name, value) for name, value in zip(SEGMENT_COLUMNS, segment) if value != SEGMENT_ALL]
+    if len(selected) > 1:
+        raise ValueError("Only one of country / years_code / dev_type can be set for salary queries")
+    return selected[0]
+
+
+def latest_salary_year(conn: sqlite3.Connection) -> Optional[int]:
+    try:
+        row = conn.execute(LATEST_SALARY_YEAR_SQL).fetchone()
+    except sqlite3.OperationalError:
+        raise SalaryNotBuilt()
+    return row["year"] if row else None
+
+
+def _load_sketches(
+    conn: sqlite3.Connection,
+    years: List[int],
+    item_ids: List[int],
+    segment: SalarySegment,
+) -> Dict[int, QuantileSketch]:
+    """读出并按 item 合并各年份的草图：{item_id: 合并后的草图}。"""
+    sql = SALARY_SKETCHES_SQL.format(
+        year_placeholders=",".join("?" for _ in years),
+        item_placeholders=",".join("?" for _ in item_ids),
+    )
+    try:
+        rows = conn.execute(sql, [*years, *item_ids, *segment]).fetchall()
+    except sqlite3.OperationalError:
+        raise SalaryNotBuilt()
+
+    merged: Dict[int, QuantileSketch] = {}
+    for row in rows:
+        merged.setdefault(row["item_id"], QuantileSketch()).merge(QuantileSketch.from_blob(row["sketch"]))
+    return merged
+
+
+def _quantiles(sketch: QuantileSketch) -> SalaryQuantiles:
+    return SalaryQuantiles(count=sketch.count, **sketch.summary())
+
+
+def get_salary_summary(
+    conn: sqlite3.Connection,
+    years: List[int],
+    dimension: Optional[str],
+    items: List[str],
+    segment: SalarySegment,
+) -> SalaryResponse:
+    """
+    某个分群在若干年份内的年薪分位数：全体受访者、在用各 item 的受访者，
+    以及多个 item 草图直接合并得到的加权并集（同时在用几个 item 的受访者按 item 各计一次）。
+    只读取草图，不访问原始调查表。
+    """
+    years = sorted(set(years))
+    overall = _load_sketches(conn, years, [ALL_ITEMS_ID], segment)
+    overall_sketch = overall.get(ALL_ITEMS_ID, QuantileSketch())
+
+    item_entries: List[ItemSalary] = []
+    combined: Optional[SalaryQuantiles] = None
+    if dimension is not None and items:
+        dictionary = get_item_dictionary(conn)
+        unique_items = sorted(set(items))
+        item_ids = {item: dictionary.id_of(dimension, item) for item in unique_items}
+        sketches = _load_sketches(
+            conn, years, [i for i in item_ids.values() if i is not None], segment
+        )
+        combined_sketch = QuantileSketch()
+        for item in unique_items:
+            sketch = sketches.get(item_ids[item], QuantileSketch())
+            combined_sketch.merge(sketch)
+            item_entries.append(ItemSalary(item=item, count=sketch.count, **sketch.summary()))
+        if len(unique_items) > 1:
+            combined = _quantiles(combined_sketch)
+
+    segment_name, segment_value = segment
+    return SalaryResponse(
+        years=years,
+        dimension=dimension,
+        segment=None if segment_name == SALARY_ALL else segment_name,
+        segment_value=None if segment_name == SALARY_ALL else segment_value,
+        overall=_quantiles(overall_sketch),
+        items=item_entries,
+        combined=combined,
+    )
@@ -1,11 +1,30 @@
 ﻿# app/services/trend_service.py
 from __future__ import annotations
 
-from typing import Dict, List
+import json
+from typing import Dict, List, Optional, Tuple
 
 import sqlite3
 
-from ..models.trend import ItemTrend, YearPoint
+from ..models.trend import (
+    ColumnarItemTrend,
+    ColumnarTrendResponse,
+    ItemTrend,
+    LeaderBoard,
+    LeaderEntry,
+    RankedItem,
+    RankingPage,
+    SegmentCatalog,
+    SegmentValue,
+    YearPoint,
+)
+from .item_dictionary import ItemDictionary, get_item_dictionary
+from .trend_store import DimensionMatrix, trend_store
+
+try:
+    import orjson
+except ImportError:  # 可选的快速 JSON 编码器
+    orjson = None
 
 # 维度到汇总表名的映射
 DIMENSION_TABLES: Dict[str, str] = {
@@ -17,9 +36,136 @@ DIMENSION_TABLES: Dict[str, str] = {
     "toolstech": "toolstech_usage_trend",
     "collabtools": "collabtools_usage_trend",
 }
+TABLE_DIMENSIONS: Dict[str, str] = {table: dim for dim, table in DIMENSION_TABLES.items()}
 
 MIN_YEARS_FOR_TREND = 3  # 至少出现 3 年才算有“趋势”
 
+# 构建脚本预生成的响应 JSON（见 data_processing/static/trend_payloads.py）
+PAYLOAD_TABLE = "trend_payloads"
+FRAGMENT_TABLE = "trend_item_fragments"
+# 构建脚本预计算的全量排名（见 data_processing/static/trend_rankings.py）
+RANKING_TABLE = "trend_rankings"
+RANKING_SORT_KEYS = ("have_ratio", "want_ratio", "growth", "latest_year")
+# 构建脚本预计算的逐年增长榜单（见 data_processing/static/trend_leaders.py）
+LEADER_TABLE = "trend_leaders"
+LEADER_METRICS = ("yoy_delta", "yoy_growth", "cagr", "want_gap")
+# 构建脚本预聚合的分群计数立方体（见 data_processing/static/segment_cube.py）
+SEGMENT_TABLE = "segment_usage_trend"
+SEGMENT_CATALOG_TABLE = "segment_catalog"
+SEGMENT_ALL = "*"  # 分群列不做筛选
+SEGMENT_COLUMNS = ("country", "years_code", "dev_type")
+YEARS_CODE_BUCKETS = ("0-2", "3-5", "6-10", "11-20", "21+")
+
+# (country, years_code, dev_type)，不筛选的列为 SEGMENT_ALL
+Segment = Tuple[str, str, str]
+
+# 构建脚本预计算的趋势预测（见 data_processing/static/trend_forecast.py）
+FORECAST_TABLE = "trend_forecasts"
+
+# 服务端查询语句：{table} 为汇总表名，{placeholders} 为 IN 列表占位符。
+# db/query_plans.py 会对这些语句做 EXPLAIN QUERY PLAN 检查，确保都走索引、不做全表扫描和临时排序。
+# item 在库中都是 items.id（见 item_dictionary.py），名称与 id 的转换在 Python 中完成。
+MAX_YEAR_SQL = "SELECT MAX(year) AS max_year FROM {table}"
+
+# top N 的门槛：最近一年第 N 名的 have_count
+TOP_HAVE_THRESHOLD_SQL = """
+    SELECT have_count
+    FROM {table}
+    WHERE year = ?
+    ORDER BY have_count DESC
+    LIMIT 1 OFFSET ?
+"""
+
+# 达到门槛的 item（同分的都取出来，再按名称决定名次）
+TOP_ITEMS_SQL = """
+    SELECT item_id, have_count
+    FROM {table}
+    WHERE year = ? AND have_count >= ?
+"""
+
+ITEM_TRENDS_SQL = """
+    SELECT year, item_id, have_count, want_count, base_count
+    FROM {table}
+    WHERE item_id IN ({placeholders})
+    ORDER BY item_id ASC, year ASC
+"""
+
+TOP_PAYLOAD_SQL = f"SELECT payload FROM {PAYLOAD_TABLE} WHERE dimension = ? AND top_n = ?"
+
+ITEM_FRAGMENTS_SQL = f"""
+    SELECT item_id, fragment
+    FROM {FRAGMENT_TABLE}
+    WHERE dimension = ? AND item_id IN ({{placeholders}})
+    ORDER BY item_id ASC
+"""
+
+RANKING_PAGE_SQL = f"""
+    SELECT rank, item_id, value, latest_year, have_ratio, want_ratio, growth
+    FROM {RANKING_TABLE}
+    WHERE dimension = ? AND sort_key = ? AND rank > ?
+    ORDER BY rank ASC
+    LIMIT ?
+"""
+
+RANKING_TOTAL_SQL = f"SELECT MAX(rank) AS total FROM {RANKING_TABLE} WHERE dimension = ? AND sort_key = ?"
+
+SEGMENT_FILTER = "dimension = ? AND country = ? AND years_code = ? AND dev_type = ?"
+
+SEGMENT_MAX_YEAR_SQL = f"SELECT MAX(year) AS max_year FROM {SEGMENT_TABLE} WHERE {SEGMENT_FILTER}"
+
+SEGMENT_TOP_THRESHOLD_SQL = f"""
+    SELECT have_count
+    FROM {SEGMENT_TABLE}
+    WHERE {SEGMENT_FILTER} AND year = ?
+    ORDER BY have_count DESC
+    LIMIT 1 OFFSET ?
+"""
+
+SEGMENT_TOP_ITEMS_SQL = f"""
+    SELECT item_id, have_count
+    FROM {SEGMENT_TABLE}
+    WHERE {SEGMENT_FILTER} AND year = ? AND have_count >= ?
+"""
+
+SEGMENT_ITEM_TRENDS_SQL = f"""
+    SELECT year, item_id, have_count, want_count, base_count
+    FROM {SEGMENT_TABLE}
+    WHERE {SEGMENT_FILTER} AND item_id IN ({{placeholders}})
+    ORDER BY item_id ASC, year ASC
+"""
+
+SEGMENT_CATALOG_SQL = f"""
+    SELECT segment, value, respondents
+    FROM {SEGMENT_CATALOG_TABLE}
+    WHERE dimension = ?
+    ORDER BY segment ASC, value ASC
+"""
+
+LEADER_LATEST_YEAR_SQL = f"SELECT MAX(year) AS year FROM {LEADER_TABLE} WHERE dimension = ? AND metric = ?"
+
+# {direction} 为 ASC（榜首）或 DESC（榜尾）
+LEADER_PAGE_SQL = f"""
+    SELECT rank, item_id, value, have_ratio, want_ratio
+    FROM {LEADER_TABLE}
+    WHERE dimension = ? AND metric = ? AND year = ?
+    ORDER BY rank {{direction}}
+    LIMIT ?
+"""
+
+FORECAST_FRAGMENTS_SQL = f"""
+    SELECT item_id, fragment
+    FROM {FORECAST_TABLE}
+    WHERE dimension = ? AND item_id IN ({{placeholders}})
+    ORDER BY item_id ASC
+"""
+
+LEADER_TOTAL_SQL = f"""
+    SELECT MAX(rank) AS total
+    FROM {LEADER_TABLE}
+    WHERE dimension = ? AND metric = ? AND year = ?
+"""
+
+
 def validate_dimension(dimension: str) -> str:
     dim = dimension.lower()
     if dim not in DIMENSION_TABLES:
@@ -30,6 +176,52 @@ def validate_dimension(dimension: str) -> str:
     return dim
 
 
+def validate_sort_key(sort_key: str) -> str:
+    key = sort_key.lower()
+    if key not in RANKING_SORT_KEYS:
+        raise ValueError(
+            f"Invalid sort: {key}. "
+            f"Must be one of {list(RANKING_SORT_KEYS)}"
+        )
+    return key
+
+
+def validate_metric(metric: str) -> str:
+    key = metric.lower()
+    if key not in LEADER_METRICS:
+        raise ValueError(
+            f"Invalid metric: {key}. "
+            f"Must be one of {list(LEADER_METRICS)}"
+        )
+    return key
+
+
+def make_segment(
+    country: Optional[str],
+    years_code: Optional[str],
+    dev_type: Optional[str],
+) -> Optional[Segment]:
+    """把分群筛选参数整理成 Segment；一个筛选都没有时返回 None（走全体数据）。"""
+    if years_code is not None and years_code not in YEARS_CODE_BUCKETS:
+        raise ValueError(
+            f"Invalid years_code: {years_code}. "
+            f"Must be one of {list(YEARS_CODE_BUCKETS)}"
+        )
+    if country is None and years_code is None and dev_type is None:
+        return None
+    return (country or SEGMENT_ALL, years_code or SEGMENT_ALL, dev_type or SEGMENT_ALL)
+
+
+def sync_trend_store(conn: sqlite3.Connection, version: str) -> None:
+    """让内存中的趋势数据跟上当前数据版本（版本未变时什么也不做）。"""
+    trend_store.sync(conn, version, list(DIMENSION_TABLES.values()))
+
+
+def get_loaded_matrix(table_name: str) -> Optional[DimensionMatrix]:
+    """该汇总表已常驻内存时返回其矩阵，否则返回 None。"""
+    return trend_store.get(table_name)
+
+
 def get_top_items_for_dimension(
     conn: sqlite3.Connection,
     table_name: str,
@@ -38,11 +230,16 @@ def get_top_items_for_dimension(
     """
     若前端没有指定 items，则：
     取该维度最近一年 have_count 排名前 limit 的 item 作为默认展示对象。
+    汇总表已加载到内存时直接取预排好的名次，不查库。
     """
+    matrix = trend_store.get(table_name)
+    if matrix is not None:
+        return matrix.top_items(limit)
+
     cur = conn.cursor()
 
     # 最近年份
-    cur.execute(f"SELECT MAX(year) AS max_year FROM {table_name}")
+    cur.execute(MAX_YEAR_SQL.format(table=table_name))
     row = cur.fetchone()
     if not row or row["max_year"] is None:
         return []
@@ -50,17 +247,19 @@ def get_top_items_for_dimension(
     last_year = row["max_year"]
 
     # 按最近一年 have_count 排序
-    cur.execute(
-        f"""
-        SELECT item
-        FROM {table_name}
-        WHERE year = ?
-        ORDER BY have_count DESC
-        LIMIT ?
-        """,
-        (last_year, limit),
+    cur.execute(TOP_HAVE_THRESHOLD_SQL.format(table=table_name), (last_year, limit - 1))
+    row = cur.fetchone()
+    threshold = row["have_count"] if row else 0
+    cur.execute(TOP_ITEMS_SQL.format(table=table_name), (last_year, threshold))
+    return _rank_top_items(cur.fetchall(), get_item_dictionary(conn), limit)
+
+
+def _rank_top_items(rows, dictionary: ItemDictionary, limit: int) -> List[str]:
+    """按 have_count 降序、名称升序取前 limit 个名称（名称不在索引里，同分的名次在这里决定）。"""
+    ranked = sorted(
+        (-row["have_count"], dictionary.name_of(row["item_id"])) for row in rows
     )
-    return [r["item"] for r in cur.fetchall()]
+    return [name for _, name in ranked[:limit]]
 
 
 def get_trends_for_items(
@@ -71,25 +270,34 @@ def get_trends_for_items(
     """
     针对给定的 item 列表，从汇总表中取出各年数据，并计算 have_ratio / want_ratio。
     只返回“至少在 MIN_YEARS_FOR_TREND 个年份出现过”的 item。
+    汇总表已加载到内存时直接从矩阵中取，不查库。
     """
     if not items:
         return []
 
-    placeholders = ",".join("?" for _ in items)
-    sql = f"""
-        SELECT year, item, have_count, want_count, base_count
-        FROM {table_name}
-        WHERE item IN ({placeholders})
-        ORDER BY item ASC, year ASC
-    """
+    matrix = trend_store.get(table_name)
+    if matrix is not None:
+        return matrix.trends_for_items(items, MIN_YEARS_FOR_TREND)
+
+    dictionary = get_item_dictionary(conn)
+    item_ids = dictionary.ids_of(TABLE_DIMENSIONS[table_name], items)
+    if not item_ids:
+        return []
+
+    placeholders = ",".join("?" for _ in item_ids)
+    sql = ITEM_TRENDS_SQL.format(table=table_name, placeholders=placeholders)
     cur = conn.cursor()
-    cur.execute(sql, items)
+    cur.execute(sql, item_ids)
+    return _rows_to_trends(cur.fetchall(), dictionary)
+
 
+def _rows_to_trends(rows, dictionary: ItemDictionary) -> List[ItemTrend]:
+    """把按 (item_id, year) 排好序的计数行转成按名称排序的 ItemTrend 列表，并过滤年份不足的 item。"""
     data_by_item: Dict[str, List[YearPoint]] = {}
 
-    for row in cur.fetchall():
+    for row in rows:
         year = row["year"]
-        item = row["item"]
+        item = dictionary.name_of(row["item_id"])
         have_count = row["have_count"]
         want_count = row["want_count"]
         base_count = row["base_count"]
@@ -113,10 +321,291 @@ def get_trends_for_items(
 
     trends: List[ItemTrend] = []
 
-    for item_name, points in data_by_item.items():
+    for item_name, points in sorted(data_by_item.items()):
         # 只保留“至少跨 MIN_YEARS_FOR_TREND 年”的 item
         if len(points) >= MIN_YEARS_FOR_TREND:
             trends.append(ItemTrend(item=item_name, points=points))
 
     return trends
 
+
+def get_segment_top_items(
+    conn: sqlite3.Connection,
+    dimension: str,
+    segment: Segment,
+    limit: int,
+) -> List[str]:
+    """分群内最近一年 have_count 排名前 limit 的 item；库中没有分群立方体时返回空列表。"""
+    try:
+        row = conn.execute(SEGMENT_MAX_YEAR_SQL, (dimension, *segment)).fetchone()
+        if not row or row["max_year"] is None:
+            return []
+        last_year = row["max_year"]
+        row = conn.execute(
+            SEGMENT_TOP_THRESHOLD_SQL, (dimension, *segment, last_year, limit - 1)
+        ).fetchone()
+        threshold = row["have_count"] if row else 0
+        rows = conn.execute(
+            SEGMENT_TOP_ITEMS_SQL, (dimension, *segment, last_year, threshold)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    return _rank_top_items(rows, get_item_dictionary(conn), limit)
+
+
+def get_segment_trends_for_items(
+    conn: sqlite3.Connection,
+    dimension: str,
+    segment: Segment,
+    items: List[str],
+) -> List[ItemTrend]:
+    """
+    与 get_trends_for_items 相同，但计数与 base_count 都取自指定分群。
+    样本太少的分群在构建时未落库，此时返回空列表。
+    """
+    if not items:
+        return []
+
+    dictionary = get_item_dictionary(conn)
+    item_ids = dictionary.ids_of(dimension, items)
+    if not item_ids:
+        return []
+
+    placeholders = ",".join("?" for _ in item_ids)
+    try:
+        rows = conn.execute(
+            SEGMENT_ITEM_TRENDS_SQL.format(placeholders=placeholders),
+            [dimension, *segment, *item_ids],
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    return _rows_to_trends(rows, dictionary)
+
+
+def get_segment_catalog(conn: sqlite3.Connection, dimension: str) -> Optional[SegmentCatalog]:
+    """某个维度可用的分群取值；库中没有分群立方体时返回 None。"""
+    try:
+        rows = conn.execute(SEGMENT_CATALOG_SQL, (dimension,)).fetchall()
+    except sqlite3.OperationalError:
+        return None
+
+    values: Dict[str, List[SegmentValue]] = {segment: [] for segment in SEGMENT_COLUMNS}
+    for row in rows:
+        values[row["segment"]].append(
+            SegmentValue(value=row["value"], respondents=row["respondents"])
+        )
+    # 按主键顺序读出（取值升序），再稳定排序为样本数降序，省去 SQL 里的临时排序
+    for segment_values in values.values():
+        segment_values.sort(key=lambda v: v.respondents, reverse=True)
+    return SegmentCatalog(dimension=dimension, **values)
+
+
+def to_columnar(dimension: str, trends: List[ItemTrend]) -> ColumnarTrendResponse:
+    """
+    把逐点的 ItemTrend 列表转成列式响应：
+    years 为这些 item 出现过的全部年份；同一年所有 item 的 base_count 相同，只保留一份。
+    """
+    base_by_year: Dict[int, int] = {}
+    for trend in trends:
+        for point in trend.points:
+            base_by_year.setdefault(point.year, point.base_count)
+
+    years = sorted(base_by_year)
+    year_index = {year: j for j, year in enumerate(years)}
+
+    columns: List[ColumnarItemTrend] = []
+    for trend in trends:
+        have: List[Optional[int]] = [None] * len(years)
+        want: List[Optional[int]] = [None] * len(years)
+        for point in trend.points:
+            j = year_index[point.year]
+            have[j] = point.have_count
+            want[j] = point.want_count
+        columns.append(ColumnarItemTrend(item=trend.item, have_count=have, want_count=want))
+
+    return ColumnarTrendResponse(
+        dimension=dimension,
+        years=years,
+        base_count=[base_by_year[year] for year in years],
+        items=columns,
+    )
+
+
+def get_ranking_page(
+    conn: sqlite3.Connection,
+    dimension: str,
+    sort_key: str,
+    after: int,
+    page_size: int,
+) -> Optional[RankingPage]:
+    """
+    按预计算的名次做 keyset 分页：取 rank > after 的前 page_size 个 item（一次主键范围读取）。
+    库中还没有排名表（旧库）时返回 None。
+    """
+    try:
+        rows = conn.execute(
+            RANKING_PAGE_SQL, (dimension, sort_key, after, page_size + 1)
+        ).fetchall()
+        total_row = conn.execute(RANKING_TOTAL_SQL, (dimension, sort_key)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+
+    # 多取一行用来判断是否还有下一页
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    dictionary = get_item_dictionary(conn)
+
+    items = [
+        RankedItem(
+            rank=row["rank"],
+            item=dictionary.name_of(row["item_id"]),
+            value=row["value"],
+            latest_year=row["latest_year"],
+            have_ratio=row["have_ratio"],
+            want_ratio=row["want_ratio"],
+            growth=row["growth"],
+        )
+        for row in rows
+    ]
+
+    return RankingPage(
+        dimension=dimension,
+        sort=sort_key,
+        total=total_row["total"] or 0,
+        items=items,
+        next_cursor=items[-1].rank if has_more else None,
+    )
+
+
+def get_leader_board(
+    conn: sqlite3.Connection,
+    dimension: str,
+    metric: str,
+    year: Optional[int],
+    order: str,
+    limit: int,
+) -> Optional[LeaderBoard]:
+    """
+    读取预计算的榜单：year 缺省时取该指标有数据的最近一年；
+    order="desc" 取榜首 limit 名，"asc" 取榜尾 limit 名（值从小到大）。
+    库中还没有榜单表（旧库）或该年没有数据时返回 None。
+    """
+    try:
+        if year is None:
+            row = conn.execute(LEADER_LATEST_YEAR_SQL, (dimension, metric)).fetchone()
+            year = row["year"] if row else None
+            if year is None:
+                return None
+
+        direction = "ASC" if order == "desc" else "DESC"
+        rows = conn.execute(
+            LEADER_PAGE_SQL.format(direction=direction),
+            (dimension, metric, year, limit),
+        ).fetchall()
+        total_row = conn.execute(LEADER_TOTAL_SQL, (dimension, metric, year)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+
+    if not rows:
+        return None
+
+    dictionary = get_item_dictionary(conn)
+    return LeaderBoard(
+        dimension=dimension,
+        metric=metric,
+        year=year,
+        order=order,
+        total=total_row["total"],
+        items=[
+            LeaderEntry(
+                rank=row["rank"],
+                item=dictionary.name_of(row["item_id"]),
+                value=row["value"],
+                have_ratio=row["have_ratio"],
+                want_ratio=row["want_ratio"],
+            )
+            for row in rows
+        ],
+    )
+
+
+def get_forecast_payload(
+    conn: sqlite3.Connection,
+    dimension: str,
+    items: List[str],
+) -> Optional[bytes]:
+    """
+    用构建时预计算的 ItemForecast 片段拼出预测响应 JSON（按 item 名称排序），请求时不做任何拟合。
+    没有预测表（旧库）或一个 item 都没有预测时返回 None。
+    """
+    return _stitch_item_fragments(conn, FORECAST_FRAGMENTS_SQL, dimension, items)
+
+
+def _stitch_item_fragments(
+    conn: sqlite3.Connection,
+    sql: str,
+    dimension: str,
+    items: List[str],
+) -> Optional[bytes]:
+    """按 item_id 取出片段，按 item 名称排序后拼成 {"dimension":..., "items":[...]}；一个都没有时返回 None。"""
+    if not items:
+        return None
+
+    dictionary = get_item_dictionary(conn)
+    item_ids = dictionary.ids_of(dimension, items)
+    if not item_ids:
+        return None
+
+    placeholders = ",".join("?" for _ in item_ids)
+    try:
+        rows = conn.execute(
+            sql.format(placeholders=placeholders),
+            [dimension, *item_ids],
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    if not rows:
+        return None
+
+    fragments = sorted(
+        (dictionary.name_of(row["item_id"]), bytes(row["fragment"])) for row in rows
+    )
+    return b"".join([
+        b'{"dimension":', _dumps(dimension), b',"items":[',
+        b",".join(fragment for _, fragment in fragments),
+        b"]}",
+    ])
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def get_precomputed_top_payload(
+    conn: sqlite3.Connection,
+    dimension: str,
+    limit: int,
+) -> Optional[bytes]:
+    """
+    取构建时预生成的 top N 响应 JSON；
+    没有预生成数据（旧库 / 该维度无可展示 item）时返回 None，由调用方走实时查询。
+    """
+    try:
+        row = conn.execute(TOP_PAYLOAD_SQL, (dimension, limit)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return bytes(row["payload"]) if row else None
+
+
+def get_precomputed_items_payload(
+    conn: sqlite3.Connection,
+    dimension: str,
+    items: List[str],
+) -> Optional[bytes]:
+    """
+    用预生成的 ItemTrend 片段拼出任意 items= 请求的响应 JSON（按 item 名称排序）。
+    一个片段都没有找到时返回 None，由调用方走实时查询（以便给出原有的 404 信息）。
+    """
+    return _stitch_item_fragments(conn, ITEM_FRAGMENTS_SQL, dimension, items)
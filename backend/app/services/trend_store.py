@@ -0,0 +1,146 @@
+﻿# app/services/trend_store.py
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import sqlite3
+
+from ..models.trend import ItemTrend, YearPoint
+from .item_dictionary import ItemDictionary, item_dictionary_store
+
+ALL_ROWS_SQL = "SELECT year, item_id, have_count, want_count, base_count FROM {table}"
+
+
+class DimensionMatrix:
+    """
+    一个汇总表的内存形态：item × year 的计数矩阵（行按 item 名称排序、列按年份升序），
+    加载时即算好 have_ratio / want_ratio，以及最近一年按 have_count 的排名。
+
+    present[i, j] 区分“该年没有这一行”和“计数为 0”，与查表结果保持一致。
+    汇总表中的 item_id 在加载时经 item 字典换回名称。
+    """
+
+    def __init__(self, rows, dictionary: ItemDictionary) -> None:
+        names = {row["item_id"]: dictionary.name_of(row["item_id"]) for row in rows}
+        self.years: List[int] = sorted({row["year"] for row in rows})
+        self.items: List[str] = sorted(names.values())
+        self.item_index: Dict[str, int] = {item: i for i, item in enumerate(self.items)}
+        year_index = {year: j for j, year in enumerate(self.years)}
+
+        shape = (len(self.items), len(self.years))
+        self.have = np.zeros(shape, dtype=np.int64)
+        self.want = np.zeros(shape, dtype=np.int64)
+        self.base = np.zeros(shape, dtype=np.int64)
+        self.present = np.zeros(shape, dtype=bool)
+
+        for row in rows:
+            i = self.item_index[names[row["item_id"]]]
+            j = year_index[row["year"]]
+            self.have[i, j] = row["have_count"]
+            self.want[i, j] = row["want_count"]
+            self.base[i, j] = row["base_count"]
+            self.present[i, j] = True
+
+        # base_count 为 0 的格子比例记为 0.0（与实时查询一致）
+        safe_base = np.where(self.base > 0, self.base, 1)
+        self.have_ratio = np.where(self.base > 0, self.have / safe_base, 0.0)
+        self.want_ratio = np.where(self.base > 0, self.want / safe_base, 0.0)
+        self.year_counts = self.present.sum(axis=1)
+
+        # 最近一年出现过的 item，按 have_count 降序、名称升序
+        self.ranked: List[int] = []
+        if self.years:
+            last = len(self.years) - 1
+            candidates = np.flatnonzero(self.present[:, last])
+            self.ranked = sorted(
+                candidates.tolist(),
+                key=lambda i: (-int(self.have[i, last]), self.items[i]),
+            )
+
+    def top_items(self, limit: int) -> List[str]:
+        return [self.items[i] for i in self.ranked[:limit]]
+
+    def item_trend(self, item: str) -> Optional[ItemTrend]:
+        i = self.item_index.get(item)
+        if i is None:
+            return None
+
+        columns = np.flatnonzero(self.present[i]).tolist()
+        have_ratio = self.have_ratio[i].tolist()
+        want_ratio = self.want_ratio[i].tolist()
+        have = self.have[i].tolist()
+        want = self.want[i].tolist()
+        base = self.base[i].tolist()
+
+        points = [
+            YearPoint(
+                year=self.years[j],
+                have_ratio=have_ratio[j],
+                want_ratio=want_ratio[j],
+                have_count=have[j],
+                want_count=want[j],
+                base_count=base[j],
+            )
+            for j in columns
+        ]
+        return ItemTrend(item=item, points=points)
+
+    def trends_for_items(self, items: List[str], min_years: int) -> List[ItemTrend]:
+        """按 item 名称排序、去重，只返回至少出现 min_years 年的 item。"""
+        trends: List[ItemTrend] = []
+        for item in sorted(set(items)):
+            i = self.item_index.get(item)
+            if i is None or self.year_counts[i] < min_years:
+                continue
+            trends.append(self.item_trend(item))
+        return trends
+
+
+class TrendStore:
+    """
+    服务期间常驻内存的趋势数据：启动时把所有汇总表读入 DimensionMatrix，
+    之后的 top N / items 查询都不再访问数据库。
+
+    数据版本（见 response_cache.DataVersionTracker）变化时整体重新加载；
+    某张表不存在或读取失败时该维度不进入内存，由调用方退回查库。
+    """
+
+    def __init__(self) -> None:
+        self.version: Optional[str] = None
+        self._tables: Dict[str, DimensionMatrix] = {}
+        self._lock = threading.Lock()
+
+    def load(self, conn: sqlite3.Connection, version: str, table_names: List[str]) -> None:
+        dictionary = item_dictionary_store.get(conn, version)
+        tables: Dict[str, DimensionMatrix] = {}
+        for table_name in table_names:
+            try:
+                rows = conn.execute(ALL_ROWS_SQL.format(table=table_name)).fetchall()
+            except sqlite3.OperationalError:
+                continue
+            tables[table_name] = DimensionMatrix(rows, dictionary)
+
+        # 整体替换引用，读者要么看到旧数据要么看到新数据
+        self._tables = tables
+        self.version = version
+
+    def sync(self, conn: sqlite3.Connection, version: str, table_names: List[str]) -> None:
+        """数据版本与已加载的不同时重新加载（多个请求同时发现时只加载一次）。"""
+        if version == self.version:
+            return
+        with self._lock:
+            if version != self.version:
+                self.load(conn, version, table_names)
+
+    def get(self, table_name: str) -> Optional[DimensionMatrix]:
+        return self._tables.get(table_name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables = {}
+            self.version = None
+
+
+trend_store = TrendStore()
@@ -1,18 +1,126 @@
+import argparse
+import codecs
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
+from typing import NamedTuple, Union
 
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 列式缓存为可选依赖
+    pa = None
+    pq = None
 
-def read_csv_with_guess(path: Path) -> pd.DataFrame:
+try:
+    from .static.generate_usage_trend import DIMENSION_BUILDS
+except ImportError:  # 直接以脚本方式运行 import_csv.py 时
+    from static.generate_usage_trend import DIMENSION_BUILDS
+
+ENCODINGS_TO_TRY = ["utf-8", "utf-8-sig", "gbk", "latin1"]
+
+# 窄表模式下，除各维度 have / want 列之外额外保留的列（薪资、国家、经验、职业等）
+EXTRA_COLUMNS = [
+    "Respondent",
+    "ResponseId",
+    "Country",
+    "Currency",
+    "Salary",
+    "CompTotal",
+    "ConvertedComp",
+    "ConvertedSalary",  # 2018 年折算为美元的年薪
+    "ConvertedCompYearly",
+    "YearsCode",
+    "YearsCodePro",
+    "YearsCoding",     # 2018 年的编程年限
+    "YearsProgram",    # 2017 年的编程年限
+    "DevType",
+    "DeveloperType",   # 2017 年的开发者类型
+    "EdLevel",
+    "Employment",
+]
+
+
+class ZipMember(NamedTuple):
+    """zip 包中的一个 CSV 成员，读取时直接从压缩包流式解压，不落地中间文件。"""
+
+    zip_path: Path
+    member: str
+
+    def __str__(self) -> str:
+        return f"{self.zip_path}!{self.member}"
+
+
+# CSV 来源：已解压的文件路径，或 zip 包中的成员
+CsvSource = Union[Path, ZipMember]
+
+
+def find_results_member(zip_path: Path) -> str:
+    """
+    在问卷 zip 包里自动定位结果 CSV：
+    忽略 __MACOSX / ._ 元数据和 schema 文件，优先 survey_results_public，否则取最大的 CSV。
+    """
+    with zipfile.ZipFile(zip_path) as zf:
+        candidates = [
+            info for info in zf.infolist()
+            if info.filename.lower().endswith(".csv")
+            and not info.filename.startswith("__MACOSX/")
+            and not Path(info.filename).name.startswith("._")
+            and "schema" not in Path(info.filename).name.lower()
+        ]
+
+    if not candidates:
+        raise FileNotFoundError(f"No survey results CSV found in {zip_path}")
+
+    public = [info for info in candidates if "survey_results_public" in info.filename]
+    return max(public or candidates, key=lambda info: info.file_size).filename
+
+
+@contextmanager
+def open_csv_source(source: CsvSource):
+    """以二进制方式打开 CSV 来源；zip 成员边读边解压。"""
+    if isinstance(source, ZipMember):
+        with zipfile.ZipFile(source.zip_path) as zf, zf.open(source.member) as f:
+            yield f
+    else:
+        with open(source, "rb") as f:
+            yield f
+
+
+def required_columns(table_name: str) -> frozenset:
+    """
+    根据 generate_usage_trend 中的维度配置，推出某张年度表需要导入的列：
+    该表在各维度中配置的 have / want 列 + EXTRA_COLUMNS。
+    """
+    columns = set(EXTRA_COLUMNS)
+    for build in DIMENSION_BUILDS:
+        for cfg in build["config"].values():
+            if cfg["table"] == table_name:
+                columns.update((cfg["have"], cfg["want"]))
+    return frozenset(columns)
+
+
+def _usecols(columns):
+    """columns 为 None 时导入全部列；否则只导入其中存在于 CSV 的列。"""
+    if columns is None:
+        return None
+    return lambda name: name in columns
+
+
+def read_csv_with_guess(path: CsvSource, columns=None) -> pd.DataFrame:
     """尝试多种常见编码读取 CSV，避免 UnicodeDecodeError。"""
-    encodings_to_try = ["utf-8", "utf-8-sig", "gbk", "latin1"]
     last_error = None
 
-    for enc in encodings_to_try:
+    for enc in ENCODINGS_TO_TRY:
         try:
             print(f"尝试使用编码 {enc} 读取 {path} ...")
-            return pd.read_csv(path, encoding=enc)
+            with open_csv_source(path) as f:
+                return pd.read_csv(f, encoding=enc, usecols=_usecols(columns))
         except UnicodeDecodeError as e:
             print(f"使用编码 {enc} 失败：{e}")
             last_error = e
@@ -21,20 +129,288 @@ def read_csv_with_guess(path: Path) -> pd.DataFrame:
     raise last_error
 
 
-def main():
+def detect_encoding(path: CsvSource, sample_size: int = 1 << 20) -> str:
+    """只读取文件开头的一小段样本来判断编码，不再整文件反复重读。"""
+    with open_csv_source(path) as f:
+        sample = f.read(sample_size)
+
+    for enc in ENCODINGS_TO_TRY:
+        try:
+            # final=False：样本末尾被截断的多字节字符不算错误
+            codecs.getincrementaldecoder(enc)().decode(sample, final=False)
+            return enc
+        except UnicodeDecodeError:
+            continue
+
+    return ENCODINGS_TO_TRY[-1]
+
+
+def create_sqlite_engine(db_path: Path):
+    """
+    创建 SQLite engine，并让 pysqlite 由 SQLAlchemy 显式发出 BEGIN，
+    这样 DROP / CREATE TABLE 与后续 INSERT 处于同一个事务中。
+    """
+    engine = create_engine(f"sqlite:///{db_path}")
+
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_autobegin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+def _arrow_table(df: pd.DataFrame):
+    """
+    转成写缓存用的 Arrow 表：所有列统一存为字符串（缺失值为 null），
+    这样分块写入时 schema 保持一致，聚合端读出的值也与文本列一致。
+    """
+    if pa is None:
+        raise RuntimeError("Writing the columnar cache requires pyarrow to be installed")
+
+    schema = pa.schema([(str(col), pa.string()) for col in df.columns])
+    return pa.Table.from_pandas(df.astype("string"), schema=schema, preserve_index=False)
+
+
+def write_parquet_cache(df: pd.DataFrame, cache_path: Path) -> None:
+    """写出一年的列式缓存；先写临时文件再改名，读者不会看到半个文件。"""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    pq.write_table(_arrow_table(df), tmp_path)
+    tmp_path.replace(cache_path)
+
+
+def import_csv_streaming(
+    path: CsvSource,
+    table_name: str,
+    engine,
+    chunksize: int = 50_000,
+    insert_batch: int = 5_000,
+    columns=None,
+    cache_path=None,
+):
+    """
+    流式导入：按样本判断编码后按 chunksize 分块读取，
+    每块用批量 INSERT 追加到同一张表，全部分块在一个事务里提交。
+    内存峰值只与 chunksize 有关，与 CSV 文件大小无关。
+
+    若样本之后才出现解码错误，则回滚整张表并换下一个编码重试。
+    cache_path 给定时，同一批分块同时追加写入 Parquet 列式缓存。
+
+    返回 (parse_seconds, write_seconds)：解析为读取各分块的累计耗时（含失败的编码尝试），
+    其余时间（INSERT、写缓存、提交）都计入写入。
+    """
+    detected = detect_encoding(path)
+    candidates = [detected] + [enc for enc in ENCODINGS_TO_TRY if enc != detected]
+    last_error = None
+    parse_seconds = 0.0
+    started = time.perf_counter()
+
+    for enc in candidates:
+        print(f"使用编码 {enc} 流式读取 {path}（每块 {chunksize} 行）...")
+        cache_writer = None
+        try:
+            with engine.begin() as connection, open_csv_source(path) as f:
+                reader = pd.read_csv(
+                    f,
+                    encoding=enc,
+                    chunksize=chunksize,
+                    usecols=_usecols(columns),
+                )
+                total_rows = 0
+                i = 0
+                while True:
+                    # 分块是惰性解析的：只有取下一块的这一步算解析耗时
+                    start = time.perf_counter()
+                    chunk = next(reader, None)
+                    parse_seconds += time.perf_counter() - start
+                    if chunk is None:
+                        break
+                    if chunk.shape[1] == 0:
+                        print(f"⚠ 跳过 {table_name}：CSV 中没有需要导入的列")
+                        return parse_seconds, time.perf_counter() - started - parse_seconds
+                    chunk.to_sql(
+                        table_name,
+                        connection,
+                        if_exists="replace" if i == 0 else "append",
+                        index=False,
+                        chunksize=insert_batch,
+                    )
+                    if cache_path is not None:
+                        arrow_chunk = _arrow_table(chunk)
+                        if cache_writer is None:
+                            cache_path.parent.mkdir(parents=True, exist_ok=True)
+                            tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+                            cache_writer = pq.ParquetWriter(tmp_path, arrow_chunk.schema)
+                        cache_writer.write_table(arrow_chunk)
+                    total_rows += len(chunk)
+                    i += 1
+            if cache_writer is not None:
+                cache_writer.close()
+                cache_writer = None
+                tmp_path.replace(cache_path)
+            print(f"共写入 {total_rows} 行")
+            return parse_seconds, time.perf_counter() - started - parse_seconds
+        except UnicodeDecodeError as e:
+            print(f"使用编码 {enc} 失败，已回滚：{e}")
+            last_error = e
+        finally:
+            if cache_writer is not None:
+                cache_writer.close()
+                tmp_path.unlink(missing_ok=True)
+
+    raise last_error
+
+
+def write_frame(df: pd.DataFrame, table_name: str, engine, insert_batch: int = 5_000) -> None:
+    """在一个事务中用批量 INSERT 覆盖写入一整年的表。"""
+    if df.shape[1] == 0:
+        print(f"⚠ 跳过 {table_name}：CSV 中没有需要导入的列")
+        return
+
+    with engine.begin() as connection:
+        df.to_sql(
+            table_name,
+            connection,
+            if_exists="replace",
+            index=False,
+            chunksize=insert_batch,
+        )
+
+
+def _parse_csv_worker(csv_path: CsvSource, columns=None, cache_path=None):
+    """
+    worker 进程：只负责解码 + 解析 CSV（以及可选的列式缓存），
+    返回 (DataFrame, 解析耗时)。
+    """
+    start = time.perf_counter()
+    df = read_csv_with_guess(csv_path, columns)
+    if cache_path is not None and df.shape[1] > 0:
+        write_parquet_cache(df, cache_path)
+    return df, time.perf_counter() - start
+
+
+def import_parallel(jobs, engine, workers: int, cache_dir=None):
+    """
+    并行导入：worker 进程并发解析各年 CSV，
+    当前进程是唯一持有 SQLite 连接的写入方，哪一年先解析完就先提交哪一年。
+
+    jobs: [(csv_path, table_name, columns), ...]，columns 为 None 表示导入全部列
+    cache_dir 给定时由 worker 顺带写出 {cache_dir}/{table_name}.parquet
+    返回 {table_name: (parse_seconds, write_seconds)}。
+    """
+    timings = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                _parse_csv_worker,
+                csv_path,
+                columns,
+                None if cache_dir is None else cache_dir / f"{table_name}.parquet",
+            ): (csv_path, table_name)
+            for csv_path, table_name, columns in jobs
+        }
+        for future in as_completed(futures):
+            csv_path, table_name = futures[future]
+            df, parse_seconds = future.result()
+
+            start = time.perf_counter()
+            write_frame(df, table_name, engine)
+            write_seconds = time.perf_counter() - start
+            del df
+
+            timings[table_name] = (parse_seconds, write_seconds)
+            print(f"已导入 CSV: {csv_path} -> {table_name}")
+
+    return timings
+
+
+def print_timings(timings) -> None:
+    """按表名输出每一年的解析 / 写入耗时。"""
+    if not timings:
+        return
+
+    print("\n各年份耗时（秒）：")
+    print(f"{'table':<24}{'parse':>10}{'write':>10}")
+    for table_name in sorted(timings):
+        parse_seconds, write_seconds = timings[table_name]
+        print(f"{table_name:<24}{parse_seconds:>10.2f}{write_seconds:>10.2f}")
+
+    total_parse = sum(p for p, _ in timings.values())
+    total_write = sum(w for _, w in timings.values())
+    print(f"{'total':<24}{total_parse:>10.2f}{total_write:>10.2f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="把各年度问卷 CSV 导入 data/devtrend.db")
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="分块流式导入（内存占用与 chunksize 成正比），默认整文件读入；不能与 --workers > 1 同时使用",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=50_000,
+        help="流式导入时每块读取的行数",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="并行解析 CSV 的进程数（> 1 时启用并行导入，由主进程统一写库；每个进程整文件读入，不能与 --streaming 同时使用）",
+    )
+    parser.add_argument(
+        "--wide",
+        action="store_true",
+        help="导入 CSV 的全部列（默认只导入维度配置用到的列 + EXTRA_COLUMNS）",
+    )
+    parser.add_argument(
+        "--parquet-cache",
+        action="store_true",
+        help="同时为每一年写出 Parquet 列式缓存，供 generate_usage_trend --source parquet 使用",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="列式缓存目录，默认 data/cache",
+    )
+    args = parser.parse_args(argv)
+    # 并行导入时每个 worker 都整文件读入并把整张 DataFrame 传回主进程，流式导入的内存上限无从保证
+    if args.streaming and args.workers > 1:
+        parser.error("--streaming 不能与 --workers > 1 同时使用")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
     # import_csv.py 在 backend/database 下，向上三级是项目根目录 DevTrendAnalysis
     base_dir = Path(__file__).resolve().parents[2]
 
     # 数据目录
     data_dir = base_dir / "data"
     raw_dir = data_dir / "raw"
+    origin_dir = data_dir / "origin"
     data_dir.mkdir(parents=True, exist_ok=True)
 
     # 数据库路径：data/devtrend.db（如果不存在会自动创建）
     db_path = data_dir / "devtrend.db"
 
     # SQLite 连接：sqlite:///绝对路径
-    engine = create_engine(f"sqlite:///{db_path}")
+    engine = create_sqlite_engine(db_path)
+
+    # 可选的列式缓存：data/cache/survey_results_YYYY.parquet
+    cache_dir = None
+    if args.parquet_cache:
+        cache_dir = args.cache_dir or data_dir / "cache"
+
+    # 先收集要导入的 (CSV, 表名, 列集合)
+    jobs = []
 
     # 循环年份：2012 ~ 2025（range(12, 26) -> 12..25）
     for year_suffix in range(12, 26):
@@ -43,21 +419,51 @@ def main():
 
         csv_name = f"survey_results_20{year_str}.csv"
         csv_path = raw_dir / csv_name
+        zip_path = origin_dir / f"stack-overflow-developer-survey-20{year_str}.zip"
 
-        if not csv_path.exists():
-            print(f"⚠ 跳过，CSV 文件不存在: {csv_path}")
+        # 优先使用已解压的 CSV；没有则直接从 data/origin 的 zip 包中流式读取
+        if csv_path.exists():
+            source = csv_path
+        elif zip_path.exists():
+            source = ZipMember(zip_path, find_results_member(zip_path))
+        else:
+            print(f"⚠ 跳过，CSV 文件与 zip 包均不存在: {csv_path} / {zip_path}")
             continue
 
-        df = read_csv_with_guess(csv_path)
-
         # 表名不能用文件路径，也不要带 .csv
         # 这里用 "survey_results_2012" 这种表名
         table_name = f"survey_results_20{year_str}"
+        columns = None if args.wide else required_columns(table_name)
+        jobs.append((source, table_name, columns))
+
+    if args.workers > 1:
+        print_timings(import_parallel(jobs, engine, args.workers, cache_dir))
+    else:
+        timings = {}
+        for csv_path, table_name, columns in jobs:
+            cache_path = None if cache_dir is None else cache_dir / f"{table_name}.parquet"
+            if args.streaming:
+                timings[table_name] = import_csv_streaming(
+                    csv_path, table_name, engine,
+                    chunksize=args.chunksize,
+                    columns=columns,
+                    cache_path=cache_path,
+                )
+            else:
+                start = time.perf_counter()
+                df = read_csv_with_guess(csv_path, columns)
+                parse_seconds = time.perf_counter() - start
+
+                if cache_path is not None and df.shape[1] > 0:
+                    write_parquet_cache(df, cache_path)
 
-        df.to_sql(table_name, engine, if_exists="replace", index=False)
+                start = time.perf_counter()
+                write_frame(df, table_name, engine)
+                timings[table_name] = (parse_seconds, time.perf_counter() - start)
 
-        print(f"已导入 CSV: {csv_path}")
-        print(f"数据库中的表名：{table_name}")
+            print(f"已导入 CSV: {csv_path}")
+            print(f"数据库中的表名：{table_name}")
+        print_timings(timings)
 
     print(f"\n全部导入完成，数据库文件: {db_path}")
 
@@ -0,0 +1,189 @@
+"""
+跨维度的 item × item 共现 / PMI 稀疏矩阵，供 /api/advice/next 的“下一步学什么”推荐直接加载。
+
+对每个调查年份、每个受访者（同一年的所有维度来自同一张原始表，可以跨维度组合）：
+- 源（source）：在用（have）的全部 item
+- 目标（target）：想用（want）但目前没在用的 item，即“下一步”
+
+co_count(a, b)  = 在用 a 且想用但未用 b 的受访者数
+pmi(a, b)       = log(co_count * N / (have_count(a) * next_count(b)))
+其中 N 为该年 have 与“下一步”都非空的受访者数，have_count / next_count 也只在这 N 人中统计。
+只保留 co_count >= MIN_SUPPORT 且 pmi > 0 的格子（正 PMI），矩阵因此很稀疏。
+
+计数按受访者分块做 0/1 关联矩阵乘法（H^T · W），不逐对累加。
+
+cooccurrence_pmi  ：主键 (year, source_item_id, target_item_id)（item_id 全局唯一，已隐含维度），
+                    一年的矩阵恰好是一次主键范围读取，服务端按行顺序直接装成 CSR。
+cooccurrence_items：每年每个 item 的 have_count / next_count，以及该年的 N（respondents）。
+"""
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:  # 共现矩阵依赖 NumPy，缺失时跳过（接口返回 404）
+    np = None
+
+HAS_NUMPY = np is not None
+
+try:
+    from .item_dictionary import drop_legacy_table, keyed_item_ids
+    from .respondent_bitmaps import parse_items
+except ImportError:  # 直接以脚本方式运行 generate_usage_trend.py 时
+    from item_dictionary import drop_legacy_table, keyed_item_ids
+    from respondent_bitmaps import parse_items
+
+COOCCURRENCE_TABLE = "cooccurrence_pmi"
+COOCCURRENCE_ITEM_TABLE = "cooccurrence_items"
+
+MIN_SUPPORT = 20     # 共现人数低于该值的格子不保留（小样本的 PMI 噪声很大）
+CHUNK_ROWS = 4096    # 每块受访者数；块内计数不超过 2^24，float32 矩阵乘法结果是精确整数
+
+
+def ensure_cooccurrence_tables(cur):
+    drop_legacy_table(cur, COOCCURRENCE_TABLE, key_column="source_item_id")
+    drop_legacy_table(cur, COOCCURRENCE_ITEM_TABLE)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {COOCCURRENCE_TABLE} (
+            year            INTEGER NOT NULL,
+            source_item_id  INTEGER NOT NULL,   -- 在用
+            target_item_id  INTEGER NOT NULL,   -- 想用但未用
+            co_count        INTEGER NOT NULL,
+            pmi             REAL    NOT NULL,
+            PRIMARY KEY (year, source_item_id, target_item_id)
+        ) WITHOUT ROWID
+    """)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {COOCCURRENCE_ITEM_TABLE} (
+            year         INTEGER NOT NULL,
+            item_id      INTEGER NOT NULL,   -- items.id
+            have_count   INTEGER NOT NULL,
+            next_count   INTEGER NOT NULL,   -- 想用但未用的人数
+            respondents  INTEGER NOT NULL,   -- 该年的 N
+            PRIMARY KEY (year, item_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def scan_respondent_sets(cur, source_table, units):
+    """
+    对一张年度原始表执行一次 SELECT，得到每个受访者跨维度的 have / “下一步”集合。
+
+    units: [(dimension, have_col, want_col, separator, item_mapping), ...]
+    返回 (keys, have_rows, next_rows)：
+    - keys：[(dimension, item), ...]，下标即 item 编号
+    - have_rows / next_rows：每个受访者一个 item 编号列表，只保留两者都非空的受访者
+    """
+    columns = list(dict.fromkeys(
+        col for _, have_col, want_col, _, _ in units for col in (have_col, want_col)
+    ))
+    col_index = {col: i for i, col in enumerate(columns)}
+
+    cur.execute(f"""
+        SELECT {", ".join(columns)}
+        FROM {source_table}
+    """)
+
+    key_index = {}
+    have_rows = []
+    next_rows = []
+    for row in cur.fetchall():
+        have_ids = set()
+        want_ids = set()
+        for dimension, have_col, want_col, separator, item_mapping in units:
+            for name in parse_items(row[col_index[have_col]], separator, item_mapping):
+                have_ids.add(key_index.setdefault((dimension, name), len(key_index)))
+            for name in parse_items(row[col_index[want_col]], separator, item_mapping):
+                want_ids.add(key_index.setdefault((dimension, name), len(key_index)))
+
+        next_ids = want_ids - have_ids
+        if have_ids and next_ids:
+            have_rows.append(list(have_ids))
+            next_rows.append(list(next_ids))
+
+    keys = sorted(key_index, key=key_index.get)
+    return keys, have_rows, next_rows
+
+
+def _flatten(rows):
+    return np.fromiter(chain.from_iterable(rows), dtype=np.int64)
+
+
+def _incidence_matrix(rows, n_items):
+    """受访者 × item 的 0/1 矩阵。"""
+    matrix = np.zeros((len(rows), n_items), dtype=np.float32)
+    row_ids = np.repeat(np.arange(len(rows)), [len(r) for r in rows])
+    matrix[row_ids, _flatten(rows)] = 1.0
+    return matrix
+
+
+def count_cooccurrence(n_items, have_rows, next_rows):
+    """co[a, b] = 在用 a 且想用但未用 b 的受访者数（分块累加 H^T · W）。"""
+    co = np.zeros((n_items, n_items), dtype=np.int64)
+    for start in range(0, len(have_rows), CHUNK_ROWS):
+        have = _incidence_matrix(have_rows[start:start + CHUNK_ROWS], n_items)
+        want = _incidence_matrix(next_rows[start:start + CHUNK_ROWS], n_items)
+        co += np.rint(have.T @ want).astype(np.int64)
+    return co
+
+
+def compute_pmi(year, keys, have_rows, next_rows):
+    """
+    返回 (pmi_rows, item_rows)：
+    - pmi_rows ：[(year, (dimension, item), (dimension, item), co_count, pmi), ...]
+    - item_rows：[(year, (dimension, item), have_count, next_count, respondents), ...]
+    item 在写入时（write_cooccurrence）才换成 item_id。
+    """
+    n = len(have_rows)
+    if n == 0:
+        return [], []
+
+    n_items = len(keys)
+    co = count_cooccurrence(n_items, have_rows, next_rows)
+    have_count = np.bincount(_flatten(have_rows), minlength=n_items)
+    next_count = np.bincount(_flatten(next_rows), minlength=n_items)
+
+    sources, targets = np.nonzero(co >= MIN_SUPPORT)
+    counts = co[sources, targets]
+    pmi = np.log(counts * float(n) / (have_count[sources] * next_count[targets]))
+    keep = pmi > 0
+
+    pmi_rows = [
+        (year, keys[a], keys[b], c, p)
+        for a, b, c, p in zip(
+            sources[keep].tolist(),
+            targets[keep].tolist(),
+            counts[keep].tolist(),
+            pmi[keep].tolist(),
+        )
+    ]
+    item_rows = [
+        (year, key, h, w, n)
+        for key, h, w in zip(keys, have_count.tolist(), next_count.tolist())
+        if h or w
+    ]
+    return pmi_rows, item_rows
+
+
+def write_cooccurrence(cur, year, pmi_rows, item_rows):
+    """替换某一年的共现矩阵（在调用方的事务内执行），item 换成 item_id 后按主键顺序写入。"""
+    ensure_cooccurrence_tables(cur)
+    cur.execute(f"DELETE FROM {COOCCURRENCE_TABLE} WHERE year = ?", (year,))
+    cur.execute(f"DELETE FROM {COOCCURRENCE_ITEM_TABLE} WHERE year = ?", (year,))
+
+    ids = keyed_item_ids(cur, [key for _, key, *_ in item_rows])
+    cur.executemany(
+        f"""
+        INSERT INTO {COOCCURRENCE_TABLE}
+            (year, source_item_id, target_item_id, co_count, pmi)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        sorted((y, ids[source], ids[target], c, p) for y, source, target, c, p in pmi_rows),
+    )
+    cur.executemany(
+        f"""
+        INSERT INTO {COOCCURRENCE_ITEM_TABLE}
+            (year, item_id, have_count, next_count, respondents)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        sorted((y, ids[key], h, w, n) for y, key, h, w, n in item_rows),
+    )
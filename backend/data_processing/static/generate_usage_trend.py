@@ -1,433 +1,1253 @@
+import argparse
+import hashlib
+import json
+import math
 import sqlite3
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
-
-def get_connection():
-    here = Path(__file__).resolve()
-    # static/.. = app, .. = backend, .. = 项目根目录
-    project_root = here.parents[3]
-    db_path = project_root / "data" / "devtrend.db"
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # 向量化引擎为可选依赖，缺失时仍可使用纯 Python 引擎
+    np = None
+    pd = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # 列式缓存为可选依赖，缺失时只能从 SQLite 取数
+    pq = None
+
+try:
+    from .cooccurrence import HAS_NUMPY as COOCCURRENCE_AVAILABLE
+    from .cooccurrence import compute_pmi, scan_respondent_sets, write_cooccurrence
+    from .item_dictionary import drop_legacy_table, item_ids
+    from .respondent_bitmaps import scan_respondent_bitmaps, write_respondent_bitmaps
+    from .salary_sketches import scan_salary_sketches, write_salary_sketches
+    from .segment_cube import (
+        SEGMENT_CONFIG,
+        rebuild_segment_catalog,
+        scan_segment_counts,
+        write_segment_counts,
+    )
+    from .trend_forecast import materialize_forecasts
+    from .trend_leaders import materialize_leaders
+    from .trend_payloads import materialize_payloads
+    from .trend_rankings import materialize_rankings
+except ImportError:  # 直接以脚本方式运行 generate_usage_trend.py 时
+    from cooccurrence import HAS_NUMPY as COOCCURRENCE_AVAILABLE
+    from cooccurrence import compute_pmi, scan_respondent_sets, write_cooccurrence
+    from item_dictionary import drop_legacy_table, item_ids
+    from respondent_bitmaps import scan_respondent_bitmaps, write_respondent_bitmaps
+    from salary_sketches import scan_salary_sketches, write_salary_sketches
+    from segment_cube import (
+        SEGMENT_CONFIG,
+        rebuild_segment_catalog,
+        scan_segment_counts,
+        write_segment_counts,
+    )
+    from trend_forecast import materialize_forecasts
+    from trend_leaders import materialize_leaders
+    from trend_payloads import materialize_payloads
+    from trend_rankings import materialize_rankings
+
+
+# ====== 各维度的名称映射（激进版） ======
+
+# 1) Language
+LANGUAGE_MAPPING = {
+    # HTML / CSS
+    "HTML": "HTML/CSS",
+    "CSS": "HTML/CSS",
+    "HTML/CSS": "HTML/CSS",
+
+    # Shell / PowerShell
+    "Bash/Shell (all shells)": "Bash/Shell",
+    "Bash/Shell/PowerShell": "Bash/Shell",
+
+    # Case normalization / duplicates
+    "Matlab": "MATLAB",
+    "Delphi": "Delphi/Object Pascal",
+    "Cobol": "COBOL",
+    "Visual Basic (.Net)": "VB.NET",
+    "Ocaml": "OCaml",
+
+    # Lisp family
+    "LISP": "Lisp",
+    "Common Lisp": "Lisp",
+
+    # Other catch-all
+    "Other(s):": "Other",
+
+    # Additional recommended normalizations
+    "Bash/Shell (All Shells)": "Bash/Shell",
+    "VB.NET": "VB.NET",
+    "Visual Basic 6": "VB6",
+    "VBA": "VB6",
+}
+
+# 2) Database
+DATABASE_MAPPING = {
+    # DynamoDB（大小写与前缀）
+    "DynamoDB": "Amazon DynamoDB",
+    "Dynamodb": "Amazon DynamoDB",
+
+    # Amazon RDS/Aurora 统一
+    "Amazon RDS/Aurora": "Amazon RDS/Aurora",
+
+    # BigQuery
+    "Google BigQuery": "BigQuery",
+
+    # CouchDB
+    "Couch DB": "CouchDB",
+
+    # CosmosDB
+    "Cosmos DB": "CosmosDB",
+
+    # CockroachDB（大小写）
+    "Cockroachdb": "CockroachDB",
+
+    # DB2
+    "IBM DB2": "IBM Db2",
+
+    # Neo4j（大小写）
+    "Neo4J": "Neo4j",
+
+    # SQL Server（与 Microsoft SQL Server 聚合）
+    "SQL Server": "Microsoft SQL Server",
+
+    # Firebase 家族可以分两层（推荐映射）
+    "Firebase": "Firebase Realtime Database",
+    # （理由：用户通常指的就是实时数据库，不是 Firestore）
+
+    # Microsoft Azure 泛称 → 不映射到具体数据库，但统一名称
+    "Microsoft Azure (Tables, CosmosDB, SQL, etc)": "Azure (Multiple Services)",
+
+    # Other
+    "Other(s):": "Other"
+}
+
+# 3) Platform
+PLATFORM_MAPPING = {
+    # AWS variants
+    "Amazon Web Services (AWS)": "AWS",
+
+    # DigitalOcean variants
+    "Digital Ocean": "DigitalOcean",
+
+    # Google Cloud variants
+    "Google Cloud Platform": "Google Cloud",
+    "Google Cloud Platform/App Engine": "Google Cloud",
+    "Google Cloud": "Google Cloud",
+
+    # Azure variants
+    "Microsoft Azure": "Azure",
+
+    # macOS / Mac OS variants
+    "Mac OS": "macOS",
+    "MacOS": "macOS",
+
+    # Desktop / Server -> canonical OS
+    "Linux Desktop": "Linux",
+    "Windows Desktop": "Windows",
+    "Windows Desktop or Server": "Windows",
+
+    # IBM Cloud variants
+    "IBM Cloud Or Watson": "IBM Cloud",
+    "IBM Cloud or Watson": "IBM Cloud",
+
+    # Linode phrasing
+    "Linode, now Akamai": "Linode",
+
+    # Slack integrations
+    "Slack Apps and Integrations": "Slack",
+
+    # Oracle Cloud variants
+    "Oracle Cloud Infrastructure (OCI)": "Oracle Cloud Infrastructure",
+
+    # Misc
+    "Other(s):": "Other",
+}
+
+# 4) Webframe
+WEBFRAME_MAPPING = {
+    # ASP.NET casing normalization
+    "ASP.NET CORE": "ASP.NET Core",
+
+    # Angular / AngularJS variants (keep Angular (2+) separate from AngularJS (1.x))
+    "Angular.js": "AngularJS",
+    "Angular/Angular.js": "AngularJS",
+
+    # React variant
+    "React.js": "React",
+
+    # Spring Boot -> Spring
+    "Spring Boot": "Spring",
+
+    # Torch/PyTorch -> PyTorch
+    "Torch/PyTorch": "PyTorch",
+
+    # Generic catch-all
+    "Other(s):": "Other",
+}
+
+# 5) MiscTech（激进版）
+MISCTECH_MAPPING = {
+    # .NET family normalizations
+    ".NET": ".NET (5+)",
+    ".NET Core": ".NET (5+)",
+    ".NET Core / .NET 5": ".NET (5+)",
+    ".NET (5+)": ".NET (5+)",
+    ".NET Framework (1.0 - 4.8)": ".NET Framework",
+    ".NET Framework": ".NET Framework",
+    ".NET MAUI": ".NET (5+)",
+
+    # casing / typos / duplicates
+    "Scikit-Learn": "Scikit-learn",
+    "Scikit-learn": "Scikit-learn",
+    "Opencv": "OpenCV",
+    "Teraform": "Terraform",
+    "Torch/PyTorch": "PyTorch",
+    "mlflow": "MLflow",
+    "Unity 3D": "Unity",
+
+    # Apache
+    "Apache Spark": "Apache Spark/Kafka",
+    "Apache Kafka": "Apache Spark/Kafka",
+
+    # Spring
+    "Spring Framework": "Spring",
+
+    # catch-all
+    "Other(s):": "Other"
+}
+
+# 6) ToolsTech
+TOOLSTECH_MAPPING = {
+    # Compiler toolchains / frontends - normalize to common short names
+    "GNU GCC": "GCC",
+    "LLVM's Clang": "Clang",
+    "MSVC": "Microsoft Visual C++ (MSVC)",
+
+    # Build tools - remove explanatory parentheticals
+    "Maven (build tool)": "Maven",
+    "Visual Studio Solution": "Visual Studio",
+
+    # Game engines / editors
+    "Unity 3D": "Unity",
+    "Unreal Engine": "Unreal Engine",  # keep but listed for clarity if you want "Unreal"
+
+    # Package / system managers - normalize casing where seen as lowercase
+    "bandit": "Bandit",
+    "cppunit": "CppUnit",
+    "doctest": "Doctest",
+    "lest": "Lest",
+    "liblittletest": "LibLittleTest",
+    "snitch": "Snitch",
+    "tunit": "TUnit",
+
+    # Misc small normalizations / typos
+    "Homebrew": "Homebrew",  # (example kept; remove if unchanged)
+    "NuGet": "NuGet",  # (example kept; remove if unchanged)
+
+    # catch-all
+    "Other(s):": "Other"
+}
+
+# 7) CollabTools
+COLLABTOOLS_MAPPING = {
+    "Github": "GitHub",
+    "Gitlab": "GitLab",
+    "Goland": "GoLand",
+    "IntelliJ": "IntelliJ IDEA",
+    "Rad Studio (Delphi, C++ Builder)": "RAD Studio (Delphi, C++ Builder)",
+    "PHPStorm": "PhpStorm",
+    "Webstorm": "WebStorm",
+    "IPython": "Jupyter",
+    "IPython/Jupyter": "Jupyter",
+    "Jupyter Notebook/JupyterLab": "Jupyter",
+    "Google Suite (Docs, Meet, etc)": "Google Workspace",
+    "Netbeans": "NetBeans",
+    "condo": "Other",
+    "Other(s):": "Other"
+}
+
+# ====== 原有各维度配置 ======
+
+# 1. Language
+LANGUAGE_CONFIG = {
+    2017: {"table": "survey_results_2017", "have": "HaveWorkedLanguage", "want": "WantWorkLanguage"},
+    2018: {"table": "survey_results_2018", "have": "LanguageWorkedWith", "want": "LanguageDesireNextYear"},
+    2019: {"table": "survey_results_2019", "have": "LanguageWorkedWith", "want": "LanguageDesireNextYear"},
+    2020: {"table": "survey_results_2020", "have": "LanguageWorkedWith", "want": "LanguageDesireNextYear"},
+    2021: {"table": "survey_results_2021", "have": "LanguageHaveWorkedWith", "want": "LanguageWantToWorkWith"},
+    2022: {"table": "survey_results_2022", "have": "LanguageHaveWorkedWith", "want": "LanguageWantToWorkWith"},
+    2023: {"table": "survey_results_2023", "have": "LanguageHaveWorkedWith", "want": "LanguageWantToWorkWith"},
+    2024: {"table": "survey_results_2024", "have": "LanguageHaveWorkedWith", "want": "LanguageWantToWorkWith"},
+    2025: {"table": "survey_results_2025", "have": "LanguageHaveWorkedWith", "want": "LanguageWantToWorkWith"},
+}
+
+# 2. Database
+DATABASE_CONFIG = {
+    2017: {"table": "survey_results_2017", "have": "HaveWorkedDatabase", "want": "WantWorkDatabase"},
+    2018: {"table": "survey_results_2018", "have": "DatabaseWorkedWith", "want": "DatabaseDesireNextYear"},
+    2019: {"table": "survey_results_2019", "have": "DatabaseWorkedWith", "want": "DatabaseDesireNextYear"},
+    2020: {"table": "survey_results_2020", "have": "DatabaseWorkedWith", "want": "DatabaseDesireNextYear"},
+    2021: {"table": "survey_results_2021", "have": "DatabaseHaveWorkedWith", "want": "DatabaseWantToWorkWith"},
+    2022: {"table": "survey_results_2022", "have": "DatabaseHaveWorkedWith", "want": "DatabaseWantToWorkWith"},
+    2023: {"table": "survey_results_2023", "have": "DatabaseHaveWorkedWith", "want": "DatabaseWantToWorkWith"},
+    2024: {"table": "survey_results_2024", "have": "DatabaseHaveWorkedWith", "want": "DatabaseWantToWorkWith"},
+    2025: {"table": "survey_results_2025", "have": "DatabaseHaveWorkedWith", "want": "DatabaseWantToWorkWith"},
+}
+
+# 3. Platform
+PLATFORM_CONFIG = {
+    2017: {"table": "survey_results_2017", "have": "HaveWorkedPlatform", "want": "WantWorkPlatform"},
+    2018: {"table": "survey_results_2018", "have": "PlatformWorkedWith", "want": "PlatformDesireNextYear"},
+    2019: {"table": "survey_results_2019", "have": "PlatformWorkedWith", "want": "PlatformDesireNextYear"},
+    2020: {"table": "survey_results_2020", "have": "PlatformWorkedWith", "want": "PlatformDesireNextYear"},
+    2021: {"table": "survey_results_2021", "have": "PlatformHaveWorkedWith", "want": "PlatformWantToWorkWith"},
+    2022: {"table": "survey_results_2022", "have": "PlatformHaveWorkedWith", "want": "PlatformWantToWorkWith"},
+    2023: {"table": "survey_results_2023", "have": "PlatformHaveWorkedWith", "want": "PlatformWantToWorkWith"},
+    2024: {"table": "survey_results_2024", "have": "PlatformHaveWorkedWith", "want": "PlatformWantToWorkWith"},
+    2025: {"table": "survey_results_2025", "have": "PlatformHaveWorkedWith", "want": "PlatformWantToWorkWith"},
+}
+
+# 4. Webframe / Framework
+WEBFRAME_CONFIG = {
+    2017: {"table": "survey_results_2017", "have": "HaveWorkedFramework", "want": "WantWorkFramework"},
+    2018: {"table": "survey_results_2018", "have": "FrameworkWorkedWith", "want": "FrameworkDesireNextYear"},
+    2019: {"table": "survey_results_2019", "have": "WebFrameWorkedWith", "want": "WebFrameDesireNextYear"},
+    2020: {"table": "survey_results_2020", "have": "WebframeWorkedWith", "want": "WebframeDesireNextYear"},
+    2021: {"table": "survey_results_2021", "have": "WebframeHaveWorkedWith", "want": "WebframeWantToWorkWith"},
+    2022: {"table": "survey_results_2022", "have": "WebframeHaveWorkedWith", "want": "WebframeWantToWorkWith"},
+    2023: {"table": "survey_results_2023", "have": "WebframeHaveWorkedWith", "want": "WebframeWantToWorkWith"},
+    2024: {"table": "survey_results_2024", "have": "WebframeHaveWorkedWith", "want": "WebframeWantToWorkWith"},
+    2025: {"table": "survey_results_2025", "have": "WebframeHaveWorkedWith", "want": "WebframeWantToWorkWith"},
+}
+
+# 5. MiscTech
+MISC_TECH_CONFIG = {
+    2019: {"table": "survey_results_2019", "have": "MiscTechWorkedWith", "want": "MiscTechDesireNextYear"},
+    2020: {"table": "survey_results_2020", "have": "MiscTechWorkedWith", "want": "MiscTechDesireNextYear"},
+    2021: {"table": "survey_results_2021", "have": "MiscTechHaveWorkedWith", "want": "MiscTechWantToWorkWith"},
+    2022: {"table": "survey_results_2022", "have": "MiscTechHaveWorkedWith", "want": "MiscTechWantToWorkWith"},
+    2023: {"table": "survey_results_2023", "have": "MiscTechHaveWorkedWith", "want": "MiscTechWantToWorkWith"},
+    2024: {"table": "survey_results_2024", "have": "MiscTechHaveWorkedWith", "want": "MiscTechWantToWorkWith"},
+}
+
+# 6. ToolsTech
+TOOLS_TECH_CONFIG = {
+    2021: {"table": "survey_results_2021", "have": "ToolsTechHaveWorkedWith", "want": "ToolsTechWantToWorkWith"},
+    2022: {"table": "survey_results_2022", "have": "ToolsTechHaveWorkedWith", "want": "ToolsTechWantToWorkWith"},
+    2023: {"table": "survey_results_2023", "have": "ToolsTechHaveWorkedWith", "want": "ToolsTechWantToWorkWith"},
+    2024: {"table": "survey_results_2024", "have": "ToolsTechHaveWorkedWith", "want": "ToolsTechWantToWorkWith"},
+}
+
+# 7. NEWCollabTools
+COLLAB_TOOLS_CONFIG = {
+    2020: {"table": "survey_results_2020", "have": "NEWCollabToolsWorkedWith", "want": "NEWCollabToolsDesireNextYear"},
+    2021: {"table": "survey_results_2021", "have": "NEWCollabToolsHaveWorkedWith", "want": "NEWCollabToolsWantToWorkWith"},
+    2022: {"table": "survey_results_2022", "have": "NEWCollabToolsHaveWorkedWith", "want": "NEWCollabToolsWantToWorkWith"},
+    2023: {"table": "survey_results_2023", "have": "NEWCollabToolsHaveWorkedWith", "want": "NEWCollabToolsWantToWorkWith"},
+    2024: {"table": "survey_results_2024", "have": "NEWCollabToolsHaveWorkedWith", "want": "NEWCollabToolsWantToWorkWith"},
+}
+
+# ====== 汇总表 -> (年度配置, 名称映射) ======
+# 所有构建模式（逐维度 / 单次扫描）都以这份清单为准
+DIMENSION_BUILDS = [
+    {"summary_table": "language_usage_trend", "config": LANGUAGE_CONFIG, "mapping": LANGUAGE_MAPPING, "separator": ";"},
+    {"summary_table": "database_usage_trend", "config": DATABASE_CONFIG, "mapping": DATABASE_MAPPING, "separator": ";"},
+    {"summary_table": "platform_usage_trend", "config": PLATFORM_CONFIG, "mapping": PLATFORM_MAPPING, "separator": ";"},
+    {"summary_table": "webframe_usage_trend", "config": WEBFRAME_CONFIG, "mapping": WEBFRAME_MAPPING, "separator": ";"},
+    {"summary_table": "misctech_usage_trend", "config": MISC_TECH_CONFIG, "mapping": MISCTECH_MAPPING, "separator": ";"},
+    {"summary_table": "toolstech_usage_trend", "config": TOOLS_TECH_CONFIG, "mapping": TOOLSTECH_MAPPING, "separator": ";"},
+    {"summary_table": "collabtools_usage_trend", "config": COLLAB_TOOLS_CONFIG, "mapping": COLLABTOOLS_MAPPING, "separator": ";"},
+]
+
+
+def dimension_of(summary_table):
+    """language_usage_trend -> language（与 trend_service.DIMENSION_TABLES 对应）。"""
+    return summary_table[: -len("_usage_trend")]
+
+
+def get_connection(db_path=None):
+    if db_path is None:
+        here = Path(__file__).resolve()
+        # static/.. = app, .. = backend, .. = 项目根目录
+        project_root = here.parents[3]
+        db_path = project_root / "data" / "devtrend.db"
 
     print("Using database:", db_path)
     conn = sqlite3.connect(db_path)
     return conn
 
 
-def build_yearly_stats(
+def ensure_summary_table(cur, summary_table):
+    """确保汇总表存在（带 base_count）；item 以 items 字典中的整数 id 存放。"""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {summary_table} (
+            year        INTEGER NOT NULL,
+            item_id     INTEGER NOT NULL,   -- items.id
+            have_count  INTEGER NOT NULL,
+            want_count  INTEGER NOT NULL,
+            base_count  INTEGER NOT NULL,   -- 分母：该年有效行数（have 或 want 至少一个不为空）
+            PRIMARY KEY (year, item_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def ensure_summary_indexes(cur, summary_table):
+    """
+    为 API 的访问路径建立覆盖索引（主键 (year, item_id) 之外）：
+    - (item_id, year, ...)：get_trends_for_items 的 WHERE item_id IN (...) ORDER BY item_id, year
+    - (year, have_count DESC, item_id)：get_top_items_for_dimension 的按年 top N，无需再排序
+    """
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS {summary_table}_item_year_idx
+        ON {summary_table} (item_id, year, have_count, want_count, base_count)
+    """)
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS {summary_table}_year_have_idx
+        ON {summary_table} (year, have_count DESC, item_id)
+    """)
+
+
+def has_legacy_schema(cur, summary_table):
+    """早期版本的汇总表以 item 名称为主键（没有 item_id 列），需要整表重建。"""
+    cur.execute(f"PRAGMA table_info({summary_table})")
+    columns = {row[1] for row in cur.fetchall()}
+    return bool(columns) and "item_id" not in columns
+
+
+def _has_value(val):
+    """单元格是否作答：None、NaN（经 pandas / Parquet 读入的空值）、空串与纯空白都算未作答。"""
+    if isinstance(val, float) and math.isnan(val):
+        return False
+    return bool(val) and str(val).strip() != ''
+
+
+def count_year_rows(rows, separator=';', item_mapping=None):
+    """
+    对一年的 (have, want) 行做名称映射 + 每行去重计数（逐行的参考实现，向量化版本须与之一致）。
+
+    返回 (have_counter, want_counter, base_count)。
+    """
+    have_counter = Counter()
+    want_counter = Counter()
+    base_count = 0  # 这一年的有效样本数（分母）
+
+    # 遍历每一行，名称映射 + 每行内部去重
+    for have_val, want_val in rows:
+        has_have = _has_value(have_val)
+        has_want = _has_value(want_val)
+
+        # 只要 have 或 want 任意一个非空，就计入分母
+        if has_have or has_want:
+            base_count += 1
+
+        row_have_items = set()
+        row_want_items = set()
+
+        if has_have:
+            for raw in str(have_val).split(separator):
+                name = raw.strip()
+                if not name:
+                    continue
+                if item_mapping:
+                    name = item_mapping.get(name, name)
+                row_have_items.add(name)
+
+        if has_want:
+            for raw in str(want_val).split(separator):
+                name = raw.strip()
+                if not name:
+                    continue
+                if item_mapping:
+                    name = item_mapping.get(name, name)
+                row_want_items.add(name)
+
+        # 每个 canonical 名称在本行最多 +1
+        for name in row_have_items:
+            have_counter[name] += 1
+        for name in row_want_items:
+            want_counter[name] += 1
+
+    return have_counter, want_counter, base_count
+
+
+def _present_mask(values):
+    """与参考实现 _has_value 一致：非 None / NaN，且 bool(val) and str(val).strip() != ''。"""
+    present = values.notna()
+    return present & values.astype(bool) & values.astype(str).str.strip().ne("")
+
+
+def _count_multi_select(values, present, separator, item_mapping):
+    """
+    把一列多选字符串整体拆分 / 映射 / 每行去重后计数。
+
+    拆分后的 token 先编码成 categorical，名称映射只作用在去重后的类别上，
+    再按 (行号, canonical 编号) 去重，用 bincount 一次性得到计数。
+    """
+    tokens = values[present].astype(str).str.split(separator, regex=False).explode()
+    tokens = tokens.str.strip()
+    tokens = tokens[tokens.ne("")]
+    if tokens.empty:
+        return Counter()
+
+    categories = pd.Categorical(tokens.to_numpy(dtype=object))
+    names = categories.categories
+    if item_mapping:
+        names = [item_mapping.get(name, name) for name in names]
+
+    # 多个原始名称可能映射到同一个 canonical 名称，这里重新编号
+    canonical_codes, canonical_names = pd.factorize(pd.Index(names, dtype=object))
+    item_codes = canonical_codes[categories.codes]
+
+    pairs = pd.DataFrame({
+        "row": tokens.index.to_numpy(),
+        "item": item_codes,
+    }).drop_duplicates()
+    counts = np.bincount(pairs["item"].to_numpy(), minlength=len(canonical_names))
+
+    return Counter({
+        canonical_names[i]: int(count)
+        for i, count in enumerate(counts)
+        if count
+    })
+
+
+def count_year_rows_vectorized(have_values, want_values, separator=';', item_mapping=None):
+    """
+    count_year_rows 的向量化版本（pandas / NumPy），输入为两列 object 类型的 Series。
+
+    返回值与 count_year_rows 完全相同：(have_counter, want_counter, base_count)。
+    """
+    has_have = _present_mask(have_values)
+    has_want = _present_mask(want_values)
+    base_count = int((has_have | has_want).sum())
+
+    have_counter = _count_multi_select(have_values, has_have, separator, item_mapping)
+    want_counter = _count_multi_select(want_values, has_want, separator, item_mapping)
+    return have_counter, want_counter, base_count
+
+
+FINGERPRINT_TABLE = "usage_trend_fingerprints"
+BUILD_META_TABLE = "build_meta"
+
+
+def ensure_fingerprint_table(cur):
+    """每个 (汇总表, 年份) 一条指纹，用于增量重建。"""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FINGERPRINT_TABLE} (
+            summary_table  TEXT    NOT NULL,
+            year           INTEGER NOT NULL,
+            fingerprint    TEXT    NOT NULL,
+            PRIMARY KEY (summary_table, year)
+        )
+    """)
+
+
+def bump_data_version(cur):
+    """
+    每次改写汇总数据时把 build_meta.data_version 加 1。
+    API 以它作为数据版本号，使响应缓存 / ETag 失效。
+    """
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {BUILD_META_TABLE} (
+            key    TEXT PRIMARY KEY,
+            value  INTEGER NOT NULL
+        )
+    """)
+    cur.execute(f"""
+        INSERT INTO {BUILD_META_TABLE} (key, value) VALUES ('data_version', 1)
+        ON CONFLICT(key) DO UPDATE SET value = value + 1
+    """)
+
+
+def table_exists(cur, table_name):
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (table_name,),
+    )
+    return cur.fetchone() is not None
+
+
+def source_identity(cur, source_table, cache=None):
+    """
+    原始表的身份：表名 + 建表语句 + 行数。
+    多个维度共用同一张表时可传入 cache（dict），避免重复 COUNT(*)。
+    """
+    if cache is None:
+        cache = {}
+    if source_table not in cache:
+        cur.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (source_table,),
+        )
+        row = cur.fetchone()
+        schema = row[0] if row else None
+        row_count = None
+        if schema is not None:
+            cur.execute(f"SELECT COUNT(*) FROM {source_table}")
+            row_count = cur.fetchone()[0]
+        cache[source_table] = {"table": source_table, "schema": schema, "row_count": row_count}
+    return cache[source_table]
+
+
+def unit_fingerprint(cur, cfg, separator, item_mapping, source_cache=None):
+    """(维度, 年份) 的指纹：原始表身份 + have/want 列名 + 分隔符 + 名称映射。"""
+    payload = {
+        "source": source_identity(cur, cfg["table"], source_cache),
+        "have": cfg["have"],
+        "want": cfg["want"],
+        "separator": separator,
+        "mapping": sorted((item_mapping or {}).items()),
+    }
+    blob = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def select_stale_years(
     conn,
     summary_table,
     yearly_config,
     separator=';',
     item_mapping=None,
+    force=False,
+    source_cache=None,
 ):
     """
-    通用聚合函数：按年统计 have / want 次数，并记录当年有效样本数 base_count。
+    计算该维度每一年的指纹，返回需要重建的 {year: fingerprint}。
 
-    - 支持名称映射 item_mapping（例如 React.js -> React）
-    - 支持“每行去重”：同一受访者 + 同一 canonical 名称最多算 1 次
+    force=True 或汇总表不存在时全部重建；否则只返回指纹有变化的年份。
     """
     cur = conn.cursor()
+    fingerprints = {
+        year: unit_fingerprint(cur, cfg, separator, item_mapping, source_cache)
+        for year, cfg in yearly_config.items()
+    }
+    if (
+        force
+        or not table_exists(cur, summary_table)
+        or not table_exists(cur, FINGERPRINT_TABLE)
+        or has_legacy_schema(cur, summary_table)
+    ):
+        return fingerprints
+
+    cur.execute(
+        f"SELECT year, fingerprint FROM {FINGERPRINT_TABLE} WHERE summary_table = ?",
+        (summary_table,),
+    )
+    stored = dict(cur.fetchall())
+    return {
+        year: fingerprint
+        for year, fingerprint in fingerprints.items()
+        if stored.get(year) != fingerprint
+    }
 
-    # 1. 确保汇总表存在（带 base_count）
-    cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS {summary_table} (
-            year        INTEGER NOT NULL,
-            item        TEXT    NOT NULL,
-            have_count  INTEGER NOT NULL,
-            want_count  INTEGER NOT NULL,
-            base_count  INTEGER NOT NULL,   -- 分母：该年有效行数（have 或 want 至少一个不为空）
-            PRIMARY KEY (year, item)
+
+@contextmanager
+def transaction(conn):
+    """显式事务：BEGIN IMMEDIATE ... COMMIT，出错则整体 ROLLBACK。"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn.cursor()
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+def iter_summary_rows(year, have_counter, want_counter, base_count, ids):
+    """把一年的计数结果展开成待写入的行 (year, item_id, have, want, base)。ids 为 {名称: item_id}。"""
+    # 合并 have / want 的所有 item
+    # 按名称排序写入，保证串行 / 并行两种模式生成的库文件逐字节一致
+    all_items = sorted(set(have_counter.keys()) | set(want_counter.keys()))
+
+    for item in all_items:
+        yield (
+            year,
+            ids[item],
+            have_counter.get(item, 0),
+            want_counter.get(item, 0),
+            base_count,
         )
-    """)
 
-    for year, cfg in yearly_config.items():
-        source_table = cfg["table"]
-        have_col = cfg["have"]
-        want_col = cfg["want"]
 
-        print(f"Processing {summary_table} for year {year} from {source_table}...")
+def insert_summary_rows(cur, summary_table, rows):
+    """executemany 批量写入汇总行。"""
+    cur.executemany(
+        f"""
+        INSERT OR REPLACE INTO {summary_table}
+            (year, item_id, have_count, want_count, base_count)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
 
-        # 先清掉这一年的旧数据，避免改了映射后留下脏行
-        cur.execute(f"DELETE FROM {summary_table} WHERE year = ?", (year,))
 
-        # 2. 从对应年度原始表中取出 have / want 两列
-        cur.execute(f"""
-            SELECT {have_col}, {want_col}
-            FROM {source_table}
-        """)
-        rows = cur.fetchall()
+def materialize_derived_tables(cur, summary_table):
+    """
+    由汇总表派生的服务端数据：预生成响应 JSON（trend_payloads）、
+    全量排名（trend_rankings）、逐年增长榜单（trend_leaders）与趋势预测（trend_forecasts）。
+    """
+    dimension = dimension_of(summary_table)
+    materialize_payloads(cur, dimension, summary_table)
+    materialize_rankings(cur, dimension, summary_table)
+    materialize_leaders(cur, dimension, summary_table)
+    materialize_forecasts(cur, dimension, summary_table)
+
 
-        have_counter = Counter()
-        want_counter = Counter()
-        base_count = 0  # 这一年的有效样本数（分母）
-
-        # 3. 遍历每一行，名称映射 + 每行内部去重
-        for have_val, want_val in rows:
-            has_have = bool(have_val) and str(have_val).strip() != ''
-            has_want = bool(want_val) and str(want_val).strip() != ''
-
-            # 只要 have 或 want 任意一个非空，就计入分母
-            if has_have or has_want:
-                base_count += 1
-
-            row_have_items = set()
-            row_want_items = set()
-
-            if has_have:
-                for raw in str(have_val).split(separator):
-                    name = raw.strip()
-                    if not name:
-                        continue
-                    if item_mapping:
-                        name = item_mapping.get(name, name)
-                    row_have_items.add(name)
-
-            if has_want:
-                for raw in str(want_val).split(separator):
-                    name = raw.strip()
-                    if not name:
-                        continue
-                    if item_mapping:
-                        name = item_mapping.get(name, name)
-                    row_want_items.add(name)
-
-            # 每个 canonical 名称在本行最多 +1
-            for name in row_have_items:
-                have_counter[name] += 1
-            for name in row_want_items:
-                want_counter[name] += 1
-
-        # 4. 合并 have / want 的所有 item，写入汇总表
-        all_items = set(have_counter.keys()) | set(want_counter.keys())
-
-        for item in all_items:
-            have_count = have_counter.get(item, 0)
-            want_count = want_counter.get(item, 0)
-            cur.execute(
+def write_summary_table(conn, summary_table, year_stats, swap=False, fingerprints=None):
+    """
+    在一个显式事务中写入一个维度所有年份的统计结果，读者不会看到写了一半的年份。
+
+    year_stats: {year: (have_counter, want_counter, base_count)}
+    swap=False：在正式表上按年 DELETE + 批量 INSERT
+    swap=True ：先写入 staging 表（保留未重建年份的旧数据），再在同一事务中替换正式表
+    fingerprints: {year: fingerprint}，与数据在同一事务中落库
+    写完后在同一事务中重新生成该维度的派生数据（见 materialize_derived_tables）
+    """
+    years = list(year_stats.keys())
+    if not years:
+        return
+
+    with transaction(conn) as cur:
+        bump_data_version(cur)
+        # 旧版以名称为键的汇总表：select_stale_years 已安排全部年份重建，这里先删掉旧表
+        drop_legacy_table(cur, summary_table)
+        ids = item_ids(cur, dimension_of(summary_table), [
+            item
+            for have_counter, want_counter, _ in year_stats.values()
+            for item in (*have_counter, *want_counter)
+        ])
+
+        if fingerprints:
+            ensure_fingerprint_table(cur)
+            cur.executemany(
                 f"""
-                INSERT OR REPLACE INTO {summary_table}
-                    (year, item, have_count, want_count, base_count)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT OR REPLACE INTO {FINGERPRINT_TABLE} (summary_table, year, fingerprint)
+                VALUES (?, ?, ?)
                 """,
-                (year, item, have_count, want_count, base_count)
+                [(summary_table, year, fingerprints[year]) for year in years],
             )
 
-    conn.commit()
-
-
-def main():
-    conn = get_connection()
-
-    # ====== 各维度的名称映射（激进版） ======
-
-    # 1) Language
-    language_mapping = {
-        # HTML / CSS
-        "HTML": "HTML/CSS",
-        "CSS": "HTML/CSS",
-        "HTML/CSS": "HTML/CSS",
+        if not swap:
+            ensure_summary_table(cur, summary_table)
+            ensure_summary_indexes(cur, summary_table)
+            for year, (have_counter, want_counter, base_count) in year_stats.items():
+                # 先清掉这一年的旧数据，避免改了映射后留下脏行
+                cur.execute(f"DELETE FROM {summary_table} WHERE year = ?", (year,))
+                insert_summary_rows(
+                    cur, summary_table,
+                    iter_summary_rows(year, have_counter, want_counter, base_count, ids),
+                )
+            materialize_derived_tables(cur, summary_table)
+            return
+
+        staging_table = f"{summary_table}__staging"
+        cur.execute(f"DROP TABLE IF EXISTS {staging_table}")
+        ensure_summary_table(cur, staging_table)
+        ensure_summary_table(cur, summary_table)
+
+        placeholders = ",".join("?" for _ in years)
+        cur.execute(
+            f"""
+            INSERT INTO {staging_table}
+            SELECT year, item_id, have_count, want_count, base_count
+            FROM {summary_table}
+            WHERE year NOT IN ({placeholders})
+            ORDER BY year, item_id
+            """,
+            years,
+        )
+        for year, (have_counter, want_counter, base_count) in year_stats.items():
+            insert_summary_rows(
+                cur, staging_table,
+                iter_summary_rows(year, have_counter, want_counter, base_count, ids),
+            )
 
-        # Shell / PowerShell
-        "Bash/Shell (all shells)": "Bash/Shell",
-        "Bash/Shell/PowerShell": "Bash/Shell",
+        cur.execute(f"DROP TABLE {summary_table}")
+        cur.execute(f"ALTER TABLE {staging_table} RENAME TO {summary_table}")
+        # staging 表批量写完后再建索引，索引名与正式表一致
+        ensure_summary_indexes(cur, summary_table)
 
-        # Case normalization / duplicates
-        "Matlab": "MATLAB",
-        "Delphi": "Delphi/Object Pascal",
-        "Cobol": "COBOL",
-        "Visual Basic (.Net)": "VB.NET",
-        "Ocaml": "OCaml",
+        materialize_derived_tables(cur, summary_table)
 
-        # Lisp family
-        "LISP": "Lisp",
-        "Common Lisp": "Lisp",
 
-        # Other catch-all
-        "Other(s):": "Other",
+def load_cached_columns(cache_dir, source_table, columns):
+    """
+    从 import_csv 写出的列式缓存 {cache_dir}/{source_table}.parquet 中只读取需要的列。
 
-        # Additional recommended normalizations
-        "Bash/Shell (All Shells)": "Bash/Shell",
-        "VB.NET": "VB.NET",
-        "Visual Basic 6": "VB6",
-        "VBA": "VB6",
-    }
+    文件以内存映射方式打开，只解码被请求的列；返回与 columns 对应的 object 数组（NULL 为 None）。
+    """
+    if pq is None:
+        raise RuntimeError("Reading the columnar cache requires pyarrow to be installed")
 
-    # 2) Database
-    database_mapping = {
-        # DynamoDB（大小写与前缀）
-        "DynamoDB": "Amazon DynamoDB",
-        "Dynamodb": "Amazon DynamoDB",
+    path = Path(cache_dir) / f"{source_table}.parquet"
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    return [
+        table.column(col).to_numpy(zero_copy_only=False)
+        for col in columns
+    ]
 
-        # Amazon RDS/Aurora 统一
-        "Amazon RDS/Aurora": "Amazon RDS/Aurora",
 
-        # BigQuery
-        "Google BigQuery": "BigQuery",
+def scan_source_table(cur, source_table, units, engine="python", cache_dir=None):
+    """
+    对一张年度原始表只执行一次 SELECT，取出 units 需要的所有列并分别计数。
 
-        # CouchDB
-        "Couch DB": "CouchDB",
+    units: [(have_col, want_col, separator, item_mapping), ...]
+    engine: "python" 为逐行参考实现，"pandas" 为向量化实现，两者结果相同
+    cache_dir: 给定时改从列式缓存读取这些列，不再逐行 fetch SQLite
+    返回与 units 一一对应的 [(have_counter, want_counter, base_count), ...]。
+    """
+    # 本表需要的所有列（去重且保持顺序）
+    columns = list(dict.fromkeys(
+        col for have_col, want_col, _, _ in units for col in (have_col, want_col)
+    ))
+    col_index = {col: i for i, col in enumerate(columns)}
+
+    if cache_dir is not None:
+        arrays = load_cached_columns(cache_dir, source_table, columns)
+        if engine == "pandas":
+            frame = pd.DataFrame(
+                {col: pd.Series(arr, dtype=object) for col, arr in zip(columns, arrays)},
+                columns=columns,
+            )
+            return _count_frame(frame, units)
+        rows = list(zip(*arrays))
+    else:
+        cur.execute(f"""
+            SELECT {", ".join(columns)}
+            FROM {source_table}
+        """)
+        rows = cur.fetchall()
 
-        # CosmosDB
-        "Cosmos DB": "CosmosDB",
+        if engine == "pandas":
+            return _scan_rows_vectorized(rows, columns, units)
 
-        # CockroachDB（大小写）
-        "Cockroachdb": "CockroachDB",
+    results = []
+    for have_col, want_col, separator, item_mapping in units:
+        hi = col_index[have_col]
+        wi = col_index[want_col]
+        results.append(count_year_rows(
+            ((row[hi], row[wi]) for row in rows),
+            separator,
+            item_mapping,
+        ))
+    return results
 
-        # DB2
-        "IBM DB2": "IBM Db2",
 
-        # Neo4j（大小写）
-        "Neo4J": "Neo4j",
+def _scan_rows_vectorized(rows, columns, units):
+    """把整张表的取数结果转成 object 列，逐个 unit 调用向量化计数。"""
+    if pd is None:
+        raise RuntimeError("engine='pandas' requires pandas and numpy to be installed")
 
-        # SQL Server（与 Microsoft SQL Server 聚合）
-        "SQL Server": "Microsoft SQL Server",
+    # 保持 object 类型，NULL 仍为 None，与参考实现的判空逻辑一致
+    data = np.empty((len(rows), len(columns)), dtype=object)
+    if rows:
+        data[:] = rows
+    frame = pd.DataFrame(data, columns=columns, dtype=object)
+    return _count_frame(frame, units)
 
-        # Firebase 家族可以分两层（推荐映射）
-        "Firebase": "Firebase Realtime Database",
-        # （理由：用户通常指的就是实时数据库，不是 Firestore）
 
-        # Microsoft Azure 泛称 → 不映射到具体数据库，但统一名称
-        "Microsoft Azure (Tables, CosmosDB, SQL, etc)": "Azure (Multiple Services)",
+def _count_frame(frame, units):
+    """对 object 列组成的 DataFrame 逐个 unit 调用向量化计数。"""
+    if pd is None:
+        raise RuntimeError("engine='pandas' requires pandas and numpy to be installed")
 
-        # Other
-        "Other(s):": "Other"
-    }
+    return [
+        count_year_rows_vectorized(frame[have_col], frame[want_col], separator, item_mapping)
+        for have_col, want_col, separator, item_mapping in units
+    ]
 
-    # 3) Platform
-    platform_mapping = {
-        # AWS variants
-        "Amazon Web Services (AWS)": "AWS",
 
-        # DigitalOcean variants
-        "Digital Ocean": "DigitalOcean",
+def _scan_source_table_worker(db_path, source_table, units, engine, cache_dir):
+    """进程池 worker：自己打开只读连接，返回普通的 Counter + base_count。"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return scan_source_table(conn.cursor(), source_table, units, engine, cache_dir)
+    finally:
+        conn.close()
 
-        # Google Cloud variants
-        "Google Cloud Platform": "Google Cloud",
-        "Google Cloud Platform/App Engine": "Google Cloud",
-        "Google Cloud": "Google Cloud",
 
-        # Azure variants
-        "Microsoft Azure": "Azure",
+def get_db_file(conn):
+    """取出连接对应的主库文件路径，供 worker 进程重新打开。"""
+    for _, name, file in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return file
+    raise RuntimeError("Cannot locate main database file")
 
-        # macOS / Mac OS variants
-        "Mac OS": "macOS",
-        "MacOS": "macOS",
 
-        # Desktop / Server -> canonical OS
-        "Linux Desktop": "Linux",
-        "Windows Desktop": "Windows",
-        "Windows Desktop or Server": "Windows",
+def run_scans(conn, scans, workers=1, engine="python", cache_dir=None):
+    """
+    执行一组扫描任务 [(source_table, units), ...]，按输入顺序逐个产出结果。
 
-        # IBM Cloud variants
-        "IBM Cloud Or Watson": "IBM Cloud",
-        "IBM Cloud or Watson": "IBM Cloud",
+    workers > 1 时把每个任务交给进程池并行计算，
+    结果仍按输入顺序交还给调用方（唯一的写入方），保证写入顺序确定。
+    """
+    if workers <= 1 or len(scans) <= 1:
+        cur = conn.cursor()
+        for source_table, units in scans:
+            yield scan_source_table(cur, source_table, units, engine, cache_dir)
+        return
+
+    db_path = get_db_file(conn)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_scan_source_table_worker, db_path, source_table, units, engine, cache_dir)
+            for source_table, units in scans
+        ]
+        for future in futures:
+            yield future.result()
 
-        # Linode phrasing
-        "Linode, now Akamai": "Linode",
 
-        # Slack integrations
-        "Slack Apps and Integrations": "Slack",
+def build_yearly_stats(
+    conn,
+    summary_table,
+    yearly_config,
+    separator=';',
+    item_mapping=None,
+    workers=1,
+    engine="python",
+    swap=False,
+    force=False,
+    cache_dir=None,
+):
+    """
+    通用聚合函数：按年统计 have / want 次数，并记录当年有效样本数 base_count。
 
-        # Oracle Cloud variants
-        "Oracle Cloud Infrastructure (OCI)": "Oracle Cloud Infrastructure",
+    - 支持名称映射 item_mapping（例如 React.js -> React）
+    - 支持“每行去重”：同一受访者 + 同一 canonical 名称最多算 1 次
+    - workers > 1 时每个 (维度, 年份) 交给进程池计算，由当前连接统一写入
+    - engine 选择计数实现："python"（逐行参考实现）或 "pandas"（向量化）
+    - 所有年份算完后在一个事务中批量写入，swap=True 时经 staging 表整体替换
+    - 只重建指纹有变化的年份，force=True 时全部重建
+    - cache_dir 给定时从列式缓存（Parquet）读取原始列
+    """
+    stale = select_stale_years(conn, summary_table, yearly_config, separator, item_mapping, force)
+    skipped = len(yearly_config) - len(stale)
+    if skipped:
+        print(f"Skipping {skipped} up-to-date year(s) of {summary_table}")
+
+    years = list(stale.keys())
+    scans = []
+    for year in years:
+        cfg = yearly_config[year]
+        scans.append((cfg["table"], [(cfg["have"], cfg["want"], separator, item_mapping)]))
+
+    year_stats = {}
+    for year, (source_table, _), results in zip(years, scans, run_scans(conn, scans, workers, engine, cache_dir)):
+        print(f"Processing {summary_table} for year {year} from {source_table}...")
+        year_stats[year] = results[0]
 
-        # Misc
-        "Other(s):": "Other",
-    }
+    write_summary_table(conn, summary_table, year_stats, swap=swap, fingerprints=stale)
 
-    # 4) Webframe
-    webframe_mapping = {
-        # ASP.NET casing normalization
-        "ASP.NET CORE": "ASP.NET Core",
 
-        # Angular / AngularJS variants (keep Angular (2+) separate from AngularJS (1.x))
-        "Angular.js": "AngularJS",
-        "Angular/Angular.js": "AngularJS",
+def plan_source_scans(dimension_builds, stale=None):
+    """
+    把各维度的年度配置按原始表归并：
+    {(year, source_table): [(build, have_col, want_col), ...]}，按年份排序。
 
-        # React variant
-        "React.js": "React",
+    stale: {summary_table: {year: fingerprint}}，给定时只保留需要重建的单元。
+    """
+    scans = {}
+    for build in dimension_builds:
+        for year, cfg in build["config"].items():
+            if stale is not None and year not in stale[build["summary_table"]]:
+                continue
+            key = (year, cfg["table"])
+            scans.setdefault(key, []).append((build, cfg["have"], cfg["want"]))
+    return dict(sorted(scans.items()))
 
-        # Spring Boot -> Spring
-        "Spring Boot": "Spring",
 
-        # Torch/PyTorch -> PyTorch
-        "Torch/PyTorch": "PyTorch",
+def build_all_single_pass(
+    conn,
+    dimension_builds=DIMENSION_BUILDS,
+    workers=1,
+    engine="python",
+    swap=False,
+    force=False,
+    cache_dir=None,
+):
+    """
+    单次扫描模式：每张年度原始表只 SELECT 一次，
+    一次性取出所有维度需要的 have / want 列，再分别填充各 *_usage_trend 表。
 
-        # Generic catch-all
-        "Other(s):": "Other",
+    workers > 1 时每张年度表作为一个任务交给进程池，结果由当前连接统一写入。
+    全部扫描完成后，每个维度在各自的事务中批量写入。
+    只扫描 / 重建指纹有变化的 (维度, 年份)，没有待重建单元的年度表完全不读；force=True 时全部重建。
+    结果与逐维度调用 build_yearly_stats 完全一致。
+    """
+    source_cache = {}
+    stale = {
+        build["summary_table"]: select_stale_years(
+            conn, build["summary_table"], build["config"],
+            build["separator"], build["mapping"], force, source_cache,
+        )
+        for build in dimension_builds
     }
+    total_units = sum(len(build["config"]) for build in dimension_builds)
+    stale_units = sum(len(years) for years in stale.values())
+    print(f"{stale_units}/{total_units} (dimension, year) unit(s) need rebuilding")
+
+    plan = plan_source_scans(dimension_builds, stale)
+    scans = [
+        (source_table, [
+            (have_col, want_col, build["separator"], build["mapping"])
+            for build, have_col, want_col in units
+        ])
+        for (_, source_table), units in plan.items()
+    ]
+
+    stats_by_table = {build["summary_table"]: {} for build in dimension_builds}
+    for ((year, source_table), units), results in zip(plan.items(), run_scans(conn, scans, workers, engine, cache_dir)):
+        print(f"Scanned {source_table} once for {len(units)} dimension(s) of year {year}")
+
+        for (build, _, _), stats in zip(units, results):
+            stats_by_table[build["summary_table"]][year] = stats
+
+    for summary_table, year_stats in stats_by_table.items():
+        if not year_stats:
+            continue
+        print(f"Writing {summary_table} ({len(year_stats)} year(s))...")
+        write_summary_table(
+            conn, summary_table, year_stats,
+            swap=swap, fingerprints=stale[summary_table],
+        )
 
-    # 5) MiscTech（激进版）
-    misctech_mapping = {
-        # .NET family normalizations
-        ".NET": ".NET (5+)",
-        ".NET Core": ".NET (5+)",
-        ".NET Core / .NET 5": ".NET (5+)",
-        ".NET (5+)": ".NET (5+)",
-        ".NET Framework (1.0 - 4.8)": ".NET Framework",
-        ".NET Framework": ".NET Framework",
-        ".NET MAUI": ".NET (5+)",
-
-        # casing / typos / duplicates
-        "Scikit-Learn": "Scikit-learn",
-        "Scikit-learn": "Scikit-learn",
-        "Opencv": "OpenCV",
-        "Teraform": "Terraform",
-        "Torch/PyTorch": "PyTorch",
-        "mlflow": "MLflow",
-        "Unity 3D": "Unity",
-
-        # Apache
-        "Apache Spark": "Apache Spark/Kafka",
-        "Apache Kafka": "Apache Spark/Kafka",
-
-        # Spring
-        "Spring Framework": "Spring",
-
-        # catch-all
-        "Other(s):": "Other"
-    }
 
-    # 6) ToolsTech
-    toolstech_mapping = {
-        # Compiler toolchains / frontends - normalize to common short names
-        "GNU GCC": "GCC",
-        "LLVM's Clang": "Clang",
-        "MSVC": "Microsoft Visual C++ (MSVC)",
-
-        # Build tools - remove explanatory parentheticals
-        "Maven (build tool)": "Maven",
-        "Visual Studio Solution": "Visual Studio",
-
-        # Game engines / editors
-        "Unity 3D": "Unity",
-        "Unreal Engine": "Unreal Engine",  # keep but listed for clarity if you want "Unreal"
-
-        # Package / system managers - normalize casing where seen as lowercase
-        "bandit": "Bandit",
-        "cppunit": "CppUnit",
-        "doctest": "Doctest",
-        "lest": "Lest",
-        "liblittletest": "LibLittleTest",
-        "snitch": "Snitch",
-        "tunit": "TUnit",
-
-        # Misc small normalizations / typos
-        "Homebrew": "Homebrew",  # (example kept; remove if unchanged)
-        "NuGet": "NuGet",  # (example kept; remove if unchanged)
-
-        # catch-all
-        "Other(s):": "Other"
-    }
+def build_respondent_bitmaps(conn, dimension_builds=DIMENSION_BUILDS):
+    """
+    为所有维度的所有年份生成受访者成员位图（respondent_bitmaps），每张年度原始表只扫描一次。
+    每张年度表的结果在一个事务中写入，并递增数据版本号。
+    """
+    plan = plan_source_scans(dimension_builds)
+    cur = conn.cursor()
+    for (year, source_table), units in plan.items():
+        results = scan_respondent_bitmaps(cur, source_table, [
+            (have_col, want_col, build["separator"], build["mapping"])
+            for build, have_col, want_col in units
+        ])
+        print(f"Built respondent bitmaps from {source_table} for {len(units)} dimension(s) of year {year}")
+
+        with transaction(conn) as tx:
+            bump_data_version(tx)
+            for (build, _, _), (have_bitmaps, want_bitmaps, base_bitmap) in zip(units, results):
+                write_respondent_bitmaps(
+                    tx, year, dimension_of(build["summary_table"]),
+                    have_bitmaps, want_bitmaps, base_bitmap,
+                )
+
+
+def build_segment_cube(conn, dimension_builds=DIMENSION_BUILDS):
+    """
+    为所有维度的所有年份生成分群计数立方体（segment_usage_trend），每张年度原始表只扫描一次。
+    每张年度表的结果在一个事务中写入，并递增数据版本号；最后重建 segment_catalog。
+    """
+    plan = plan_source_scans(dimension_builds)
+    cur = conn.cursor()
+    for (year, source_table), units in plan.items():
+        if year not in SEGMENT_CONFIG:
+            continue
+        results = scan_segment_counts(cur, source_table, SEGMENT_CONFIG[year], [
+            (have_col, want_col, build["separator"], build["mapping"])
+            for build, have_col, want_col in units
+        ])
+        print(f"Built segment cube from {source_table} for {len(units)} dimension(s) of year {year}")
+
+        with transaction(conn) as tx:
+            bump_data_version(tx)
+            for (build, _, _), (have_counter, want_counter, base_counter) in zip(units, results):
+                write_segment_counts(
+                    tx, dimension_of(build["summary_table"]), year,
+                    have_counter, want_counter, base_counter,
+                )
+
+    with transaction(conn) as tx:
+        rebuild_segment_catalog(tx)
+
+
+def build_cooccurrence(conn, dimension_builds=DIMENSION_BUILDS):
+    """
+    为每个年份生成跨维度的 have → “下一步” 正 PMI 稀疏矩阵（cooccurrence_pmi），每张年度原始表只扫描一次。
+    每年的结果在一个事务中写入，并递增数据版本号。
+    """
+    if not COOCCURRENCE_AVAILABLE:
+        print("未安装 NumPy，跳过共现矩阵")
+        return
 
-    # 7) CollabTools
-    collabtools_mapping = {
-        "Github": "GitHub",
-        "Gitlab": "GitLab",
-        "Goland": "GoLand",
-        "IntelliJ": "IntelliJ IDEA",
-        "Rad Studio (Delphi, C++ Builder)": "RAD Studio (Delphi, C++ Builder)",
-        "PHPStorm": "PhpStorm",
-        "Webstorm": "WebStorm",
-        "IPython": "Jupyter",
-        "IPython/Jupyter": "Jupyter",
-        "Jupyter Notebook/JupyterLab": "Jupyter",
-        "Google Suite (Docs, Meet, etc)": "Google Workspace",
-        "Netbeans": "NetBeans",
-        "condo": "Other",
-        "Other(s):": "Other"
-    }
+    plan = plan_source_scans(dimension_builds)
+    cur = conn.cursor()
+    for (year, source_table), units in plan.items():
+        keys, have_rows, next_rows = scan_respondent_sets(cur, source_table, [
+            (dimension_of(build["summary_table"]), have_col, want_col, build["separator"], build["mapping"])
+            for build, have_col, want_col in units
+        ])
+        pmi_rows, item_rows = compute_pmi(year, keys, have_rows, next_rows)
+        print(
+            f"Built co-occurrence matrix from {source_table} for year {year}: "
+            f"{len(have_rows)} respondents, {len(item_rows)} items, {len(pmi_rows)} cells"
+        )
 
-    # ====== 原有各维度配置 ======
-
-    # 1. Language
-    language_config = {
-        2017: {"table": "survey_results_2017", "have": "HaveWorkedLanguage", "want": "WantWorkLanguage"},
-        2018: {"table": "survey_results_2018", "have": "LanguageWorkedWith", "want": "LanguageDesireNextYear"},
-        2019: {"table": "survey_results_2019", "have": "LanguageWorkedWith", "want": "LanguageDesireNextYear"},
-        2020: {"table": "survey_results_2020", "have": "LanguageWorkedWith", "want": "LanguageDesireNextYear"},
-        2021: {"table": "survey_results_2021", "have": "LanguageHaveWorkedWith", "want": "LanguageWantToWorkWith"},
-        2022: {"table": "survey_results_2022", "have": "LanguageHaveWorkedWith", "want": "LanguageWantToWorkWith"},
-        2023: {"table": "survey_results_2023", "have": "LanguageHaveWorkedWith", "want": "LanguageWantToWorkWith"},
-        2024: {"table": "survey_results_2024", "have": "LanguageHaveWorkedWith", "want": "LanguageWantToWorkWith"},
-        2025: {"table": "survey_results_2025", "have": "LanguageHaveWorkedWith", "want": "LanguageWantToWorkWith"},
-    }
+        with transaction(conn) as tx:
+            bump_data_version(tx)
+            write_cooccurrence(tx, year, pmi_rows, item_rows)
 
-    # 2. Database
-    database_config = {
-        2017: {"table": "survey_results_2017", "have": "HaveWorkedDatabase", "want": "WantWorkDatabase"},
-        2018: {"table": "survey_results_2018", "have": "DatabaseWorkedWith", "want": "DatabaseDesireNextYear"},
-        2019: {"table": "survey_results_2019", "have": "DatabaseWorkedWith", "want": "DatabaseDesireNextYear"},
-        2020: {"table": "survey_results_2020", "have": "DatabaseWorkedWith", "want": "DatabaseDesireNextYear"},
-        2021: {"table": "survey_results_2021", "have": "DatabaseHaveWorkedWith", "want": "DatabaseWantToWorkWith"},
-        2022: {"table": "survey_results_2022", "have": "DatabaseHaveWorkedWith", "want": "DatabaseWantToWorkWith"},
-        2023: {"table": "survey_results_2023", "have": "DatabaseHaveWorkedWith", "want": "DatabaseWantToWorkWith"},
-        2024: {"table": "survey_results_2024", "have": "DatabaseHaveWorkedWith", "want": "DatabaseWantToWorkWith"},
-        2025: {"table": "survey_results_2025", "have": "DatabaseHaveWorkedWith", "want": "DatabaseWantToWorkWith"},
-    }
 
-    # 3. Platform
-    platform_config = {
-        2017: {"table": "survey_results_2017", "have": "HaveWorkedPlatform", "want": "WantWorkPlatform"},
-        2018: {"table": "survey_results_2018", "have": "PlatformWorkedWith", "want": "PlatformDesireNextYear"},
-        2019: {"table": "survey_results_2019", "have": "PlatformWorkedWith", "want": "PlatformDesireNextYear"},
-        2020: {"table": "survey_results_2020", "have": "PlatformWorkedWith", "want": "PlatformDesireNextYear"},
-        2021: {"table": "survey_results_2021", "have": "PlatformHaveWorkedWith", "want": "PlatformWantToWorkWith"},
-        2022: {"table": "survey_results_2022", "have": "PlatformHaveWorkedWith", "want": "PlatformWantToWorkWith"},
-        2023: {"table": "survey_results_2023", "have": "PlatformHaveWorkedWith", "want": "PlatformWantToWorkWith"},
-        2024: {"table": "survey_results_2024", "have": "PlatformHaveWorkedWith", "want": "PlatformWantToWorkWith"},
-        2025: {"table": "survey_results_2025", "have": "PlatformHaveWorkedWith", "want": "PlatformWantToWorkWith"},
-    }
+def build_salary_sketches(conn, dimension_builds=DIMENSION_BUILDS):
+    """
+    为每个年份生成薪资分位数草图（salary_sketches），每张年度原始表只扫描一次。
+    每年的结果在一个事务中写入，并递增数据版本号。
+    """
+    plan = plan_source_scans(dimension_builds)
+    cur = conn.cursor()
+    for (year, source_table), units in plan.items():
+        sketches = scan_salary_sketches(cur, source_table, year, [
+            (dimension_of(build["summary_table"]), have_col, build["separator"], build["mapping"])
+            for build, have_col, _ in units
+        ])
+        if not sketches:
+            print(f"No salary column in {source_table}, skipping year {year}")
+            continue
+
+        with transaction(conn) as tx:
+            bump_data_version(tx)
+            written = write_salary_sketches(tx, year, sketches)
+        print(f"Built {written} salary sketches from {source_table} for year {year}")
+
+
+def ensure_all_summary_indexes(conn, dimension_builds=DIMENSION_BUILDS):
+    """给已存在的汇总表补建索引（旧库即使没有待重建的单元也能用上新索引）。"""
+    with transaction(conn) as cur:
+        for build in dimension_builds:
+            summary_table = build["summary_table"]
+            if table_exists(cur, summary_table) and not has_legacy_schema(cur, summary_table):
+                ensure_summary_indexes(cur, summary_table)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="生成各维度的 *_usage_trend 汇总表")
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=None,
+        help="SQLite 数据库路径，默认 data/devtrend.db",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["single-pass", "per-dimension"],
+        default="single-pass",
+        help="single-pass：每张年度表只扫描一次；per-dimension：逐维度调用 build_yearly_stats",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="并行聚合的进程数，<= 1 表示串行（输出与串行逐字节一致）",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["python", "pandas"],
+        default="python",
+        help="计数实现：python 为逐行参考实现，pandas 为向量化实现（结果相同）",
+    )
+    parser.add_argument(
+        "--swap",
+        action="store_true",
+        help="先写入 staging 表再整体替换正式表（默认在正式表上按年覆盖）",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="忽略指纹，重建所有维度的所有年份",
+    )
+    parser.add_argument(
+        "--source",
+        choices=["sqlite", "parquet"],
+        default="sqlite",
+        help="原始列的读取来源：sqlite 表，或 import_csv --parquet-cache 写出的列式缓存",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="列式缓存目录，默认 data/cache",
+    )
+    parser.add_argument(
+        "--bitmaps",
+        action="store_true",
+        help="同时重建受访者成员位图（respondent_bitmaps，供跨维度交集查询；会重新扫描所有年度表）",
+    )
+    parser.add_argument(
+        "--segments",
+        action="store_true",
+        help="同时重建按国家 / 编程年限 / 开发者类型分群的计数立方体（segment_usage_trend；会重新扫描所有年度表）",
+    )
+    parser.add_argument(
+        "--cooccurrence",
+        action="store_true",
+        help="同时重建跨维度的共现 / PMI 矩阵（cooccurrence_pmi，供 /api/advice 推荐；会重新扫描所有年度表）",
+    )
+    parser.add_argument(
+        "--salary",
+        action="store_true",
+        help="同时重建薪资分位数草图（salary_sketches，供 /api/salary；会重新扫描所有年度表）",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = get_connection(args.db)
+
+    cache_dir = None
+    if args.source == "parquet":
+        cache_dir = args.cache_dir or Path(__file__).resolve().parents[3] / "data" / "cache"
+
+    if args.mode == "single-pass":
+        build_all_single_pass(
+            conn,
+            DIMENSION_BUILDS,
+            workers=args.workers,
+            engine=args.engine,
+            swap=args.swap,
+            force=args.force,
+            cache_dir=cache_dir,
+        )
+    else:
+        # 依次构建 7 个维度的汇总表（直接生成“已经归一化 + 去重”的 raw 表）
+        for build in DIMENSION_BUILDS:
+            build_yearly_stats(
+                conn,
+                build["summary_table"],
+                build["config"],
+                separator=build["separator"],
+                item_mapping=build["mapping"],
+                workers=args.workers,
+                engine=args.engine,
+                swap=args.swap,
+                force=args.force,
+                cache_dir=cache_dir,
+            )
 
-    # 4. Webframe / Framework
-    webframe_config = {
-        2017: {"table": "survey_results_2017", "have": "HaveWorkedFramework", "want": "WantWorkFramework"},
-        2018: {"table": "survey_results_2018", "have": "FrameworkWorkedWith", "want": "FrameworkDesireNextYear"},
-        2019: {"table": "survey_results_2019", "have": "WebFrameWorkedWith", "want": "WebFrameDesireNextYear"},
-        2020: {"table": "survey_results_2020", "have": "WebframeWorkedWith", "want": "WebframeDesireNextYear"},
-        2021: {"table": "survey_results_2021", "have": "WebframeHaveWorkedWith", "want": "WebframeWantToWorkWith"},
-        2022: {"table": "survey_results_2022", "have": "WebframeHaveWorkedWith", "want": "WebframeWantToWorkWith"},
-        2023: {"table": "survey_results_2023", "have": "WebframeHaveWorkedWith", "want": "WebframeWantToWorkWith"},
-        2024: {"table": "survey_results_2024", "have": "WebframeHaveWorkedWith", "want": "WebframeWantToWorkWith"},
-        2025: {"table": "survey_results_2025", "have": "WebframeHaveWorkedWith", "want": "WebframeWantToWorkWith"},
-    }
+    ensure_all_summary_indexes(conn, DIMENSION_BUILDS)
 
-    # 5. MiscTech
-    misc_tech_config = {
-        2019: {"table": "survey_results_2019", "have": "MiscTechWorkedWith", "want": "MiscTechDesireNextYear"},
-        2020: {"table": "survey_results_2020", "have": "MiscTechWorkedWith", "want": "MiscTechDesireNextYear"},
-        2021: {"table": "survey_results_2021", "have": "MiscTechHaveWorkedWith", "want": "MiscTechWantToWorkWith"},
-        2022: {"table": "survey_results_2022", "have": "MiscTechHaveWorkedWith", "want": "MiscTechWantToWorkWith"},
-        2023: {"table": "survey_results_2023", "have": "MiscTechHaveWorkedWith", "want": "MiscTechWantToWorkWith"},
-        2024: {"table": "survey_results_2024", "have": "MiscTechHaveWorkedWith", "want": "MiscTechWantToWorkWith"},
-    }
+    if args.bitmaps:
+        build_respondent_bitmaps(conn, DIMENSION_BUILDS)
 
-    # 6. ToolsTech
-    tools_tech_config = {
-        2021: {"table": "survey_results_2021", "have": "ToolsTechHaveWorkedWith", "want": "ToolsTechWantToWorkWith"},
-        2022: {"table": "survey_results_2022", "have": "ToolsTechHaveWorkedWith", "want": "ToolsTechWantToWorkWith"},
-        2023: {"table": "survey_results_2023", "have": "ToolsTechHaveWorkedWith", "want": "ToolsTechWantToWorkWith"},
-        2024: {"table": "survey_results_2024", "have": "ToolsTechHaveWorkedWith", "want": "ToolsTechWantToWorkWith"},
-    }
+    if args.segments:
+        build_segment_cube(conn, DIMENSION_BUILDS)
 
-    # 7. NEWCollabTools
-    collab_tools_config = {
-        2020: {"table": "survey_results_2020", "have": "NEWCollabToolsWorkedWith", "want": "NEWCollabToolsDesireNextYear"},
-        2021: {"table": "survey_results_2021", "have": "NEWCollabToolsHaveWorkedWith", "want": "NEWCollabToolsWantToWorkWith"},
-        2022: {"table": "survey_results_2022", "have": "NEWCollabToolsHaveWorkedWith", "want": "NEWCollabToolsWantToWorkWith"},
-        2023: {"table": "survey_results_2023", "have": "NEWCollabToolsHaveWorkedWith", "want": "NEWCollabToolsWantToWorkWith"},
-        2024: {"table": "survey_results_2024", "have": "NEWCollabToolsHaveWorkedWith", "want": "NEWCollabToolsWantToWorkWith"},
-    }
+    if args.cooccurrence:
+        build_cooccurrence(conn, DIMENSION_BUILDS)
 
-    # 依次构建 7 个维度的汇总表（直接生成“已经归一化 + 去重”的 raw 表）
-    build_yearly_stats(conn, "language_usage_trend", language_config, separator=';', item_mapping=language_mapping)
-    build_yearly_stats(conn, "database_usage_trend", database_config, separator=';', item_mapping=database_mapping)
-    build_yearly_stats(conn, "platform_usage_trend", platform_config, separator=';', item_mapping=platform_mapping)
-    build_yearly_stats(conn, "webframe_usage_trend", webframe_config, separator=';', item_mapping=webframe_mapping)
-    build_yearly_stats(conn, "misctech_usage_trend", misc_tech_config, separator=';', item_mapping=misctech_mapping)
-    build_yearly_stats(conn, "toolstech_usage_trend", tools_tech_config, separator=';', item_mapping=toolstech_mapping)
-    build_yearly_stats(conn, "collabtools_usage_trend", collab_tools_config, separator=';', item_mapping=collabtools_mapping)
+    if args.salary:
+        build_salary_sketches(conn, DIMENSION_BUILDS)
 
     conn.close()
 
@@ -0,0 +1,66 @@
+"""
+全部维度共用的 item 字典：items(id, dimension, name)，name 为经名称映射后的 canonical 名称。
+
+汇总表与各派生表都只存整数 item_id，名称只在这里出现一次：
+主键 / 索引比存完整字符串（如 "Microsoft Visual C++ (MSVC)"）小得多，按 item 的查找和关联都是整数比较。
+
+- id 只追加、不回收：某个名称从数据中消失后其 id 仍保留，已有 id 不会因为重建而变化，
+  因此各派生表可以分别增量重建
+- ALL_ITEMS_ID（0）不对应任何 item，用于“该维度全体”等汇总行（如位图的 base、薪资的全体受访者）
+"""
+
+ITEM_TABLE = "items"
+
+# 与 app/services/item_dictionary.ALL_ITEMS_ID 保持一致
+ALL_ITEMS_ID = 0
+
+
+def ensure_item_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ITEM_TABLE} (
+            id         INTEGER PRIMARY KEY,
+            dimension  TEXT    NOT NULL,
+            name       TEXT    NOT NULL,
+            UNIQUE (dimension, name)
+        )
+    """)
+
+
+def item_ids(cur, dimension, names):
+    """
+    返回 {name: id}，字典中还没有的名称先分配新 id（在调用方的事务内执行）。
+    """
+    ensure_item_table(cur)
+    names = sorted(set(names))
+    cur.executemany(
+        f"INSERT OR IGNORE INTO {ITEM_TABLE} (dimension, name) VALUES (?, ?)",
+        [(dimension, name) for name in names],
+    )
+    cur.execute(f"SELECT name, id FROM {ITEM_TABLE} WHERE dimension = ?", (dimension,))
+    ids = dict(cur.fetchall())
+    return {name: ids[name] for name in names}
+
+
+def keyed_item_ids(cur, keys):
+    """跨维度版本的 item_ids：keys 为 (dimension, name)，返回 {(dimension, name): id}。"""
+    names_by_dimension = {}
+    for dimension, name in keys:
+        names_by_dimension.setdefault(dimension, set()).add(name)
+
+    ids = {}
+    for dimension, names in sorted(names_by_dimension.items()):
+        for name, item_id in item_ids(cur, dimension, names).items():
+            ids[(dimension, name)] = item_id
+    return ids
+
+
+def drop_legacy_table(cur, table, key_column="item_id"):
+    """
+    早期版本的表以 item 名称为键；表存在但缺少 key_column 时直接删除，由调用方按新结构重建。
+    返回是否删除了表。
+    """
+    columns = {row[1] for row in cur.execute(f"PRAGMA table_info({table})")}
+    if columns and key_column not in columns:
+        cur.execute(f"DROP TABLE {table}")
+        return True
+    return False
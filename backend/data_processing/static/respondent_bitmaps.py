@@ -0,0 +1,144 @@
+"""
+受访者级别的成员关系位图：对每个 (年份, 维度, item, have/want) 记录“哪些受访者选了它”，
+供 /api/cohorts 的交集查询使用（如“Rust 使用者里用哪些数据库”），不再需要重新解析原始调查表。
+
+- 位图的第 i 位表示原始表 survey_results_YYYY 中 rowid = i 的那一行；
+  同一年的所有维度来自同一张原始表，因此跨维度的位图可以直接按位与
+- 位图以小端字节序存放并经 zlib 压缩（稀疏的 item 压缩后很小）
+- kind = 'base' 的行（item_id 为 ALL_ITEMS_ID）是该维度该年的有效样本：have 或 want 至少一个不为空，
+  其基数即汇总表中的 base_count；'have' / 'want' 行的基数即 have_count / want_count
+
+respondent_bitmaps 主键 (year, dimension, kind, item_id)。
+"""
+import zlib
+
+try:
+    from .item_dictionary import ALL_ITEMS_ID, drop_legacy_table, item_ids
+except ImportError:  # 直接以脚本方式运行 generate_usage_trend.py 时
+    from item_dictionary import ALL_ITEMS_ID, drop_legacy_table, item_ids
+
+BITMAP_TABLE = "respondent_bitmaps"
+
+BASE_KIND = "base"
+
+
+def ensure_bitmap_table(cur):
+    drop_legacy_table(cur, BITMAP_TABLE)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {BITMAP_TABLE} (
+            year         INTEGER NOT NULL,
+            dimension    TEXT    NOT NULL,
+            kind         TEXT    NOT NULL,   -- have / want / base
+            item_id      INTEGER NOT NULL,   -- items.id；kind = 'base' 时为 ALL_ITEMS_ID
+            cardinality  INTEGER NOT NULL,   -- 位图中 1 的个数
+            bitmap       BLOB    NOT NULL,   -- zlib 压缩的小端位图
+            PRIMARY KEY (year, dimension, kind, item_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def parse_items(value, separator, item_mapping):
+    """把一个多选单元格解析成 canonical 名称集合（与 count_year_rows 的口径一致）。"""
+    if not value or str(value).strip() == '':
+        return set()
+
+    names = set()
+    for raw in str(value).split(separator):
+        name = raw.strip()
+        if not name:
+            continue
+        if item_mapping:
+            name = item_mapping.get(name, name)
+        names.add(name)
+    return names
+
+
+class BitmapBuilder:
+    """按 rowid 置位的可变位图：先收集、最后一次性编码，避免反复构造大整数。"""
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.cardinality = 0
+
+    def add(self, row_id):
+        index = row_id >> 3
+        if index >= len(self.buf):
+            self.buf.extend(b"\0" * (index + 1 - len(self.buf)))
+        mask = 1 << (row_id & 7)
+        if not self.buf[index] & mask:
+            self.buf[index] |= mask
+            self.cardinality += 1
+
+    def encode(self):
+        return zlib.compress(bytes(self.buf))
+
+
+def scan_respondent_bitmaps(cur, source_table, units):
+    """
+    对一张年度原始表执行一次 SELECT，为每个 unit 生成位图。
+
+    units: [(have_col, want_col, separator, item_mapping), ...]
+    返回与 units 一一对应的 [(have_bitmaps, want_bitmaps, base_bitmap), ...]，
+    其中 have_bitmaps / want_bitmaps 为 {item: BitmapBuilder}。
+    """
+    columns = list(dict.fromkeys(
+        col for have_col, want_col, _, _ in units for col in (have_col, want_col)
+    ))
+    col_index = {col: i + 1 for i, col in enumerate(columns)}
+
+    cur.execute(f"""
+        SELECT rowid, {", ".join(columns)}
+        FROM {source_table}
+    """)
+    rows = cur.fetchall()
+
+    results = []
+    for have_col, want_col, separator, item_mapping in units:
+        hi = col_index[have_col]
+        wi = col_index[want_col]
+        have_bitmaps = {}
+        want_bitmaps = {}
+        base_bitmap = BitmapBuilder()
+
+        for row in rows:
+            row_id = row[0]
+            row_have_items = parse_items(row[hi], separator, item_mapping)
+            row_want_items = parse_items(row[wi], separator, item_mapping)
+
+            # 只要 have 或 want 任意一个非空，就计入分母
+            has_have = bool(row[hi]) and str(row[hi]).strip() != ''
+            has_want = bool(row[wi]) and str(row[wi]).strip() != ''
+            if has_have or has_want:
+                base_bitmap.add(row_id)
+
+            for name in row_have_items:
+                have_bitmaps.setdefault(name, BitmapBuilder()).add(row_id)
+            for name in row_want_items:
+                want_bitmaps.setdefault(name, BitmapBuilder()).add(row_id)
+
+        results.append((have_bitmaps, want_bitmaps, base_bitmap))
+    return results
+
+
+def write_respondent_bitmaps(cur, year, dimension, have_bitmaps, want_bitmaps, base_bitmap):
+    """替换某个 (年份, 维度) 的全部位图（在调用方的事务内执行）。"""
+    ensure_bitmap_table(cur)
+    cur.execute(
+        f"DELETE FROM {BITMAP_TABLE} WHERE year = ? AND dimension = ?",
+        (year, dimension),
+    )
+
+    ids = item_ids(cur, dimension, [*have_bitmaps, *want_bitmaps])
+    rows = [(year, dimension, BASE_KIND, ALL_ITEMS_ID, base_bitmap.cardinality, base_bitmap.encode())]
+    for kind, bitmaps in (("have", have_bitmaps), ("want", want_bitmaps)):
+        for item in sorted(bitmaps, key=ids.get):
+            bitmap = bitmaps[item]
+            rows.append((year, dimension, kind, ids[item], bitmap.cardinality, bitmap.encode()))
+
+    cur.executemany(
+        f"""
+        INSERT INTO {BITMAP_TABLE} (year, dimension, kind, item_id, cardinality, bitmap)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
@@ -0,0 +1,209 @@
+"""
+薪资分位数草图：每年只扫描一次年度原始表的年薪列，按 (年份, 技术 item, 可选分群) 生成可合并的分位数草图，
+供 /api/salary 直接回答 p25 / 中位数 / p75 / p90，以及多个 item、多个年份合并后的分位数，不再读取原始行。
+
+草图为对数分桶直方图（DDSketch 的做法）：
+- 值 x 落入桶 ceil(log(x) / log(GAMMA))，GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+- 每个桶的代表值与桶内任意值的相对误差不超过 RELATIVE_ACCURACY（1%）
+- 合并即桶计数相加，结果与直接对合并后的数据建草图完全相同（与合并顺序无关）
+- 落库时只存非空的桶：桶号差分 + 计数，int32 小端数组再经 zlib 压缩，通常只有几百字节
+
+salary_sketches：主键 (year, item_id, segment, segment_value)
+- item_id = ALL_ITEMS_ID（0）表示全体有薪资的受访者（item_id 全局唯一，已隐含维度）
+- segment = segment_value = "*" 表示不分群；否则 segment 为 country / years_code / dev_type 之一
+  （只按单个分群列切分，不做组合，分群取值的归一方式与 segment_cube 相同）
+- 只计入“在用”（have）该 item 的受访者；样本数少于 MIN_SKETCH_COUNT 的草图不落库
+"""
+import math
+import sys
+import zlib
+from array import array
+from collections import Counter
+
+try:
+    from .item_dictionary import ALL_ITEMS_ID, drop_legacy_table, keyed_item_ids
+    from .respondent_bitmaps import parse_items
+    from .segment_cube import (
+        MIN_COUNTRY_RESPONDENTS,
+        SEGMENT_CONFIG,
+        bucket_years_code,
+        existing_columns,
+        normalize_country,
+        split_dev_types,
+    )
+except ImportError:  # 直接以脚本方式运行 generate_usage_trend.py 时
+    from item_dictionary import ALL_ITEMS_ID, drop_legacy_table, keyed_item_ids
+    from respondent_bitmaps import parse_items
+    from segment_cube import (
+        MIN_COUNTRY_RESPONDENTS,
+        SEGMENT_CONFIG,
+        bucket_years_code,
+        existing_columns,
+        normalize_country,
+        split_dev_types,
+    )
+
+SALARY_TABLE = "salary_sketches"
+
+# 与 salary_service 保持一致
+ALL = "*"
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+MIN_SKETCH_COUNT = 10
+
+# 各年份的年薪列（已折算为美元），按顺序取原始表中第一个存在的列
+SALARY_COLUMNS = {
+    2017: ("Salary", "ConvertedCompYearly"),
+    2018: ("ConvertedSalary", "ConvertedCompYearly"),
+    2019: ("ConvertedComp", "ConvertedCompYearly"),
+    2020: ("ConvertedComp", "ConvertedCompYearly"),
+    2021: ("ConvertedCompYearly",),
+    2022: ("ConvertedCompYearly",),
+    2023: ("ConvertedCompYearly",),
+    2024: ("ConvertedCompYearly",),
+    2025: ("ConvertedCompYearly",),
+}
+
+
+def ensure_salary_table(cur):
+    drop_legacy_table(cur, SALARY_TABLE)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SALARY_TABLE} (
+            year           INTEGER NOT NULL,
+            item_id        INTEGER NOT NULL,   -- items.id；ALL_ITEMS_ID 表示全体
+            segment        TEXT    NOT NULL,   -- "*" / country / years_code / dev_type
+            segment_value  TEXT    NOT NULL,
+            count          INTEGER NOT NULL,   -- 草图中的样本数
+            sketch         BLOB    NOT NULL,   -- zlib 压缩的 (桶号差分, 计数) int32 小端数组
+            PRIMARY KEY (year, item_id, segment, segment_value)
+        ) WITHOUT ROWID
+    """)
+
+
+def parse_salary(value):
+    """原始表中的年薪取值 -> 正的 float；空值、非数字、非正数返回 None。"""
+    if value is None:
+        return None
+    try:
+        salary = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(salary) or salary <= 0:
+        return None
+    return salary
+
+
+def bucket_of(salary):
+    return math.ceil(math.log(salary) / LOG_GAMMA)
+
+
+def encode_sketch(buckets):
+    """{桶号: 计数} -> 压缩后的 bytes。"""
+    indices = sorted(buckets)
+    deltas = [b - a for a, b in zip([0] + indices, indices)]
+    values = array("i", [len(indices)] + deltas + [buckets[i] for i in indices])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return zlib.compress(values.tobytes())
+
+
+def resolve_salary_column(present, year):
+    for column in SALARY_COLUMNS.get(year, ()):
+        if column in present:
+            return column
+    return None
+
+
+def scan_salary_sketches(cur, source_table, year, units):
+    """
+    对一张年度原始表执行一次 SELECT，生成该年的全部草图。
+
+    units: [(dimension, have_col, separator, item_mapping), ...]
+    返回 {(dimension, item, segment, segment_value): Counter(桶号 -> 计数)}；该年没有年薪列时返回空字典。
+    """
+    present = existing_columns(cur, source_table)
+    salary_col = resolve_salary_column(present, year)
+    if salary_col is None:
+        return {}
+
+    segment_cfg = SEGMENT_CONFIG.get(year, {})
+    segment_cols = [
+        segment_cfg.get(name) if segment_cfg.get(name) in present else "NULL"
+        for name in ("country", "years_code", "dev_type")
+    ]
+    have_cols = list(dict.fromkeys(have_col for _, have_col, _, _ in units))
+    col_index = {col: i + 4 for i, col in enumerate(have_cols)}
+
+    cur.execute(f"""
+        SELECT {", ".join([salary_col] + segment_cols + have_cols)}
+        FROM {source_table}
+    """)
+    rows = cur.fetchall()
+
+    # 与 segment_cube 相同：按当年全部受访者（不只是填了薪资的）数国家人数，
+    # 人数太少的国家归入 Other，两边的国家分群取值才一致
+    country_sizes = Counter(normalize_country(row[1]) for row in rows)
+
+    sketches = {}
+    for row in rows:
+        salary = parse_salary(row[0])
+        if salary is None:
+            continue
+        bucket = bucket_of(salary)
+
+        segments = [(ALL, ALL)]
+        country = normalize_country(row[1])
+        if country is not None:
+            if country_sizes[country] < MIN_COUNTRY_RESPONDENTS:
+                country = "Other"
+            segments.append(("country", country))
+        years_code = bucket_years_code(row[2])
+        if years_code is not None:
+            segments.append(("years_code", years_code))
+        segments.extend(("dev_type", dev_type) for dev_type in sorted(split_dev_types(row[3])))
+
+        keys = [(ALL, ALL)]
+        for dimension, have_col, separator, item_mapping in units:
+            keys.extend(
+                (dimension, item)
+                for item in parse_items(row[col_index[have_col]], separator, item_mapping)
+            )
+
+        for dimension, item in keys:
+            for segment, segment_value in segments:
+                key = (dimension, item, segment, segment_value)
+                counter = sketches.get(key)
+                if counter is None:
+                    counter = sketches[key] = Counter()
+                counter[bucket] += 1
+
+    return sketches
+
+
+def write_salary_sketches(cur, year, sketches):
+    """替换某一年的全部草图（在调用方的事务内执行）。"""
+    ensure_salary_table(cur)
+    cur.execute(f"DELETE FROM {SALARY_TABLE} WHERE year = ?", (year,))
+
+    ids = keyed_item_ids(cur, {(dimension, item) for dimension, item, _, _ in sketches if dimension != ALL})
+    ids[(ALL, ALL)] = ALL_ITEMS_ID
+
+    rows = []
+    for (dimension, item, segment, segment_value), buckets in sketches.items():
+        count = sum(buckets.values())
+        if count < MIN_SKETCH_COUNT:
+            continue
+        rows.append((year, ids[(dimension, item)], segment, segment_value, count, encode_sketch(buckets)))
+    rows.sort(key=lambda row: row[:4])
+
+    cur.executemany(
+        f"""
+        INSERT INTO {SALARY_TABLE}
+            (year, item_id, segment, segment_value, count, sketch)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    return len(rows)
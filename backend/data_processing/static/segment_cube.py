@@ -0,0 +1,304 @@
+"""
+分群趋势立方体：按国家、编程年限、开发者类型三个低基数的分群列预先聚合 have / want / base 计数，
+供 /api/trends/{dimension}?country=...&years_code=...&dev_type=... 直接查表，不再重扫原始调查表。
+
+segment_usage_trend：(维度, country, years_code, dev_type, 年份, item_id) -> 计数，
+分群列取 "*" 表示该列不做筛选（上卷）；三列都为 "*" 的行与 *_usage_trend 一致。
+
+- 开发者类型是多选题：一个受访者会计入其选择的每一个类型，“*” 按人计数（不是各类型之和）
+- 国家先经 COUNTRY_MAPPING 归一；当年受访者少于 MIN_COUNTRY_RESPONDENTS 的国家归入 "Other"
+- 编程年限按 YEARS_CODE_BUCKETS 分段（各年份题目的取值形式不同，统一取区间上限分段，"N or more" / "More than N" 取 N + 1）
+- 样本数（base_count）小于 MIN_CELL_BASE 的分群组合不落库，避免输出没有统计意义的比例
+
+segment_catalog：每个维度、每个分群列下可用的取值及其累计样本数，供前端生成筛选项。
+"""
+import re
+from collections import Counter
+
+try:
+    from .item_dictionary import drop_legacy_table, item_ids
+    from .respondent_bitmaps import parse_items
+except ImportError:  # 直接以脚本方式运行 generate_usage_trend.py 时
+    from item_dictionary import drop_legacy_table, item_ids
+    from respondent_bitmaps import parse_items
+
+SEGMENT_TABLE = "segment_usage_trend"
+SEGMENT_CATALOG_TABLE = "segment_catalog"
+
+# 与 trend_service.SEGMENT_ALL 保持一致
+ALL = "*"
+SEGMENT_COLUMNS = ("country", "years_code", "dev_type")
+
+MIN_COUNTRY_RESPONDENTS = 200
+MIN_CELL_BASE = 30
+
+# 各年份原始表中对应的列名（缺失的列视为不可分群，只计入 "*"）
+SEGMENT_CONFIG = {
+    2017: {"country": "Country", "years_code": "YearsProgram", "dev_type": "DeveloperType"},
+    2018: {"country": "Country", "years_code": "YearsCoding", "dev_type": "DevType"},
+    2019: {"country": "Country", "years_code": "YearsCode", "dev_type": "DevType"},
+    2020: {"country": "Country", "years_code": "YearsCode", "dev_type": "DevType"},
+    2021: {"country": "Country", "years_code": "YearsCode", "dev_type": "DevType"},
+    2022: {"country": "Country", "years_code": "YearsCode", "dev_type": "DevType"},
+    2023: {"country": "Country", "years_code": "YearsCode", "dev_type": "DevType"},
+    2024: {"country": "Country", "years_code": "YearsCode", "dev_type": "DevType"},
+    2025: {"country": "Country", "years_code": "YearsCode", "dev_type": "DevType"},
+}
+
+# (下限, 分段名)：编程年数落入第一个下限不超过它的分段
+# 各年份的答案形式：
+# - 2017 YearsProgram："Less than a year"、"1 to 2 years" …… "19 to 20 years"、"20 or more years"
+# - 2018 YearsCoding ："0-2 years"、"3-5 years"、"6-8 years"、"9-11 years" …… "27-29 years"、"30 or more years"
+# - 2019+ YearsCode  ："Less than 1 year"、"1" …… "50"、"More than 50 years"
+# 区间答案取上限（"9-11 years" -> 11），"N or more" / "More than N" 取 N + 1，"Less than ..." 取 0，
+# 这样 2017 的 "20 or more years" 归入 21+，跨年份比较时各分段的口径一致
+YEARS_CODE_BUCKETS = (
+    (21, "21+"),
+    (11, "11-20"),
+    (6, "6-10"),
+    (3, "3-5"),
+    (0, "0-2"),
+)
+
+COUNTRY_MAPPING = {
+    "United States of America": "United States",
+    "United Kingdom of Great Britain and Northern Ireland": "United Kingdom",
+    "Russian Federation": "Russia",
+    "Iran, Islamic Republic of...": "Iran",
+    "Viet Nam": "Vietnam",
+    "Republic of Korea": "South Korea",
+    "The former Yugoslav Republic of Macedonia": "North Macedonia",
+}
+
+# 不同年份的开发者类型名称归一到 2019 年之后的写法
+DEV_TYPE_MAPPING = {
+    "Web developer": "Developer, full-stack",
+    "Full-stack developer": "Developer, full-stack",
+    "Back-end developer": "Developer, back-end",
+    "Front-end developer": "Developer, front-end",
+    "Mobile developer": "Developer, mobile",
+    "Desktop applications developer": "Developer, desktop or enterprise applications",
+    "Desktop or enterprise applications developer": "Developer, desktop or enterprise applications",
+    "Embedded applications/devices developer": "Developer, embedded applications or devices",
+    "Embedded applications or devices developer": "Developer, embedded applications or devices",
+    "Game or graphics developer": "Developer, game or graphics",
+    "QA or test developer": "Developer, QA or test",
+    "Data scientist": "Data scientist or machine learning specialist",
+    "Machine learning specialist": "Data scientist or machine learning specialist",
+    "DevOps specialist": "DevOps specialist",
+}
+
+_NUMBER = re.compile(r"\d+")
+
+
+def ensure_segment_tables(cur):
+    drop_legacy_table(cur, SEGMENT_TABLE)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SEGMENT_TABLE} (
+            dimension   TEXT    NOT NULL,
+            country     TEXT    NOT NULL,
+            years_code  TEXT    NOT NULL,
+            dev_type    TEXT    NOT NULL,
+            year        INTEGER NOT NULL,
+            item_id     INTEGER NOT NULL,   -- items.id
+            have_count  INTEGER NOT NULL,
+            want_count  INTEGER NOT NULL,
+            base_count  INTEGER NOT NULL,
+            PRIMARY KEY (dimension, country, years_code, dev_type, item_id, year)
+        ) WITHOUT ROWID
+    """)
+    # 分群内按年 top N：无需再排序
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS {SEGMENT_TABLE}_year_have_idx
+        ON {SEGMENT_TABLE} (dimension, country, years_code, dev_type, year, have_count DESC, item_id)
+    """)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SEGMENT_CATALOG_TABLE} (
+            dimension    TEXT    NOT NULL,
+            segment      TEXT    NOT NULL,   -- country / years_code / dev_type
+            value        TEXT    NOT NULL,
+            respondents  INTEGER NOT NULL,   -- 各年份该取值的 base_count 之和
+            PRIMARY KEY (dimension, segment, value)
+        ) WITHOUT ROWID
+    """)
+
+
+def bucket_years_code(value):
+    """把各年份形式不一的编程年限（"12"、"3-5 years"、"20 or more years"、"Less than 1 year" 等）归入 YEARS_CODE_BUCKETS。"""
+    if value is None or str(value).strip() == "":
+        return None
+    text = str(value).strip().lower()
+    if text.startswith("less than"):
+        return YEARS_CODE_BUCKETS[-1][1]
+
+    numbers = [int(n) for n in _NUMBER.findall(text)]
+    if not numbers:
+        return None
+    if "or more" in text or text.startswith("more than"):
+        years = numbers[-1] + 1
+    else:
+        years = max(numbers)
+    for lower, name in YEARS_CODE_BUCKETS:
+        if years >= lower:
+            return name
+    return None
+
+
+def normalize_country(value):
+    if value is None or str(value).strip() == "":
+        return None
+    name = str(value).strip()
+    return COUNTRY_MAPPING.get(name, name)
+
+
+def split_dev_types(value):
+    return parse_items(value, ";", DEV_TYPE_MAPPING)
+
+
+def existing_columns(cur, source_table):
+    return {row[1] for row in cur.execute(f"PRAGMA table_info({source_table})")}
+
+
+def scan_segment_counts(cur, source_table, segment_cfg, units):
+    """
+    对一张年度原始表执行一次 SELECT，为每个 unit 统计各分群组合的计数。
+
+    segment_cfg: {"country": 列名, "years_code": 列名, "dev_type": 列名}，原始表中缺失的列按未作答处理
+    units: [(have_col, want_col, separator, item_mapping), ...]
+    返回与 units 一一对应的 [(have_counter, want_counter, base_counter), ...]：
+    have / want 以 ((country, years_code, dev_type), item) 为键，base 以分群组合为键；已完成上卷。
+    """
+    present = existing_columns(cur, source_table)
+    segment_cols = [segment_cfg[name] if segment_cfg[name] in present else "NULL" for name in SEGMENT_COLUMNS]
+    columns = list(dict.fromkeys(
+        col for have_col, want_col, _, _ in units for col in (have_col, want_col)
+    ))
+    col_index = {col: i + 3 for i, col in enumerate(columns)}
+
+    cur.execute(f"""
+        SELECT {", ".join(segment_cols + columns)}
+        FROM {source_table}
+    """)
+    rows = cur.fetchall()
+
+    # 先数出当年各国家的受访者数，人数太少的国家归入 Other
+    country_sizes = Counter(normalize_country(row[0]) for row in rows)
+    segments = []
+    for row in rows:
+        country = normalize_country(row[0])
+        if country is not None and country_sizes[country] < MIN_COUNTRY_RESPONDENTS:
+            country = "Other"
+        years_code = bucket_years_code(row[1])
+        # 开发者类型多选：每个类型各一个叶子，外加一个按人计数的 "*"
+        dev_types = sorted(split_dev_types(row[2])) + [ALL]
+        segments.append((country or ALL, years_code or ALL, dev_types))
+
+    results = []
+    for have_col, want_col, separator, item_mapping in units:
+        hi = col_index[have_col]
+        wi = col_index[want_col]
+        have_leaf = Counter()
+        want_leaf = Counter()
+        base_leaf = Counter()
+
+        for row, (country, years_code, dev_types) in zip(rows, segments):
+            has_have = bool(row[hi]) and str(row[hi]).strip() != ''
+            has_want = bool(row[wi]) and str(row[wi]).strip() != ''
+            if not (has_have or has_want):
+                continue
+
+            row_have_items = parse_items(row[hi], separator, item_mapping)
+            row_want_items = parse_items(row[wi], separator, item_mapping)
+            for dev_type in dev_types:
+                leaf = (country, years_code, dev_type)
+                base_leaf[leaf] += 1
+                for name in row_have_items:
+                    have_leaf[(leaf, name)] += 1
+                for name in row_want_items:
+                    want_leaf[(leaf, name)] += 1
+
+        results.append((
+            rollup(have_leaf, keyed_by_item=True),
+            rollup(want_leaf, keyed_by_item=True),
+            rollup(base_leaf, keyed_by_item=False),
+        ))
+    return results
+
+
+def _rollup_targets(leaf):
+    """一个叶子 (country, years_code, dev_type) 需要累加到的全部组合（country / years_code 可上卷为 "*"）。"""
+    country, years_code, dev_type = leaf
+    return {
+        (c, y, dev_type)
+        for c in (country, ALL)
+        for y in (years_code, ALL)
+    }
+
+
+def rollup(leaf_counter, keyed_by_item):
+    """把叶子计数上卷到 country / years_code 的 "*"（单选列，直接求和不会重复计数）。"""
+    total = Counter()
+    for key, count in leaf_counter.items():
+        leaf, item = key if keyed_by_item else (key, None)
+        for target in _rollup_targets(leaf):
+            total[(target, item) if keyed_by_item else target] += count
+    return total
+
+
+def iter_segment_rows(dimension, year, have_counter, want_counter, base_counter, ids):
+    """展开成待写入的行，跳过样本数不足 MIN_CELL_BASE 的分群组合（全体 "*" 行始终保留）。ids 为 {名称: item_id}。"""
+    items_by_cell = {}
+    for cell, item in list(have_counter) + list(want_counter):
+        items_by_cell.setdefault(cell, set()).add(item)
+
+    for cell in sorted(items_by_cell):
+        base_count = base_counter[cell]
+        if base_count < MIN_CELL_BASE and cell != (ALL, ALL, ALL):
+            continue
+        country, years_code, dev_type = cell
+        for item in sorted(items_by_cell[cell], key=ids.get):
+            yield (
+                dimension, country, years_code, dev_type, year, ids[item],
+                have_counter.get((cell, item), 0),
+                want_counter.get((cell, item), 0),
+                base_count,
+            )
+
+
+def write_segment_counts(cur, dimension, year, have_counter, want_counter, base_counter):
+    """替换某个 (维度, 年份) 的全部分群计数（在调用方的事务内执行）。"""
+    ensure_segment_tables(cur)
+    cur.execute(
+        f"DELETE FROM {SEGMENT_TABLE} WHERE dimension = ? AND year = ?",
+        (dimension, year),
+    )
+    ids = item_ids(cur, dimension, [item for _, item in (*have_counter, *want_counter)])
+    cur.executemany(
+        f"""
+        INSERT INTO {SEGMENT_TABLE}
+            (dimension, country, years_code, dev_type, year, item_id, have_count, want_count, base_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        iter_segment_rows(dimension, year, have_counter, want_counter, base_counter, ids),
+    )
+
+
+def rebuild_segment_catalog(cur):
+    """按 segment_usage_trend 中实际落库的分群重建 segment_catalog。"""
+    ensure_segment_tables(cur)
+    cur.execute(f"DELETE FROM {SEGMENT_CATALOG_TABLE}")
+    for segment in SEGMENT_COLUMNS:
+        others = [col for col in SEGMENT_COLUMNS if col != segment]
+        cur.execute(
+            f"""
+            INSERT INTO {SEGMENT_CATALOG_TABLE} (dimension, segment, value, respondents)
+            SELECT dimension, ?, {segment}, SUM(base_count)
+            FROM (
+                SELECT DISTINCT dimension, {segment}, year, base_count
+                FROM {SEGMENT_TABLE}
+                WHERE {segment} != ? AND {others[0]} = ? AND {others[1]} = ?
+            )
+            GROUP BY dimension, {segment}
+            """,
+            (segment, ALL, ALL, ALL),
+        )
@@ -0,0 +1,185 @@
+"""
+技术流行度预测：对一个维度内的全部 item 一次性拟合加权线性回归，并把未来几年的预测写入数据库，
+供 /api/trends/{dimension}/forecast 直接读取（接口不做任何拟合）。
+
+模型：分别以 have_ratio、want_ratio 为因变量、年份为自变量的加权最小二乘，
+越近的年份权重越大（每往前一年乘以 RECENCY_DECAY）；给出 CONFIDENCE 水平的预测区间，
+比例及区间都截断到 [0, 1]。至少有 MIN_YEARS_FOR_TREND 个年份数据的 item 才做预测。
+
+所有 item 的数据排成 item × year 矩阵（缺失年份由掩码剔除），拟合与预测都是整矩阵的 NumPy 运算，
+不按 item 循环。
+
+trend_forecasts：每个 item 一份 ItemForecast JSON 片段，主键 (dimension, item_id)。
+"""
+
+try:
+    import numpy as np
+except ImportError:  # 预测依赖 NumPy，缺失时跳过（接口返回 404）
+    np = None
+
+try:
+    from .item_dictionary import drop_legacy_table, item_ids
+    from .trend_payloads import dumps
+    from .trend_rankings import load_item_points
+except ImportError:  # 直接以脚本方式运行 generate_usage_trend.py 时
+    from item_dictionary import drop_legacy_table, item_ids
+    from trend_payloads import dumps
+    from trend_rankings import load_item_points
+
+FORECAST_TABLE = "trend_forecasts"
+
+# 与 trend_service.MIN_YEARS_FOR_TREND 保持一致
+MIN_YEARS_FOR_TREND = 3
+FORECAST_HORIZON = 3      # 预测最近一年之后的几年
+RECENCY_DECAY = 0.8       # 每往前一年，样本权重乘以该系数
+CONFIDENCE = 0.95
+MODEL_NAME = "weighted_linear"
+
+# 双侧 95% 的 t 分布分位数（自由度 1..30），更大的自由度用正态近似
+T_975 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+def ensure_forecast_table(cur):
+    drop_legacy_table(cur, FORECAST_TABLE)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FORECAST_TABLE} (
+            dimension  TEXT    NOT NULL,
+            item_id    INTEGER NOT NULL,   -- items.id
+            fragment   BLOB    NOT NULL,
+            PRIMARY KEY (dimension, item_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def t_quantiles(dof):
+    """按自由度数组取 t 分位数。"""
+    table = np.array(T_975)
+    return np.where(dof <= len(T_975), table[np.clip(dof, 1, len(T_975)) - 1], 1.96)
+
+
+def fit_weighted_linear(x, values, mask):
+    """
+    对每一行（一个 item）做加权线性回归 values ~ a + b * x。
+
+    x     : (n_years,)，以最近一年为 0 的年份偏移
+    values: (n_items, n_years)，缺失处任意
+    mask  : (n_items, n_years)，True 表示该年有数据
+    返回 dict：slope / intercept / s2（残差方差）/ sw / mx / sxx / dof，均为 (n_items,)
+    """
+    weights = np.where(mask, RECENCY_DECAY ** (-x), 0.0)
+    n = mask.sum(axis=1)
+    # 权重归一到“和为样本数”，残差方差与区间的口径与普通最小二乘一致
+    weights = weights * (n / weights.sum(axis=1))[:, None]
+    values = np.where(mask, values, 0.0)
+
+    sw = weights.sum(axis=1)
+    mx = (weights * x).sum(axis=1) / sw
+    my = (weights * values).sum(axis=1) / sw
+    dx = x[None, :] - mx[:, None]
+    sxx = (weights * dx * dx).sum(axis=1)
+    sxy = (weights * dx * (values - my[:, None])).sum(axis=1)
+
+    slope = sxy / sxx
+    intercept = my - slope * mx
+    resid = values - (intercept[:, None] + slope[:, None] * x[None, :])
+    dof = n - 2
+    s2 = (weights * resid * resid).sum(axis=1) / dof
+
+    return {
+        "slope": slope, "intercept": intercept, "s2": s2,
+        "sw": sw, "mx": mx, "sxx": sxx, "dof": dof,
+    }
+
+
+def predict(fit, x_future):
+    """返回 (预测值, 下界, 上界)，形状均为 (n_items, len(x_future))，截断到 [0, 1]。"""
+    x0 = x_future[None, :]
+    mean = fit["intercept"][:, None] + fit["slope"][:, None] * x0
+    se = np.sqrt(fit["s2"][:, None] * (
+        1.0 + 1.0 / fit["sw"][:, None] + (x0 - fit["mx"][:, None]) ** 2 / fit["sxx"][:, None]
+    ))
+    half = t_quantiles(fit["dof"])[:, None] * se
+    return (
+        np.clip(mean, 0.0, 1.0),
+        np.clip(mean - half, 0.0, 1.0),
+        np.clip(mean + half, 0.0, 1.0),
+    )
+
+
+def build_forecast_fragments(points_by_item, years):
+    """对全部 item 批量拟合并预测，返回 {item: ItemForecast JSON bytes}。"""
+    items = sorted(
+        item for item, points in points_by_item.items()
+        if len(points) >= MIN_YEARS_FOR_TREND
+    )
+    if not items or not years:
+        return {}
+
+    year_index = {year: j for j, year in enumerate(years)}
+    have = np.zeros((len(items), len(years)))
+    want = np.zeros((len(items), len(years)))
+    mask = np.zeros((len(items), len(years)), dtype=bool)
+    for i, item in enumerate(items):
+        for year, (have_ratio, want_ratio) in points_by_item[item].items():
+            j = year_index[year]
+            have[i, j] = have_ratio
+            want[i, j] = want_ratio
+            mask[i, j] = True
+
+    last_year = years[-1]
+    x = np.array(years, dtype=float) - last_year
+    future_years = list(range(last_year + 1, last_year + 1 + FORECAST_HORIZON))
+    x_future = np.array(future_years, dtype=float) - last_year
+
+    have_fit = fit_weighted_linear(x, have, mask)
+    want_fit = fit_weighted_linear(x, want, mask)
+    have_pred = [a.tolist() for a in predict(have_fit, x_future)]
+    want_pred = [a.tolist() for a in predict(want_fit, x_future)]
+    have_slope = have_fit["slope"].tolist()
+    want_slope = want_fit["slope"].tolist()
+
+    fragments = {}
+    for i, item in enumerate(items):
+        points = [
+            {
+                "year": year,
+                "have_ratio": have_pred[0][i][k],
+                "have_lower": have_pred[1][i][k],
+                "have_upper": have_pred[2][i][k],
+                "want_ratio": want_pred[0][i][k],
+                "want_lower": want_pred[1][i][k],
+                "want_upper": want_pred[2][i][k],
+            }
+            for k, year in enumerate(future_years)
+        ]
+        fragments[item] = dumps({
+            "item": item,
+            "model": MODEL_NAME,
+            "confidence": CONFIDENCE,
+            "have_slope": have_slope[i],
+            "want_slope": want_slope[i],
+            "points": points,
+        })
+    return fragments
+
+
+def materialize_forecasts(cur, dimension, summary_table):
+    """重新生成某个维度的全部预测（在调用方的事务内执行，与汇总数据一同提交）。"""
+    ensure_forecast_table(cur)
+    cur.execute(f"DELETE FROM {FORECAST_TABLE} WHERE dimension = ?", (dimension,))
+
+    if np is None:
+        print(f"[{dimension}] 未安装 NumPy，跳过趋势预测")
+        return
+
+    points_by_item, years = load_item_points(cur, summary_table)
+    fragments = build_forecast_fragments(points_by_item, years)
+    ids = item_ids(cur, dimension, fragments)
+    cur.executemany(
+        f"INSERT INTO {FORECAST_TABLE} (dimension, item_id, fragment) VALUES (?, ?, ?)",
+        sorted((dimension, ids[item], fragment) for item, fragment in fragments.items()),
+    )
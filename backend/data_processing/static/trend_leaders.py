@@ -0,0 +1,99 @@
+"""
+预计算每个维度、每一年的增长 / 势头榜单，供 /api/trends/{dimension}/leaders 直接按名次读取。
+
+trend_leaders：每个 (维度, 指标, 年份) 下有值的 item 各一行，rank 按指标值降序从 1 连续编号
+（同值按名称升序）；主键 (dimension, metric, year, rank) 即榜单索引，
+无论取前几名还是末几名都只是一次主键范围读取。item 存 items.id。
+
+指标（比例均为 count / base_count）：
+- yoy_delta ：使用率相对上一个调查年份的变化（百分点）
+- yoy_growth：使用率相对上一个调查年份的变化幅度（相对值，上一年使用率为 0 时无值）
+- cagr      ：从 item 首次出现的年份到该年的使用率年复合增长率（至少跨两年）
+- want_gap  ：期望率 - 使用率，正值表示“想用的人比在用的人多”
+"""
+
+try:
+    from .item_dictionary import drop_legacy_table, item_ids
+    from .trend_rankings import load_item_points
+except ImportError:  # 直接以脚本方式运行 generate_usage_trend.py 时
+    from item_dictionary import drop_legacy_table, item_ids
+    from trend_rankings import load_item_points
+
+LEADER_TABLE = "trend_leaders"
+
+# 与 trend_service.LEADER_METRICS 保持一致
+LEADER_METRICS = ("yoy_delta", "yoy_growth", "cagr", "want_gap")
+
+
+def ensure_leader_table(cur):
+    drop_legacy_table(cur, LEADER_TABLE)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {LEADER_TABLE} (
+            dimension   TEXT    NOT NULL,
+            metric      TEXT    NOT NULL,
+            year        INTEGER NOT NULL,
+            rank        INTEGER NOT NULL,
+            item_id     INTEGER NOT NULL,  -- items.id
+            value       REAL    NOT NULL,
+            have_ratio  REAL    NOT NULL,  -- 该年的使用率
+            want_ratio  REAL    NOT NULL,  -- 该年的期望率
+            PRIMARY KEY (dimension, metric, year, rank)
+        ) WITHOUT ROWID
+    """)
+
+
+def metric_values(points, year, prev_year):
+    """计算某个 item 在某一年的各项指标：{metric: value}，无法计算的指标不出现。"""
+    have_ratio, want_ratio = points[year]
+    values = {"want_gap": want_ratio - have_ratio}
+
+    previous = points.get(prev_year) if prev_year is not None else None
+    if previous is not None:
+        values["yoy_delta"] = have_ratio - previous[0]
+        if previous[0] > 0:
+            values["yoy_growth"] = have_ratio / previous[0] - 1.0
+
+    first_year = min(points)
+    first_ratio = points[first_year][0]
+    if year > first_year and first_ratio > 0:
+        values["cagr"] = (have_ratio / first_ratio) ** (1.0 / (year - first_year)) - 1.0
+
+    return values
+
+
+def build_leader_rows(dimension, series, years, ids):
+    """生成 trend_leaders 的全部行：(dimension, metric, year, rank, item_id, value, have_ratio, want_ratio)。"""
+    rows = []
+    for index, year in enumerate(years):
+        prev_year = years[index - 1] if index > 0 else None
+
+        entries = {metric: [] for metric in LEADER_METRICS}
+        for item, points in series.items():
+            if year not in points:
+                continue
+            have_ratio, want_ratio = points[year]
+            for metric, value in metric_values(points, year, prev_year).items():
+                entries[metric].append((item, value, have_ratio, want_ratio))
+
+        for metric in LEADER_METRICS:
+            ranked = sorted(entries[metric], key=lambda e: e[0])
+            ranked.sort(key=lambda e: e[1], reverse=True)
+            for rank, (item, value, have_ratio, want_ratio) in enumerate(ranked, start=1):
+                rows.append((dimension, metric, year, rank, ids[item], value, have_ratio, want_ratio))
+    return rows
+
+
+def materialize_leaders(cur, dimension, summary_table):
+    """重新生成某个维度的全部榜单（在调用方的事务内执行，与汇总数据一同提交）。"""
+    ensure_leader_table(cur)
+    cur.execute(f"DELETE FROM {LEADER_TABLE} WHERE dimension = ?", (dimension,))
+
+    series, years = load_item_points(cur, summary_table)
+    cur.executemany(
+        f"""
+        INSERT INTO {LEADER_TABLE}
+            (dimension, metric, year, rank, item_id, value, have_ratio, want_ratio)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        build_leader_rows(dimension, series, years, item_ids(cur, dimension, series)),
+    )
@@ -0,0 +1,147 @@
+"""
+预生成 /api/trends/{dimension} 的响应 JSON。
+
+- trend_payloads：每个维度、每个 top N（1..MAX_TOP_N）一份完整的 TrendResponse JSON
+- trend_item_fragments：每个 item 一份 ItemTrend JSON 片段，供任意 items= 请求拼接，主键 (dimension, item_id)
+
+结构与 backend/app/models/trend.py 中的模型保持一致，计算口径与 trend_service 相同。
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # 可选的快速 JSON 编码器
+    orjson = None
+
+try:
+    from .item_dictionary import ITEM_TABLE, drop_legacy_table, item_ids
+except ImportError:  # 直接以脚本方式运行 generate_usage_trend.py 时
+    from item_dictionary import ITEM_TABLE, drop_legacy_table, item_ids
+
+
+PAYLOAD_TABLE = "trend_payloads"
+FRAGMENT_TABLE = "trend_item_fragments"
+
+# 与 trend_service.MIN_YEARS_FOR_TREND 保持一致：至少出现 3 年才算有“趋势”
+MIN_YEARS_FOR_TREND = 3
+# 与 /api/trends/{dimension} 的 limit 上限保持一致
+MAX_TOP_N = 50
+
+
+def dumps(obj):
+    """紧凑 JSON（bytes），有 orjson 时用 orjson。"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def ensure_payload_tables(cur):
+    drop_legacy_table(cur, FRAGMENT_TABLE)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {PAYLOAD_TABLE} (
+            dimension  TEXT    NOT NULL,
+            top_n      INTEGER NOT NULL,
+            payload    BLOB    NOT NULL,
+            PRIMARY KEY (dimension, top_n)
+        )
+    """)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FRAGMENT_TABLE} (
+            dimension  TEXT    NOT NULL,
+            item_id    INTEGER NOT NULL,   -- items.id
+            fragment   BLOB    NOT NULL,
+            PRIMARY KEY (dimension, item_id)
+        )
+    """)
+
+
+def build_item_fragments(cur, summary_table):
+    """读出整张汇总表，按 item 生成 ItemTrend JSON 片段：{item: bytes}。"""
+    cur.execute(f"""
+        SELECT s.year, i.name, s.have_count, s.want_count, s.base_count
+        FROM {summary_table} AS s
+        JOIN {ITEM_TABLE} AS i ON i.id = s.item_id
+        ORDER BY i.name ASC, s.year ASC
+    """)
+
+    points_by_item = {}
+    for year, item, have_count, want_count, base_count in cur.fetchall():
+        if base_count and base_count > 0:
+            have_ratio = have_count / base_count
+            want_ratio = want_count / base_count
+        else:
+            have_ratio = 0.0
+            want_ratio = 0.0
+
+        points_by_item.setdefault(item, []).append({
+            "year": year,
+            "have_ratio": have_ratio,
+            "want_ratio": want_ratio,
+            "have_count": have_count,
+            "want_count": want_count,
+            "base_count": base_count,
+        })
+
+    return {
+        item: dumps({"item": item, "points": points})
+        for item, points in points_by_item.items()
+        if len(points) >= MIN_YEARS_FOR_TREND
+    }
+
+
+def stitch_payload(dimension, fragments):
+    """把若干 ItemTrend 片段拼成一份 TrendResponse JSON。"""
+    return b"".join([
+        b'{"dimension":', dumps(dimension), b',"items":[',
+        b",".join(fragments),
+        b"]}",
+    ])
+
+
+def materialize_payloads(cur, dimension, summary_table):
+    """
+    重新生成某个维度的全部预生成 JSON（在调用方的事务内执行，与汇总数据一同提交）。
+
+    top N 的选取与 trend_service.get_top_items_for_dimension 一致：
+    最近一年按 have_count 降序（同分按名称）取前 N 个，再按名称排序并过滤年份不足的 item。
+    """
+    ensure_payload_tables(cur)
+    cur.execute(f"DELETE FROM {PAYLOAD_TABLE} WHERE dimension = ?", (dimension,))
+    cur.execute(f"DELETE FROM {FRAGMENT_TABLE} WHERE dimension = ?", (dimension,))
+
+    fragments = build_item_fragments(cur, summary_table)
+    ids = item_ids(cur, dimension, fragments)
+    cur.executemany(
+        f"INSERT INTO {FRAGMENT_TABLE} (dimension, item_id, fragment) VALUES (?, ?, ?)",
+        sorted((dimension, ids[item], fragment) for item, fragment in fragments.items()),
+    )
+
+    cur.execute(f"SELECT MAX(year) FROM {summary_table}")
+    last_year = cur.fetchone()[0]
+    if last_year is None:
+        return
+
+    cur.execute(
+        f"""
+        SELECT i.name
+        FROM {summary_table} AS s
+        JOIN {ITEM_TABLE} AS i ON i.id = s.item_id
+        WHERE s.year = ?
+        ORDER BY s.have_count DESC, i.name ASC
+        LIMIT ?
+        """,
+        (last_year, MAX_TOP_N),
+    )
+    top_items = [row[0] for row in cur.fetchall()]
+
+    payload_rows = []
+    for top_n in range(1, MAX_TOP_N + 1):
+        chosen = [fragments[item] for item in sorted(top_items[:top_n]) if item in fragments]
+        # 没有可展示的 item 时不写入，由接口走实时查询并返回 404
+        if chosen:
+            payload_rows.append((dimension, top_n, stitch_payload(dimension, chosen)))
+
+    cur.executemany(
+        f"INSERT INTO {PAYLOAD_TABLE} (dimension, top_n, payload) VALUES (?, ?, ?)",
+        payload_rows,
+    )
@@ -0,0 +1,137 @@
+"""
+预计算每个维度全部 item 的排名，供 /api/trends/{dimension}/ranking 按 rank 做 keyset 分页。
+
+trend_rankings：每个 (维度, 排序键) 下每个 item 一行，rank 从 1 开始连续编号，
+主键 (dimension, sort_key, rank) 即分页所需的索引，每页只是一次主键范围读取；item 存 items.id。
+
+排序键（都按值降序，值为 NULL 的排在最后，同值按名称升序）：
+- have_ratio ：维度最近一年的使用率（该年没有数据为 NULL）
+- want_ratio ：维度最近一年的期望率
+- growth     ：最近一年相对上一年的使用率变化（百分点，缺任一年为 NULL）
+- latest_year：item 最后出现的年份，同年再按该年使用率
+"""
+
+try:
+    from .item_dictionary import ITEM_TABLE, drop_legacy_table, item_ids
+except ImportError:  # 直接以脚本方式运行 generate_usage_trend.py 时
+    from item_dictionary import ITEM_TABLE, drop_legacy_table, item_ids
+
+RANKING_TABLE = "trend_rankings"
+
+# 与 trend_service.RANKING_SORT_KEYS 保持一致
+RANKING_SORT_KEYS = ("have_ratio", "want_ratio", "growth", "latest_year")
+
+
+def ensure_ranking_table(cur):
+    drop_legacy_table(cur, RANKING_TABLE)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {RANKING_TABLE} (
+            dimension    TEXT    NOT NULL,
+            sort_key     TEXT    NOT NULL,
+            rank         INTEGER NOT NULL,
+            item_id      INTEGER NOT NULL,  -- items.id
+            value        REAL,              -- 排序所用的值
+            latest_year  INTEGER NOT NULL,  -- item 最后出现的年份
+            have_ratio   REAL    NOT NULL,  -- latest_year 当年的使用率
+            want_ratio   REAL    NOT NULL,  -- latest_year 当年的期望率
+            growth       REAL,
+            PRIMARY KEY (dimension, sort_key, rank)
+        ) WITHOUT ROWID
+    """)
+
+
+def _ratio(count, base_count):
+    return count / base_count if base_count and base_count > 0 else 0.0
+
+
+def load_item_points(cur, summary_table):
+    """读出整张汇总表（item 还原为名称）：{item: {year: (have_ratio, want_ratio)}}，以及表中出现过的全部年份。"""
+    cur.execute(f"""
+        SELECT s.year, i.name, s.have_count, s.want_count, s.base_count
+        FROM {summary_table} AS s
+        JOIN {ITEM_TABLE} AS i ON i.id = s.item_id
+    """)
+
+    points_by_item = {}
+    years = set()
+    for year, item, have_count, want_count, base_count in cur.fetchall():
+        points_by_item.setdefault(item, {})[year] = (
+            _ratio(have_count, base_count),
+            _ratio(want_count, base_count),
+        )
+        years.add(year)
+    return points_by_item, sorted(years)
+
+
+def rank_items(points_by_item, years):
+    """
+    计算每个 item 的展示字段与各排序键的值，返回 {sort_key: [(item, value, stats), ...]}（已排好序）。
+    stats = (latest_year, have_ratio, want_ratio, growth)
+    """
+    if not years:
+        return {key: [] for key in RANKING_SORT_KEYS}
+
+    last_year = years[-1]
+    prev_year = years[-2] if len(years) > 1 else None
+
+    entries = []
+    for item, points in points_by_item.items():
+        item_last_year = max(points)
+        have_ratio, want_ratio = points[item_last_year]
+
+        current = points.get(last_year)
+        previous = points.get(prev_year) if prev_year is not None else None
+        growth = current[0] - previous[0] if current and previous else None
+
+        values = {
+            "have_ratio": current[0] if current else None,
+            "want_ratio": current[1] if current else None,
+            "growth": growth,
+            # 年份相同再比该年使用率：用元组参与排序，落库时只存年份
+            "latest_year": (item_last_year, have_ratio),
+        }
+        stats = (item_last_year, have_ratio, want_ratio, growth)
+        entries.append((item, values, stats))
+
+    ranked = {}
+    for key in RANKING_SORT_KEYS:
+        with_value = [e for e in entries if e[1][key] is not None]
+        without_value = [e for e in entries if e[1][key] is None]
+
+        with_value.sort(key=lambda e: e[0])
+        with_value.sort(key=lambda e: e[1][key], reverse=True)
+        without_value.sort(key=lambda e: e[0])
+
+        ranked[key] = [
+            (item, values[key][0] if key == "latest_year" else values[key], stats)
+            for item, values, stats in with_value + without_value
+        ]
+    return ranked
+
+
+def materialize_rankings(cur, dimension, summary_table):
+    """重新生成某个维度的全部排名（在调用方的事务内执行，与汇总数据一同提交）。"""
+    ensure_ranking_table(cur)
+    cur.execute(f"DELETE FROM {RANKING_TABLE} WHERE dimension = ?", (dimension,))
+
+    points_by_item, years = load_item_points(cur, summary_table)
+    ranked = rank_items(points_by_item, years)
+    ids = item_ids(cur, dimension, points_by_item)
+
+    rows = []
+    for key in RANKING_SORT_KEYS:
+        for rank, (item, value, stats) in enumerate(ranked[key], start=1):
+            latest_year, have_ratio, want_ratio, growth = stats
+            rows.append((
+                dimension, key, rank, ids[item], value,
+                latest_year, have_ratio, want_ratio, growth,
+            ))
+
+    cur.executemany(
+        f"""
+        INSERT INTO {RANKING_TABLE}
+            (dimension, sort_key, rank, item_id, value, latest_year, have_ratio, want_ratio, growth)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
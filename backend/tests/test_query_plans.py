@@ -0,0 +1,89 @@
+import random
+import sqlite3
+
+import pytest
+
+from backend.app.db.query_plans import check_query_plans, service_queries
+from backend.data_processing.static.generate_usage_trend import DIMENSION_BUILDS, main as build_main
+from backend.data_processing.static.salary_sketches import SALARY_COLUMNS
+from backend.data_processing.static.segment_cube import SEGMENT_CONFIG
+
+YEARS = sorted({year for build in DIMENSION_BUILDS for year in build["config"]})
+ROWS_PER_YEAR = 120
+ITEMS = ["A", "B", "C", "D", "E", "F"]
+
+
+def _multi_select(rng):
+    return ";".join(rng.sample(ITEMS, rng.randint(1, 4)))
+
+
+def _write_survey_tables(conn):
+    """每年一张最小的原始调查表：各维度的 have / want 列，以及分群与薪资列。"""
+    rng = random.Random(0)
+    for year in YEARS:
+        columns = []
+        for build in DIMENSION_BUILDS:
+            cfg = build["config"].get(year)
+            if cfg:
+                columns += [cfg["have"], cfg["want"]]
+        segment = SEGMENT_CONFIG[year]
+        extra = [segment["country"], segment["years_code"], segment["dev_type"], SALARY_COLUMNS[year][0]]
+        columns = list(dict.fromkeys(columns))
+        multi_select_count = len(columns)
+        columns += extra
+
+        conn.execute(f"CREATE TABLE survey_results_{year} ({', '.join(c + ' TEXT' for c in columns)})")
+        rows = []
+        for _ in range(ROWS_PER_YEAR):
+            row = [_multi_select(rng) for _ in range(multi_select_count)]
+            row += [
+                rng.choice(["Germany", "India"]),
+                str(rng.randint(0, 30)),
+                "Developer, back-end;Developer, front-end",
+                str(rng.randint(20_000, 200_000)),
+            ]
+            rows.append(row)
+        conn.executemany(
+            f"INSERT INTO survey_results_{year} VALUES ({', '.join('?' for _ in columns)})",
+            rows,
+        )
+    conn.commit()
+
+
+@pytest.fixture(scope="module")
+def fixture_db(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp("plans") / "devtrend.db"
+    conn = sqlite3.connect(db_path)
+    _write_survey_tables(conn)
+    conn.close()
+
+    build_main([
+        "--db", str(db_path), "--force",
+        "--bitmaps", "--segments", "--cooccurrence", "--salary",
+    ])
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    yield conn
+    conn.close()
+
+
+def test_fixture_covers_derived_tables(fixture_db):
+    names = {name for name, _, _ in service_queries(fixture_db)}
+    for expected in (
+        "language: top items",
+        "precomputed item fragments",
+        "ranking page",
+        "forecast fragments",
+        "leaders total",
+        "segment top items",
+        "segment catalog",
+        "dimension bitmaps",
+        "co-occurrence pmi",
+        "salary sketches",
+        "data version",
+    ):
+        assert expected in names
+
+
+def test_service_queries_use_indexes(fixture_db):
+    assert check_query_plans(fixture_db) == []
@@ -0,0 +1,37 @@
+from backend.data_processing.static.segment_cube import bucket_years_code
+
+
+def test_2017_years_program():
+    assert bucket_years_code("Less than a year") == "0-2"
+    assert bucket_years_code("1 to 2 years") == "0-2"
+    assert bucket_years_code("2 to 3 years") == "3-5"
+    assert bucket_years_code("5 to 6 years") == "6-10"
+    assert bucket_years_code("10 to 11 years") == "11-20"
+    assert bucket_years_code("19 to 20 years") == "11-20"
+    assert bucket_years_code("20 or more years") == "21+"
+
+
+def test_2018_years_coding():
+    assert bucket_years_code("0-2 years") == "0-2"
+    assert bucket_years_code("3-5 years") == "3-5"
+    assert bucket_years_code("6-8 years") == "6-10"
+    assert bucket_years_code("9-11 years") == "11-20"
+    assert bucket_years_code("18-20 years") == "11-20"
+    assert bucket_years_code("21-23 years") == "21+"
+    assert bucket_years_code("30 or more years") == "21+"
+
+
+def test_2019_onwards_years_code():
+    assert bucket_years_code("Less than 1 year") == "0-2"
+    assert bucket_years_code("2") == "0-2"
+    assert bucket_years_code("3") == "3-5"
+    assert bucket_years_code("10") == "6-10"
+    assert bucket_years_code("20") == "11-20"
+    assert bucket_years_code("21") == "21+"
+    assert bucket_years_code("More than 50 years") == "21+"
+
+
+def test_missing_or_unparseable():
+    assert bucket_years_code(None) is None
+    assert bucket_years_code("  ") is None
+    assert bucket_years_code("NA") is None
@@ -0,0 +1,75 @@
+import math
+
+import pandas as pd
+
+from backend.data_processing.static.generate_usage_trend import (
+    count_year_rows,
+    count_year_rows_vectorized,
+)
+
+NAN = float("nan")
+
+HAVE = [
+    None,
+    NAN,
+    "",
+    "   ",
+    "Python; JavaScript ;Go",
+    " Node.js ; Node ",            # 两个原始名称映射到同一个 canonical 名称
+    "Python;Python",
+    "Go",
+    None,
+    ";  ;",
+]
+WANT = [
+    "Rust",
+    None,
+    NAN,
+    "Go ",
+    "",
+    "Rust;Node",
+    "   ",
+    "Node.js;Node;Rust",
+    NAN,
+    "Rust",
+]
+
+ITEM_MAPPING = {"Node.js": "Node", "JavaScript": "JavaScript"}
+
+
+def _both_engines(have, want, item_mapping=None):
+    reference = count_year_rows(list(zip(have, want)), ";", item_mapping)
+    vectorized = count_year_rows_vectorized(
+        pd.Series(have, dtype=object),
+        pd.Series(want, dtype=object),
+        ";",
+        item_mapping,
+    )
+    return reference, vectorized
+
+
+def test_engines_agree():
+    reference, vectorized = _both_engines(HAVE, WANT, ITEM_MAPPING)
+    assert vectorized == reference
+
+
+def test_engines_agree_without_mapping():
+    reference, vectorized = _both_engines(HAVE, WANT)
+    assert vectorized == reference
+
+
+def test_reference_counts():
+    have, want, base = count_year_rows(list(zip(HAVE, WANT)), ";", ITEM_MAPPING)
+
+    # None / NaN / 空串 / 纯空白都不算作答；";  ;" 算作答但不产生 item
+    assert base == 7
+    assert have == {"Python": 2, "JavaScript": 1, "Go": 2, "Node": 1}
+    # "Node.js;Node" 映射后同一行只计一次
+    assert want == {"Rust": 4, "Go": 1, "Node": 2}
+    assert not any(isinstance(k, float) and math.isnan(k) for k in (*have, *want))
+    assert "nan" not in have and "nan" not in want
+
+
+def test_all_blank():
+    reference, vectorized = _both_engines([None, NAN, " "], [NAN, "", None])
+    assert reference == vectorized == ({}, {}, 0)
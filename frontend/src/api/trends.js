@@ -103,16 +103,213 @@ function sortItemsByLatestYearUsage(data) {
   };
 }
 
+/**
+ * 把列式响应（format=columnar）还原成逐点结构 { dimension, items: [{ item, points }] }，
+ * have_ratio / want_ratio 按 count / base_count 计算（与后端逐点格式的取值一致）。
+ */
+function expandColumnar(data) {
+  const { dimension, years = [], base_count: baseCounts = [], items = [] } = data || {};
+
+  return {
+    dimension,
+    items: items.map(({ item, have_count: haveCounts, want_count: wantCounts }) => {
+      const points = [];
+      years.forEach((year, j) => {
+        if (haveCounts[j] == null) return;
+        const base = baseCounts[j];
+        points.push({
+          year,
+          have_ratio: base > 0 ? haveCounts[j] / base : 0,
+          want_ratio: base > 0 ? wantCounts[j] / base : 0,
+          have_count: haveCounts[j],
+          want_count: wantCounts[j],
+          base_count: base,
+        });
+      });
+      return { item, points };
+    }),
+  };
+}
+
+/**
+ * 一次请求获取多个维度的 Top N 趋势（/api/trends?dimensions=...），
+ * 每个维度都按“最近一年最高使用率”排序。
+ * 使用列式格式传输（体积小得多），返回前还原成逐点结构。
+ *
+ * @param {string[]} dimensions - 维度列表，如 ['language', 'database']
+ * @param {number} limit        - 每个维度的 Top N，默认 24
+ * @returns {Promise<Record<string, {dimension: string, items: Array}>>}
+ */
+export async function fetchTrendsBatch(dimensions, limit = 24) {
+  const params = new URLSearchParams();
+  params.set('dimensions', dimensions.join(','));
+  params.set('limit', String(limit));
+  params.set('format', 'columnar');
+
+  const url = `${BASE_URL}/api/trends?${params.toString()}`;
+  console.debug('[fetchTrendsBatch] →', url);
+
+  const rawData = await safeFetchJson(url);
+
+  const sorted = {};
+  Object.entries(rawData || {}).forEach(([dimension, data]) => {
+    sorted[dimension] = sortItemsByLatestYearUsage(expandColumnar(data));
+  });
+  return sorted;
+}
+
+// limit -> Map<dimension, Array<{ resolve, reject }>>：等待合并发送的 Top N 请求
+const pendingTopRequests = new Map();
+
+/**
+ * 把同一轮渲染中各个卡片发起的 Top N 请求合并成一次批量请求。
+ */
+function loadTopTrends(dimension, limit) {
+  return new Promise((resolve, reject) => {
+    let batch = pendingTopRequests.get(limit);
+    if (!batch) {
+      batch = new Map();
+      pendingTopRequests.set(limit, batch);
+      // 等本轮所有卡片都登记完，再统一发出一次请求
+      setTimeout(() => flushTopTrends(limit), 0);
+    }
+    if (!batch.has(dimension)) {
+      batch.set(dimension, []);
+    }
+    batch.get(dimension).push({ resolve, reject });
+  });
+}
+
+async function flushTopTrends(limit) {
+  const batch = pendingTopRequests.get(limit);
+  pendingTopRequests.delete(limit);
+
+  try {
+    const data = await fetchTrendsBatch([...batch.keys()], limit);
+    batch.forEach((waiters, dimension) => {
+      waiters.forEach(({ resolve, reject }) => {
+        if (data[dimension]) {
+          resolve(data[dimension]);
+        } else {
+          reject(new Error(`HTTP 404 - No data found for dimension: ${dimension}`));
+        }
+      });
+    });
+  } catch (err) {
+    batch.forEach((waiters) => waiters.forEach(({ reject }) => reject(err)));
+  }
+}
+
 /**
  * 获取某个维度的趋势，并按“最近一年最高使用率”对 items 排序。
+ * items 为空时，同一时刻多个维度的请求会被合并为一次批量请求。
  *
  * @param {string} dimension - 'language' | 'database' | ...
  * @param {string[]} items   - 技术项名称列表；为空则由后端返回最近一年 Top N
  * @param {number} limit     - items 为空时生效，默认 24
  */
 export async function fetchTrends(dimension, items = [], limit = 24) {
+  if (items.length === 0) {
+    return loadTopTrends(dimension, limit);
+  }
+
+  const params = new URLSearchParams();
+  items.forEach((item) => params.append('items', item));
+
+  const url = `${BASE_URL}/api/trends/${dimension}?${params.toString()}`;
+  console.debug('[fetchTrends] →', url);
+
+  const rawData = await safeFetchJson(url);
+
+  // 在这里对获取到的数据进行排序后再返回
+  const sorted = sortItemsByLatestYearUsage(rawData);
+  console.debug('[fetchTrends] 排序后的数据最近年份为:', findLatestYearWithData(sorted.items));
+
+  return sorted;
+}
+
+/**
+ * 获取某个维度全部 item 的排名（服务端预计算名次，按 rank 做 keyset 分页）。
+ *
+ * @param {string} dimension - 'language' | 'database' | ...
+ * @param {object} options
+ * @param {'have_ratio'|'want_ratio'|'growth'|'latest_year'} options.sort - 排序键，默认 have_ratio
+ * @param {number} options.after    - 上一页返回的 next_cursor，首页为 0
+ * @param {number} options.pageSize - 每页 item 数，默认 50
+ * @returns {Promise<{dimension: string, sort: string, total: number, items: Array, next_cursor: number|null}>}
+ */
+export async function fetchRanking(dimension, { sort = 'have_ratio', after = 0, pageSize = 50 } = {}) {
   const params = new URLSearchParams();
+  params.set('sort', sort);
+  params.set('after', String(after));
+  params.set('page_size', String(pageSize));
+
+  const url = `${BASE_URL}/api/trends/${dimension}/ranking?${params.toString()}`;
+  console.debug('[fetchRanking] →', url);
 
+  return safeFetchJson(url);
+}
+
+/**
+ * 获取某个维度的增长 / 势头榜单（服务端预计算）。
+ *
+ * @param {string} dimension - 'language' | 'database' | ...
+ * @param {object} options
+ * @param {'yoy_delta'|'yoy_growth'|'cagr'|'want_gap'} options.metric - 指标，默认 yoy_delta
+ * @param {number} [options.year] - 榜单年份，缺省为最近一年
+ * @param {'desc'|'asc'} options.order - desc：值最大的在前；asc：值最小的在前
+ * @param {number} options.limit  - 返回的名次数，默认 10
+ */
+export async function fetchLeaders(dimension, { metric = 'yoy_delta', year, order = 'desc', limit = 10 } = {}) {
+  const params = new URLSearchParams();
+  params.set('metric', metric);
+  if (year != null) params.set('year', String(year));
+  params.set('order', order);
+  params.set('limit', String(limit));
+
+  const url = `${BASE_URL}/api/trends/${dimension}/leaders?${params.toString()}`;
+  console.debug('[fetchLeaders] →', url);
+
+  return safeFetchJson(url);
+}
+
+/**
+ * 获取某个维度未来几年的使用率 / 期望率预测（含预测区间，服务端构建时批量拟合）。
+ *
+ * @param {string} dimension - 'language' | 'database' | ...
+ * @param {string[]} items   - 技术项名称列表；为空则预测最近一年 Top N
+ * @param {number} limit     - items 为空时生效，默认 5
+ */
+export async function fetchForecast(dimension, items = [], limit = 5) {
+  const params = new URLSearchParams();
+  if (items.length > 0) {
+    items.forEach((item) => params.append('items', item));
+  } else {
+    params.set('limit', String(limit));
+  }
+
+  const url = `${BASE_URL}/api/trends/${dimension}/forecast?${params.toString()}`;
+  console.debug('[fetchForecast] →', url);
+
+  return safeFetchJson(url);
+}
+
+/**
+ * 获取某个分群（国家 / 编程年限 / 开发者类型）内的趋势，比例只在该分群的受访者中计算。
+ *
+ * @param {string} dimension - 'language' | 'database' | ...
+ * @param {object} segment
+ * @param {string} [segment.country]   - 如 'Germany'
+ * @param {'0-2'|'3-5'|'6-10'|'11-20'|'21+'} [segment.yearsCode]
+ * @param {string} [segment.devType]   - 如 'Developer, back-end'
+ * @param {string[]} items - 技术项名称列表；为空则取该分群最近一年 Top N
+ * @param {number} limit   - items 为空时生效，默认 5
+ */
+export async function fetchSegmentTrends(dimension, { country, yearsCode, devType } = {}, items = [], limit = 5) {
+  const params = new URLSearchParams();
+  if (country) params.set('country', country);
+  if (yearsCode) params.set('years_code', yearsCode);
+  if (devType) params.set('dev_type', devType);
   if (items.length > 0) {
     items.forEach((item) => params.append('items', item));
   } else {
@@ -120,13 +317,69 @@ export async function fetchTrends(dimension, items = [], limit = 24) {
   }
 
   const url = `${BASE_URL}/api/trends/${dimension}?${params.toString()}`;
-  console.debug('[fetchTrends] →', url);
+  console.debug('[fetchSegmentTrends] →', url);
 
   const rawData = await safeFetchJson(url);
+  return sortItemsByLatestYearUsage(rawData);
+}
 
-  // 在这里对获取到的数据进行排序后再返回
-  const sorted = sortItemsByLatestYearUsage(rawData);
-  console.debug('[fetchTrends] 排序后的数据最近年份为:', findLatestYearWithData(sorted.items));
+/**
+ * 获取某个维度可用的分群取值及各自的受访者数（用于筛选下拉框）。
+ *
+ * @param {string} dimension - 'language' | 'database' | ...
+ * @returns {Promise<{dimension: string, country: Array, years_code: Array, dev_type: Array}>}
+ */
+export async function fetchSegments(dimension) {
+  const url = `${BASE_URL}/api/trends/${dimension}/segments`;
+  console.debug('[fetchSegments] →', url);
 
-  return sorted;
+  return safeFetchJson(url);
+}
+
+/**
+ * 根据当前技术栈获取“下一步想学”的技术推荐（服务端基于调查中的在用 → 想用共现 / PMI 打分）。
+ *
+ * @param {Array<{dimension: string, item: string}>} stack - 当前技术栈
+ * @param {object} options
+ * @param {number} options.k           - 推荐数，默认 10
+ * @param {string} [options.dimension] - 只推荐某个维度，如 'database'
+ * @param {number} [options.year]      - 调查年份，缺省为最近一年
+ * @returns {Promise<{year: number, stack: string[], unknown: string[], items: Array}>}
+ */
+export async function fetchNextTechnologies(stack, { k = 10, dimension, year } = {}) {
+  const params = new URLSearchParams();
+  stack.forEach(({ dimension: dim, item }) => params.append('have', `${dim}:${item}`));
+  params.set('k', String(k));
+  if (dimension) params.set('dimension', dimension);
+  if (year != null) params.set('year', String(year));
+
+  const url = `${BASE_URL}/api/advice/next?${params.toString()}`;
+  console.debug('[fetchNextTechnologies] →', url);
+
+  return safeFetchJson(url);
+}
+
+/**
+ * 获取年薪（美元）的 p25 / 中位数 / p75 / p90（服务端由分位数草图合并得出）。
+ *
+ * @param {object} options
+ * @param {string} [options.dimension] - items 所在维度，如 'language'
+ * @param {string[]} [options.items]    - 在用这些技术的受访者；多个时另返回合并结果 combined
+ * @param {number[]} [options.years]    - 合并的调查年份，缺省为最近一年
+ * @param {object} [options.segment]    - { country } / { yearsCode } / { devType }，最多一个
+ * @returns {Promise<{years: number[], overall: object, items: Array, combined: object|null}>}
+ */
+export async function fetchSalary({ dimension, items = [], years = [], segment = {} } = {}) {
+  const params = new URLSearchParams();
+  if (dimension) params.set('dimension', dimension);
+  items.forEach((item) => params.append('items', item));
+  years.forEach((year) => params.append('years', String(year)));
+  if (segment.country) params.set('country', segment.country);
+  if (segment.yearsCode) params.set('years_code', segment.yearsCode);
+  if (segment.devType) params.set('dev_type', segment.devType);
+
+  const url = `${BASE_URL}/api/salary?${params.toString()}`;
+  console.debug('[fetchSalary] →', url);
+
+  return safeFetchJson(url);
 }
@@ -1,4 +1,5 @@
 import React, { useState } from 'react';
+import { fetchNextTechnologies } from '../api/trends';
 import '../styles/personal-advice.css';
 
 const LANGUAGE_OPTIONS = [
@@ -37,6 +38,19 @@ const DATABASE_OPTIONS = [
   'DynamoDB',
 ];
 
+// 技术栈分组 → 后端维度名
+const STACK_DIMENSIONS = {
+  languages: 'language',
+  webframes: 'webframe',
+  databases: 'database',
+};
+
+// 选项文案与调查数据中名称不一致的项
+const ITEM_ALIASES = {
+  PostgresSQL: 'PostgreSQL',
+  'jQuery（遗留）': 'jQuery',
+};
+
 const SALARY_BAND_OPTIONS = [
   '暂不透露',
   '< 20 万 / 年',
@@ -128,9 +142,35 @@ const PersonalAdvice = () => {
     }));
   };
 
-  // 未来接后端的地方
-  const handleGenerateFromBackend = () => {
-    // TODO: 调用后端接口生成建议，然后 setAnalysisNote / setAiSummary
+  const handleGenerateFromBackend = async () => {
+    // TODO: AI 总结区（setAiSummary）待接入
+    const stack = Object.entries(STACK_DIMENSIONS).flatMap(([group, dimension]) =>
+      (techStack[group] || []).map((item) => ({
+        dimension,
+        item: ITEM_ALIASES[item] || item,
+      })),
+    );
+    if (stack.length === 0) {
+      setAnalysisNote('请先在「技术栈自画像」中勾选至少一项技术。');
+      return;
+    }
+
+    try {
+      const advice = await fetchNextTechnologies(stack, { k: 8 });
+      const lines = advice.items.map(
+        (rec, idx) =>
+          `${idx + 1}. ${rec.item}（${rec.dimension}）— 与你的 ${rec.support} 项技术显著相关，` +
+          `${(rec.next_ratio * 100).toFixed(1)}% 的受访者想学`,
+      );
+      setAnalysisNote(
+        [
+          `基于 ${advice.year} 年调查中「在用 → 想用」的共现关系，和你技术栈相似的开发者下一步最想学：`,
+          ...(lines.length > 0 ? lines : ['（暂无显著的推荐）']),
+        ].join('\n'),
+      );
+    } catch (err) {
+      setAnalysisNote(`生成建议失败：${err.message}`);
+    }
   };
 
   const handleGenerateClick = () => {